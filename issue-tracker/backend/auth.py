@@ -1,20 +1,28 @@
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from database_models import User
-from database import get_db
+from database import get_db, SessionLocal
+from cache import user_cache, create_cache
+from password_hasher import pwd_context
+import models
 
 # Configuration
 SECRET_KEY = "your-secret-key-here-change-in-production"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Token version table configuration. Entries are re-read from the database
+# after the TTL, which bounds how long other workers may accept a revoked
+# token when the per-process cache backend is used.
+TOKEN_VERSION_TABLE_SIZE = 10000
+TOKEN_VERSION_TTL_SECONDS = 30
+
 security = HTTPBearer()
+stream_security = HTTPBearer(auto_error=False)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash."""
@@ -36,6 +44,19 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+def create_user_access_token(user: User, expires_delta: Optional[timedelta] = None) -> str:
+    """Create an access token carrying the user's identity, role and token version."""
+    return create_access_token(
+        data={
+            "sub": user.username,
+            "uid": user.id,
+            "role": user.role.value,
+            "ver": user.token_version,
+            "active": user.is_active
+        },
+        expires_delta=expires_delta
+    )
+
 def verify_token(token: str) -> Optional[dict]:
     """Verify and decode a JWT token."""
     try:
@@ -47,40 +68,153 @@ def verify_token(token: str) -> Optional[dict]:
     except JWTError:
         return None
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
-    """Get the current authenticated user."""
+class TokenVersionTable:
+    """Current token version per user id, consulted instead of the users table.
+
+    A token is only accepted while its "ver" claim matches the user's current
+    version, so bumping the version revokes every token issued before it.
+    Missing or expired entries are loaded from the database with a single
+    column lookup.
+    """
+
+    def __init__(self):
+        self._versions = create_cache(
+            "token_versions", TOKEN_VERSION_TABLE_SIZE, ttl=TOKEN_VERSION_TTL_SECONDS
+        )
+
+    def current(self, db: Session, user_id: int) -> Optional[int]:
+        """Get a user's current token version, or None if the user no longer exists."""
+        version = self._versions.get(user_id)
+        if version is not None:
+            return version
+        
+        row = db.query(User.token_version).filter(User.id == user_id).first()
+        if row is None:
+            return None
+        
+        return self._keep_max(user_id, row.token_version)
+
+    def set(self, user_id: int, version: int):
+        """Record a user's new token version after it has been committed."""
+        self._keep_max(user_id, version)
+
+    def _keep_max(self, user_id: int, version: int) -> int:
+        """Cache a version unless a newer one is already cached, and return the newer.
+
+        Versions only go up, so a value read before a concurrent bump must not
+        overwrite the bumped one and bring revoked tokens back.
+        """
+        cached = self._versions.get(user_id)
+        if cached is not None and cached >= version:
+            return cached
+        self._versions.set(user_id, version)
+        return version
+
+    def stats(self):
+        """Get hit/miss metrics for the table."""
+        return self._versions.stats()
+
+# Global token version table
+token_versions = TokenVersionTable()
+
+def principal_from_token(db: Session, token: str) -> models.UserPrincipal:
+    """Build the principal from a token's signed claims, rejecting revoked tokens."""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    payload = verify_token(credentials.credentials)
+    payload = verify_token(token)
     if payload is None:
         raise credentials_exception
     
     username: str = payload.get("sub")
-    if username is None:
+    user_id: int = payload.get("uid")
+    role: str = payload.get("role")
+    version: int = payload.get("ver")
+    active: bool = payload.get("active")
+    if username is None or user_id is None or role is None or version is None or active is None:
+        raise credentials_exception
+    
+    # Role changes and (de)activation bump the version, revoking older tokens,
+    # so the claims of a token that passes this check are current
+    if token_versions.current(db, user_id) != version:
         raise credentials_exception
     
+    return models.UserPrincipal(id=user_id, username=username, role=role, is_active=active)
+
+def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+) -> models.UserPrincipal:
+    """Get the current authenticated user from the signed token claims."""
+    return principal_from_token(db, credentials.credentials)
+
+def authenticate_stream(raw_token: Optional[str]) -> models.UserPrincipal:
+    """Authenticate a long-lived connection (SSE stream or WebSocket) from its token.
+    
+    The session is closed before returning so an open connection does not hold one.
+    """
+    if not raw_token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    db = SessionLocal()
+    try:
+        principal = principal_from_token(db, raw_token)
+    finally:
+        db.close()
+    if not principal.is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
+    return principal
+
+def get_stream_user(
+    token: Optional[str] = None,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(stream_security)
+) -> models.UserPrincipal:
+    """Authenticate a stream from the Authorization header or a ?token= query parameter.
+    
+    EventSource cannot send headers, so browsers pass the token in the URL.
+    """
+    return authenticate_stream(credentials.credentials if credentials else token)
+
+def load_user_profile(db: Session, username: str) -> Optional[models.User]:
+    """Get a detached snapshot of a user, served from the user cache when possible."""
+    profile = user_cache.get(username)
+    if profile is not None:
+        return profile
+    
     user = db.query(User).filter(User.username == username).first()
     if user is None:
-        raise credentials_exception
+        return None
     
-    return user
+    profile = models.User.model_validate(user)
+    user_cache.set(username, profile)
+    return profile
 
-def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
+def get_current_active_user(current_user: models.UserPrincipal = Depends(get_current_user)) -> models.UserPrincipal:
     """Get the current active user."""
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
+def get_current_user_profile(
+    current_user: models.UserPrincipal = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+) -> models.User:
+    """Get the full profile of the current user, for routes that need more than the token claims."""
+    profile = load_user_profile(db, current_user.username)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return profile
+
 def require_role(required_roles: list):
     """Decorator to require specific roles."""
-    def role_checker(current_user: User = Depends(get_current_active_user)):
+    def role_checker(current_user: models.UserPrincipal = Depends(get_current_active_user)):
         if current_user.role.value not in required_roles:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -90,7 +224,7 @@ def require_role(required_roles: list):
     return role_checker
 
 # Role-based dependencies
-def require_admin(current_user: User = Depends(get_current_active_user)) -> User:
+def require_admin(current_user: models.UserPrincipal = Depends(get_current_active_user)) -> models.UserPrincipal:
     """Require admin role."""
     if current_user.role.value != "admin":
         raise HTTPException(
@@ -99,7 +233,7 @@ def require_admin(current_user: User = Depends(get_current_active_user)) -> User
         )
     return current_user
 
-def require_manager_or_admin(current_user: User = Depends(get_current_active_user)) -> User:
+def require_manager_or_admin(current_user: models.UserPrincipal = Depends(get_current_active_user)) -> models.UserPrincipal:
     """Require manager or admin role."""
     if current_user.role.value not in ["admin", "manager"]:
         raise HTTPException(
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Benchmark WebSocket broadcast serialization and wire size with many recipients
+"""
+import asyncio
+import gc
+import time
+import zlib
+from datetime import datetime
+
+import binary_codec
+import websocket_manager
+from models import WebSocketMessage
+from websocket_manager import ConnectionManager, NotificationService
+
+RECIPIENTS = 10000
+ROUNDS = 20
+
+class NullWebSocket:
+    """Stands in for a client socket; accepts frames without any I/O."""
+
+    def __init__(self, subprotocols=()):
+        self.scope = {"subprotocols": list(subprotocols)}
+        self.frames = []
+
+    async def accept(self, subprotocol=None):
+        pass
+
+    async def send_text(self, message: str):
+        self.frames.append(message.encode("utf-8"))
+
+    async def send_bytes(self, message: bytes):
+        self.frames.append(message)
+
+    async def close(self, code: int = 1000):
+        pass
+
+def per_recipient_encode(data: dict, user_ids):
+    """The previous approach: one pydantic model and one dump per recipient."""
+    for user_id in user_ids:
+        WebSocketMessage(
+            type=data.get("type", "notification"),
+            data=data,
+            user_id=user_id,
+            timestamp=datetime.now()
+        ).model_dump_json()
+
+def deflated_size(frames) -> int:
+    """Bytes on the wire with permessage-deflate, keeping the compression context between messages."""
+    compressor = zlib.compressobj(wbits=-15)
+    return sum(len(compressor.compress(frame) + compressor.flush(zlib.Z_SYNC_FLUSH)) - 4 for frame in frames)
+
+async def time_broadcast(manager: ConnectionManager, payload: dict, user_ids, notification_ids=None) -> float:
+    elapsed = 0.0
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        await manager.broadcast_json_to_users(payload, user_ids, notification_ids)
+        elapsed += time.perf_counter() - start
+        await asyncio.sleep(0.01)  # Let the writer tasks drain their queues, outside the timing
+    return elapsed / ROUNDS
+
+async def connected_manager(user_ids, subprotocols=()) -> ConnectionManager:
+    manager = ConnectionManager()
+    await manager.start()
+    for user_id in user_ids:
+        await manager.connect(NullWebSocket(subprotocols), user_id)
+    return manager
+
+async def close_manager(manager: ConnectionManager):
+    for connections in list(manager.active_connections.values()):
+        for connection in tuple(connections):
+            manager._remove(connection)
+    await manager.stop()
+    await asyncio.sleep(0)  # Let the cancelled writer tasks finish
+    gc.collect()
+
+async def main():
+    payloads = [
+        NotificationService.issue_updated_payload(
+            42, "Login page times out on slow networks", "Jane Smith",
+            {"status": ("open", "in_progress"), "priority": ("medium", "high")}
+        ),
+        NotificationService.comment_added_payload(42, "Login page times out on slow networks", "John Doe",
+                                                  "Reproduced on 3G throttling, the token refresh never returns"),
+        NotificationService.issue_assigned_payload(42, "Login page times out on slow networks", "Admin User"),
+        NotificationService.time_logged_payload(42, "Login page times out on slow networks", "Jane Smith", 1.5),
+    ]
+    payload = payloads[0]
+    user_ids = list(range(1, RECIPIENTS + 1))
+
+    # One manager at a time: keeping every encoding's connections alive would make the
+    # garbage collector's full passes, and so every measurement, slower
+    broadcast = {}
+    for encoding, subprotocols in (("json", ()), ("msgpack", (binary_codec.SUBPROTOCOL,))):
+        manager = await connected_manager(user_ids, subprotocols)
+        if encoding == "json":
+            start = time.perf_counter()
+            for _ in range(ROUNDS):
+                per_recipient_encode(payload, user_ids)
+            per_recipient = (time.perf_counter() - start) / ROUNDS
+        broadcast[encoding] = await time_broadcast(manager, payload, user_ids)
+        # Stored notifications add each recipient's notification id to their frame
+        broadcast[f"{encoding} + ids"] = await time_broadcast(manager, payload, user_ids, user_ids)
+        await close_manager(manager)
+
+    encoder = "orjson" if websocket_manager.orjson is not None else "json"
+    print(f"Recipients: {RECIPIENTS}, JSON encoder: {encoder}")
+    print(f"Per-recipient model_dump_json: {per_recipient * 1000:.1f} ms per broadcast")
+    for encoding, elapsed in broadcast.items():
+        print(f"Encode once + {encoding:<14} envelope: {elapsed * 1000:.1f} ms per broadcast "
+              f"(including enqueue), {per_recipient / elapsed:.1f}x")
+
+    # Wire size for one client receiving a mix of notification types
+    frames = {}
+    for encoding, subprotocols in (("json", ()), ("msgpack", (binary_codec.SUBPROTOCOL,))):
+        manager = ConnectionManager()
+        await manager.start()
+        websocket = NullWebSocket(subprotocols)
+        await manager.connect(websocket, 1)
+        for _ in range(25):
+            for item in payloads:
+                await manager.broadcast_json_to_users(item, [1])
+        await asyncio.sleep(0.05)
+        frames[encoding] = websocket.frames
+
+    print(f"\nWire size for {len(frames['json'])} mixed notifications to one client:")
+    for encoding, sent in frames.items():
+        raw = sum(len(frame) for frame in sent)
+        print(f"  {encoding:<8} {raw:>7} bytes, {deflated_size(sent):>6} bytes with permessage-deflate "
+              f"({raw / len(sent):.0f} bytes/message raw)")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,236 @@
+from typing import Any, Callable, Dict, Optional, Tuple
+import struct
+
+# Compact binary WebSocket encoding: MessagePack with integer codes for the
+# message types and payload field names that every frame repeats.
+#
+# A frame is an array [type, address, data, timestamp] or, for resumable
+# notifications, [type, address, data, timestamp, seq, notification_id?]:
+#   type            - code from MESSAGE_TYPE_CODES, or the type string if it has none
+#   address         - recipient user id, topic string, or nil
+#   data            - payload map; known field names are replaced by FIELD_CODES
+#   timestamp       - seconds since the epoch as a float
+#   seq             - the user's sequence number, to resume from after a reconnect
+#   notification_id - id of the recipient's stored notification, when there is one
+
+SUBPROTOCOL = "issuetracker.msgpack.v1"
+
+MESSAGE_TYPE_CODES = {
+    "ping": 0,
+    "subscribed": 1,
+    "subscribe_rejected": 2,
+    "unsubscribed": 3,
+    "resync": 4,
+    "hello": 5,
+    "issue_assigned": 10,
+    "issue_updated": 11,
+    "comment_added": 12,
+    "mention": 13,
+    "time_logged": 14,
+    "issue_changed": 20,
+    "comment_created": 21,
+    "time_entry_created": 22,
+}
+
+FIELD_CODES = {
+    "title": 1,
+    "message": 2,
+    "issue_id": 3,
+    "assigned_by": 4,
+    "updated_by": 5,
+    "changes": 6,
+    "comment_author": 7,
+    "comment_preview": 8,
+    "mentioned_by": 9,
+    "logged_by": 10,
+    "hours": 11,
+    "comment_id": 12,
+    "author_id": 13,
+    "author_name": 14,
+    "content": 15,
+    "created_at": 16,
+    "time_entry_id": 17,
+    "user_id": 18,
+    "user_name": 19,
+    "description": 20,
+    "topic": 21,
+    "ts": 22,
+    "last_seq": 23,
+    "issue_title": 24,
+}
+
+MESSAGE_TYPE_NAMES = {code: name for name, code in MESSAGE_TYPE_CODES.items()}
+FIELD_NAMES = {code: name for name, code in FIELD_CODES.items()}
+
+_pack_float = struct.Struct(">Bd").pack
+
+def _pack_int(value: int) -> bytes:
+    if 0 <= value <= 0x7f:
+        return bytes((value,))
+    if -32 <= value < 0:
+        return bytes((value & 0xff,))
+    if 0 <= value <= 0xff:
+        return b"\xcc" + bytes((value,))
+    if 0 <= value <= 0xffff:
+        return b"\xcd" + value.to_bytes(2, "big")
+    if 0 <= value <= 0xffffffff:
+        return b"\xce" + value.to_bytes(4, "big")
+    if 0 <= value <= 0xffffffffffffffff:
+        return b"\xcf" + value.to_bytes(8, "big")
+    if -0x80 <= value < 0:
+        return b"\xd0" + value.to_bytes(1, "big", signed=True)
+    if -0x8000 <= value < 0:
+        return b"\xd1" + value.to_bytes(2, "big", signed=True)
+    if -0x80000000 <= value < 0:
+        return b"\xd2" + value.to_bytes(4, "big", signed=True)
+    return b"\xd3" + value.to_bytes(8, "big", signed=True)
+
+def _pack_header(size: int, fix: int, fix_limit: int, codes: Tuple[int, int, int]) -> bytes:
+    if size < fix_limit:
+        return bytes((fix | size,))
+    if size <= 0xff and codes[0]:
+        return bytes((codes[0], size))
+    if size <= 0xffff:
+        return bytes((codes[1],)) + size.to_bytes(2, "big")
+    return bytes((codes[2],)) + size.to_bytes(4, "big")
+
+def array_header(size: int) -> bytes:
+    """Header for an array of size elements; the elements follow as packed values."""
+    return _pack_header(size, 0x90, 16, (0, 0xdc, 0xdd))
+
+def packb(value: Any) -> bytes:
+    """Serialize a value to MessagePack. Tuples pack as arrays; other objects as their str()."""
+    if value is None:
+        return b"\xc0"
+    if value is True:
+        return b"\xc3"
+    if value is False:
+        return b"\xc2"
+    if isinstance(value, int):
+        return _pack_int(value)
+    if isinstance(value, float):
+        return _pack_float(0xcb, value)
+    if isinstance(value, str):
+        data = value.encode("utf-8")
+        return _pack_header(len(data), 0xa0, 32, (0xd9, 0xda, 0xdb)) + data
+    if isinstance(value, (bytes, bytearray)):
+        return _pack_header(len(value), 0, 0, (0xc4, 0xc5, 0xc6)) + bytes(value)
+    if isinstance(value, (list, tuple)):
+        return array_header(len(value)) + b"".join(packb(item) for item in value)
+    if isinstance(value, dict):
+        return (_pack_header(len(value), 0x80, 16, (0, 0xde, 0xdf))
+                + b"".join(packb(key) + packb(item) for key, item in value.items()))
+    return packb(str(value))
+
+class _Reader:
+    __slots__ = ("data", "pos")
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.pos = 0
+
+    def take(self, size: int) -> bytes:
+        chunk = self.data[self.pos:self.pos + size]
+        if len(chunk) != size:
+            raise ValueError("Truncated MessagePack data")
+        self.pos += size
+        return chunk
+
+    def uint(self, size: int) -> int:
+        return int.from_bytes(self.take(size), "big")
+
+    def read(self) -> Any:
+        code = self.take(1)[0]
+        if code <= 0x7f:
+            return code
+        if code >= 0xe0:
+            return code - 0x100
+        if 0x80 <= code <= 0x8f:
+            return self.map(code & 0x0f)
+        if 0x90 <= code <= 0x9f:
+            return self.array(code & 0x0f)
+        if 0xa0 <= code <= 0xbf:
+            return self.take(code & 0x1f).decode("utf-8")
+        if code == 0xc0:
+            return None
+        if code in (0xc2, 0xc3):
+            return code == 0xc3
+        if code in (0xc4, 0xc5, 0xc6):
+            return self.take(self.uint(1 << (code - 0xc4)))
+        if code == 0xca:
+            return struct.unpack(">f", self.take(4))[0]
+        if code == 0xcb:
+            return struct.unpack(">d", self.take(8))[0]
+        if 0xcc <= code <= 0xcf:
+            return self.uint(1 << (code - 0xcc))
+        if 0xd0 <= code <= 0xd3:
+            return int.from_bytes(self.take(1 << (code - 0xd0)), "big", signed=True)
+        if code in (0xd9, 0xda, 0xdb):
+            return self.take(self.uint(1 << (code - 0xd9))).decode("utf-8")
+        if code in (0xdc, 0xdd):
+            return self.array(self.uint(2 if code == 0xdc else 4))
+        if code in (0xde, 0xdf):
+            return self.map(self.uint(2 if code == 0xde else 4))
+        raise ValueError(f"Unsupported MessagePack type 0x{code:02x}")
+
+    def array(self, size: int) -> list:
+        return [self.read() for _ in range(size)]
+
+    def map(self, size: int) -> dict:
+        return {self.read(): self.read() for _ in range(size)}
+
+def unpackb(data: bytes) -> Any:
+    """Deserialize one MessagePack value."""
+    return _Reader(data).read()
+
+def _compact(data: Dict[str, Any]) -> Dict[Any, Any]:
+    return {FIELD_CODES.get(key, key): value for key, value in data.items() if key != "type"}
+
+def _type_code(data: Dict[str, Any], default: str) -> Any:
+    message_type = data.get("type", default)
+    return MESSAGE_TYPE_CODES.get(message_type, message_type)
+
+def encode_notification(data: Dict[str, Any], timestamp: float, seq: Optional[int] = None,
+                        with_notification_id: bool = False) -> bytes:
+    """Encode a user notification frame; it carries no recipient, so one frame serves every recipient.
+    
+    With with_notification_id, the frame is left one element short: each
+    recipient's frame is this plus packb(their notification id).
+    """
+    items = [_type_code(data, "notification"), None, _compact(data), timestamp]
+    if seq is not None or with_notification_id:
+        items.append(seq)
+    if not with_notification_id:
+        return packb(items)
+    return array_header(len(items) + 1) + b"".join(packb(item) for item in items)
+
+def encode_message(data: Dict[str, Any], address: Optional[Any], timestamp: float) -> bytes:
+    """Encode a complete frame addressed to a topic, a user id, or nobody in particular."""
+    return packb([_type_code(data, "update"), address, _compact(data), timestamp])
+
+def decode_frame(frame: bytes) -> Dict[str, Any]:
+    """Expand a binary frame back into the JSON message layout, e.g. for clients written in Python."""
+    type_code, address, data, timestamp, *extra = unpackb(frame)
+    message_type = MESSAGE_TYPE_NAMES.get(type_code, type_code)
+    payload = {"type": message_type}
+    payload.update({FIELD_NAMES.get(key, key): value for key, value in data.items()})
+    message = {"type": message_type, "data": payload, "timestamp": timestamp}
+    if extra and extra[0] is not None:
+        message["seq"] = extra[0]
+    if len(extra) > 1:
+        message["notification_id"] = extra[1]
+    if isinstance(address, str):
+        message["topic"] = address
+    elif address is not None:
+        message["user_id"] = address
+    return message
+
+def merge_frames(earlier: bytes, later: bytes, merge: Callable[[Dict[str, Any], Dict[str, Any]], Dict[str, Any]]) -> bytes:
+    """Merge two frames for the same issue by merging their payloads with field names restored.
+    
+    merge is websocket_manager.merge_payloads; the rest of the later frame is kept.
+    """
+    first, second = unpackb(earlier), unpackb(later)
+    payloads = [{FIELD_NAMES.get(key, key): value for key, value in frame[2].items()} for frame in (first, second)]
+    second[2] = _compact(merge(*payloads))
+    return packb(second)
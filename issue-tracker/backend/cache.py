@@ -0,0 +1,409 @@
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+import pickle
+import sqlite3
+import threading
+import time
+
+# Cache backend: "memory" keeps entries per process, "sqlite" shares them
+# between all worker processes on the host through a local database file
+CACHE_BACKEND = "memory"
+CACHE_SQLITE_PATH = "./cache.db"
+SQLITE_CACHE_TOUCH_BATCH = 256  # Hits whose LRU timestamps are written back in one transaction
+SQLITE_CACHE_TOUCH_INTERVAL_SECONDS = 5.0  # Longest a hit waits to be written back
+
+# Authenticated-user cache configuration
+USER_CACHE_MAX_SIZE = 1024
+USER_CACHE_TTL_SECONDS = 60
+
+# Issue search result cache configuration
+SEARCH_CACHE_MAX_SIZE = 256
+SEARCH_CACHE_MAX_BYTES = 16 * 1024 * 1024  # 16MB
+SEARCH_CACHE_TTL_SECONDS = 300
+
+# Single issue read cache configuration
+ISSUE_CACHE_MAX_SIZE = 512
+ISSUE_CACHE_MAX_BYTES = 16 * 1024 * 1024  # 16MB
+ISSUE_CACHE_TTL_SECONDS = 300
+
+# Issue template cache configuration
+TEMPLATE_CACHE_MAX_SIZE = 128
+TEMPLATE_CACHE_TTL_SECONDS = 600
+
+class CacheBackend(ABC):
+    """Interface shared by all cache backends."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @abstractmethod
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value for key, or None if missing or expired."""
+
+    @abstractmethod
+    def set(self, key: Hashable, value: Any, weight: int = 1):
+        """Store a value, evicting the least recently used entries if full."""
+
+    @abstractmethod
+    def invalidate(self, key: Hashable):
+        """Drop a single entry."""
+
+    @abstractmethod
+    def clear(self):
+        """Drop all entries."""
+
+    @abstractmethod
+    def incr(self, key: Hashable) -> int:
+        """Atomically increment a counter entry and return the new value."""
+
+    def _counters(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations
+        }
+
+    @abstractmethod
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss metrics for the cache."""
+
+class LRUCache(CacheBackend):
+    """Thread-safe, size-bounded in-process LRU cache with per-entry time-to-live.
+
+    When max_weight is set, entries also carry a weight (e.g. an estimate of
+    their size in bytes) and the cache evicts until the total fits.
+    """
+
+    def __init__(self, max_size: int, ttl: Optional[float] = None, max_weight: Optional[int] = None):
+        super().__init__()
+        self.max_size = max_size
+        self.ttl = ttl
+        self.max_weight = max_weight
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._weight = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, expires_at, weight = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                self._weight -= weight
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, weight: int = 1):
+        if self.max_weight is not None and weight > self.max_weight:
+            return  # Too large to ever fit; don't flush the whole cache for it
+
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._weight -= previous[2]
+
+            self._entries[key] = (value, expires_at, weight)
+            self._weight += weight
+            while len(self._entries) > self.max_size or (
+                self.max_weight is not None and self._weight > self.max_weight
+            ):
+                _, evicted = self._entries.popitem(last=False)
+                self._weight -= evicted[2]
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._weight -= entry[2]
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self._weight = 0
+
+    def incr(self, key: Hashable) -> int:
+        with self._lock:
+            entry = self._entries.get(key)
+            value = (entry[0] if entry is not None else 0) + 1
+            self._entries[key] = (value, None, 0)
+            return value
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "memory",
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "weight": self._weight,
+            "max_weight": self.max_weight,
+            **self._counters()
+        }
+
+class SQLiteCache(CacheBackend):
+    """Cache shared by every worker process on the host via a SQLite file.
+
+    Each cache uses its own namespace within the file. Values are pickled,
+    expiry uses wall-clock time so all processes agree on it, and the least
+    recently accessed entries are evicted once the namespace is over its
+    size or weight budget. Hit/miss counters are per process.
+
+    A hit only reads: its access time is held in memory and written back
+    with the next set(), or in a batch once enough hits or time accumulate,
+    so lookups do not take the database write lock that every worker shares.
+    """
+
+    def __init__(self, path: str, namespace: str, max_size: int, ttl: Optional[float] = None,
+                 max_weight: Optional[int] = None):
+        super().__init__()
+        self.path = path
+        self.namespace = namespace
+        self.max_size = max_size
+        self.ttl = ttl
+        self.max_weight = max_weight
+        self._lock = threading.Lock()
+        self._touched: Dict[str, float] = {}  # Access times of hits not yet written back
+        self._touched_since = 0.0
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache_entries ("
+            " namespace TEXT NOT NULL,"
+            " key TEXT NOT NULL,"
+            " value BLOB NOT NULL,"
+            " weight INTEGER NOT NULL,"
+            " expires_at REAL,"
+            " accessed_at REAL NOT NULL,"
+            " PRIMARY KEY (namespace, key))"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS ix_cache_entries_lru ON cache_entries (namespace, accessed_at)"
+        )
+
+    @staticmethod
+    def _key(key: Hashable) -> str:
+        # Keys are built from primitives and tuples, whose repr is stable across processes
+        return repr(key)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM cache_entries WHERE namespace = ? AND key = ?",
+                (self.namespace, self._key(key))
+            ).fetchone()
+            if row is None or (row[1] is not None and row[1] <= now):
+                self.misses += 1
+                return None
+
+            if not self._touched:
+                self._touched_since = now
+            self._touched[self._key(key)] = now
+            self.hits += 1
+            if (len(self._touched) >= SQLITE_CACHE_TOUCH_BATCH
+                    or now - self._touched_since >= SQLITE_CACHE_TOUCH_INTERVAL_SECONDS):
+                self._flush_touches()
+        return pickle.loads(row[0])
+
+    def _write_touches(self):
+        """Write back pending access times inside the caller's transaction."""
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE cache_entries SET accessed_at = MAX(accessed_at, ?) WHERE namespace = ? AND key = ?",
+                [(accessed_at, self.namespace, key) for key, accessed_at in self._touched.items()]
+            )
+            self._touched.clear()
+
+    def _flush_touches(self):
+        """Write back pending access times in a transaction of their own."""
+        try:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._write_touches()
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        except sqlite3.OperationalError:
+            # Access times only order eviction; drop them rather than fail a lookup
+            self._touched.clear()
+
+    def set(self, key: Hashable, value: Any, weight: int = 1):
+        if self.max_weight is not None and weight > self.max_weight:
+            return
+
+        now = time.time()
+        expires_at = now + self.ttl if self.ttl else None
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO cache_entries (namespace, key, value, weight, expires_at, accessed_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    (self.namespace, self._key(key), payload, weight, expires_at, now)
+                )
+                self._write_touches()
+                self._evict(now)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _evict(self, now: float):
+        """Drop expired entries, then the least recently used ones until within budget."""
+        self._conn.execute(
+            "DELETE FROM cache_entries WHERE namespace = ? AND expires_at IS NOT NULL AND expires_at <= ?",
+            (self.namespace, now)
+        )
+        count, total_weight = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(weight), 0) FROM cache_entries WHERE namespace = ?",
+            (self.namespace,)
+        ).fetchone()
+
+        excess = max(count - self.max_size, 0)
+        if self.max_weight is not None and total_weight > self.max_weight:
+            # Walk the LRU order to find how many entries must go to fit the budget
+            over = total_weight - self.max_weight
+            rows = self._conn.execute(
+                "SELECT weight FROM cache_entries WHERE namespace = ? ORDER BY accessed_at",
+                (self.namespace,)
+            )
+            dropped = 0
+            for (weight,) in rows:
+                if over <= 0:
+                    break
+                over -= weight
+                dropped += 1
+            excess = max(excess, dropped)
+
+        if excess:
+            self._conn.execute(
+                "DELETE FROM cache_entries WHERE rowid IN ("
+                " SELECT rowid FROM cache_entries WHERE namespace = ? ORDER BY accessed_at LIMIT ?)",
+                (self.namespace, excess)
+            )
+            self.evictions += excess
+
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM cache_entries WHERE namespace = ? AND key = ?",
+                (self.namespace, self._key(key))
+            )
+            self.invalidations += cursor.rowcount
+
+    def clear(self):
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM cache_entries WHERE namespace = ?", (self.namespace,)
+            )
+            self.invalidations += cursor.rowcount
+
+    def incr(self, key: Hashable) -> int:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT value FROM cache_entries WHERE namespace = ? AND key = ?",
+                    (self.namespace, self._key(key))
+                ).fetchone()
+                value = (pickle.loads(row[0]) if row is not None else 0) + 1
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO cache_entries (namespace, key, value, weight, expires_at, accessed_at)"
+                    " VALUES (?, ?, ?, 0, NULL, ?)",
+                    (self.namespace, self._key(key), pickle.dumps(value), time.time())
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return value
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            size, weight = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(weight), 0) FROM cache_entries WHERE namespace = ?",
+                (self.namespace,)
+            ).fetchone()
+        return {
+            "backend": "sqlite",
+            "size": size,
+            "max_size": self.max_size,
+            "weight": weight,
+            "max_weight": self.max_weight,
+            **self._counters()
+        }
+
+def create_cache(namespace: str, max_size: int, ttl: Optional[float] = None,
+                 max_weight: Optional[int] = None) -> CacheBackend:
+    """Create a cache using the configured backend."""
+    if CACHE_BACKEND == "sqlite":
+        return SQLiteCache(CACHE_SQLITE_PATH, namespace, max_size, ttl=ttl, max_weight=max_weight)
+    if CACHE_BACKEND == "memory":
+        return LRUCache(max_size, ttl=ttl, max_weight=max_weight)
+    raise ValueError(f"Unknown cache backend: {CACHE_BACKEND}")
+
+class CacheVersions:
+    """Monotonic version counters used to invalidate derived cache entries.
+
+    Cache keys embed the current version of the partition they were computed
+    from; bumping the version makes every older entry unreachable, and those
+    entries then age out through normal LRU eviction. Counters live in a cache
+    backend so that, with the shared backend, a bump in one worker is seen by all.
+    """
+
+    def __init__(self, backend: CacheBackend):
+        self._backend = backend
+
+    def get(self, partition: str) -> int:
+        """Get the current version of a partition."""
+        return self._backend.get(partition) or 0
+
+    def bump(self, partition: str) -> int:
+        """Advance the version of a partition."""
+        return self._backend.incr(partition)
+
+# Global cache of authenticated user principals, keyed by username
+user_cache = create_cache("users", USER_CACHE_MAX_SIZE, ttl=USER_CACHE_TTL_SECONDS)
+
+# Global cache of issue search results, keyed by (version, normalized filters)
+search_cache = create_cache(
+    "issue_search",
+    SEARCH_CACHE_MAX_SIZE,
+    ttl=SEARCH_CACHE_TTL_SECONDS,
+    max_weight=SEARCH_CACHE_MAX_BYTES
+)
+
+# Global cache of single issue reads, keyed by (version, issue id)
+issue_cache = create_cache(
+    "issues",
+    ISSUE_CACHE_MAX_SIZE,
+    ttl=ISSUE_CACHE_TTL_SECONDS,
+    max_weight=ISSUE_CACHE_MAX_BYTES
+)
+
+# Global cache of issue templates, keyed by (version, lookup)
+template_cache = create_cache("templates", TEMPLATE_CACHE_MAX_SIZE, ttl=TEMPLATE_CACHE_TTL_SECONDS)
+
+# Version partitions: "issues" covers issue search and reads, "templates" covers templates,
+# "users" covers the username index
+cache_versions = CacheVersions(create_cache("versions", max_size=64))
@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine, or_, and_
+from sqlalchemy import create_engine, inspect, text, or_, and_
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
 from database_models import Base, User, Issue, Comment, Attachment, UserRole, IssueStatus, IssuePriority
@@ -20,6 +20,38 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 def create_tables():
     """Create all database tables."""
     Base.metadata.create_all(bind=engine)
+    add_missing_columns()
+    add_missing_indexes()
+
+def add_missing_columns():
+    """Add columns introduced after a table was first created.
+
+    create_all() only creates missing tables, so existing databases would
+    otherwise lack new columns. New columns must be nullable or carry a
+    server_default.
+    """
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            
+            existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns:
+                    continue
+                
+                ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(engine.dialect)}"
+                default = getattr(column.server_default, "arg", None)
+                if isinstance(default, str):
+                    ddl += f" DEFAULT '{default}'"
+                connection.execute(text(ddl))
+
+def add_missing_indexes():
+    """Create indexes declared after a table was first created; create_all() skips existing tables."""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
 
 def get_db():
     """Dependency to get database session."""
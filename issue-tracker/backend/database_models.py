@@ -1,12 +1,11 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Enum, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, Enum, Boolean, ForeignKey, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
-from passlib.context import CryptContext
+from password_hasher import pwd_context
 import enum
 
 Base = declarative_base()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 class UserRole(enum.Enum):
     ADMIN = "admin"
@@ -25,6 +24,10 @@ class IssuePriority(enum.Enum):
     HIGH = "high"
     CRITICAL = "critical"
 
+class EmailDelivery(enum.Enum):
+    IMMEDIATE = "immediate"
+    DIGEST = "digest"
+
 class User(Base):
     __tablename__ = "users"
     
@@ -35,6 +38,8 @@ class User(Base):
     hashed_password = Column(String(100), nullable=False)
     role = Column(Enum(UserRole), default=UserRole.REPORTER)
     is_active = Column(Boolean, default=True)
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")  # Bumped to revoke issued tokens
+    email_delivery = Column(Enum(EmailDelivery), nullable=False, default=EmailDelivery.IMMEDIATE, server_default="IMMEDIATE")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
@@ -71,6 +76,7 @@ class Issue(Base):
 
 class Comment(Base):
     __tablename__ = "comments"
+    __table_args__ = (Index("ix_comments_issue_id_created_at", "issue_id", "created_at"),)
     
     id = Column(Integer, primary_key=True, index=True)
     content = Column(Text, nullable=False)
@@ -109,6 +115,7 @@ class NotificationType(enum.Enum):
 
 class Notification(Base):
     __tablename__ = "notifications"
+    __table_args__ = (Index("ix_notifications_user_id_id", "user_id", "id"),)
     
     id = Column(Integer, primary_key=True, index=True)
     type = Column(Enum(NotificationType), nullable=False)
@@ -116,13 +123,28 @@ class Notification(Base):
     message = Column(Text, nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     issue_id = Column(Integer, ForeignKey("issues.id"))
-    is_read = Column(Boolean, default=False)
+    is_read = Column(Boolean, default=False)  # Legacy per-row flag; reads are now recorded in the tables below
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     # Relationships
     user = relationship("User")
     issue = relationship("Issue")
 
+class NotificationWatermark(Base):
+    """Per-user read watermark: every notification with an id up to read_through_id is read."""
+    __tablename__ = "notification_watermarks"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    read_through_id = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class NotificationRead(Base):
+    """A notification above its user's watermark that was read individually."""
+    __tablename__ = "notification_reads"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    notification_id = Column(Integer, ForeignKey("notifications.id"), primary_key=True)
+
 class TimeEntry(Base):
     __tablename__ = "time_entries"
     
@@ -138,6 +160,39 @@ class TimeEntry(Base):
     issue = relationship("Issue")
     user = relationship("User")
 
+class EmailOutboxStatus(enum.Enum):
+    PENDING = "pending"
+    SENDING = "sending"
+    DEAD = "dead"
+
+class EmailOutbox(Base):
+    __tablename__ = "email_outbox"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    to_email = Column(String(100), nullable=False)
+    subject = Column(String(300), nullable=False)
+    body = Column(Text, nullable=False)
+    html_body = Column(Text)
+    status = Column(Enum(EmailOutboxStatus), default=EmailOutboxStatus.PENDING, nullable=False, index=True)
+    attempts = Column(Integer, default=0, nullable=False)
+    next_attempt_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
+    claimed_at = Column(DateTime(timezone=True))
+    last_error = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class EmailDigestEntry(Base):
+    __tablename__ = "email_digest_entries"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    issue_id = Column(Integer, ForeignKey("issues.id"))
+    issue_title = Column(String(200), nullable=False)
+    summary = Column(Text, nullable=False)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    
+    # Relationships
+    user = relationship("User")
+
 class IssueTemplate(Base):
     __tablename__ = "issue_templates"
     
@@ -166,3 +221,14 @@ class CommentMention(Base):
     # Relationships
     comment = relationship("Comment")
     mentioned_user = relationship("User")
+
+class ChangeLog(Base):
+    """One row per create, update or delete of a synced entity; the id is the change-feed cursor."""
+    __tablename__ = "change_log"
+    __table_args__ = {"sqlite_autoincrement": True}  # Never reuse a cursor value
+    
+    id = Column(Integer, primary_key=True)
+    entity = Column(String(20), nullable=False)  # "issue", "comment", "attachment" or "time_entry"
+    entity_id = Column(Integer, nullable=False)
+    deleted = Column(Boolean, nullable=False, default=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -1,238 +1,652 @@
 import smtplib
-from email.mime.text import MimeText
-from email.mime.multipart import MimeMultipart
-from typing import List, Optional
+from email.mime.text import MIMEText
+from email.mime.multipart import MIMEMultipart
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+import html
 import logging
+import random
+import string
+import threading
+import time
 from models import EmailNotification
-from database_models import User, Issue
+from database_models import User, Issue, EmailOutbox, EmailOutboxStatus, EmailDelivery, EmailDigestEntry
+from database import SessionLocal
 
 # Email configuration - Update these with your SMTP settings
 SMTP_SERVER = "smtp.gmail.com"
 SMTP_PORT = 587
-SMTP_USERNAME = "your-email@gmail.com"  # Change this
+SMTP_USE_TLS = True
+SMTP_USERNAME = "your-email@gmail.com"  # Change this (leave empty to skip login)
 SMTP_PASSWORD = "your-app-password"     # Change this
 FROM_EMAIL = "your-email@gmail.com"     # Change this
 
+# Outbox delivery configuration
+SMTP_POOL_SIZE = 2                 # Reused SMTP sessions, one per outbox worker
+SMTP_IDLE_TIMEOUT_SECONDS = 60     # Idle sessions are probed with NOOP before reuse
+OUTBOX_WORKERS = 2
+OUTBOX_BATCH_SIZE = 20
+OUTBOX_POLL_INTERVAL_SECONDS = 5
+OUTBOX_MAX_ATTEMPTS = 5            # Messages are dead-lettered after this many failures
+OUTBOX_BACKOFF_BASE_SECONDS = 30   # Doubles on every failed attempt
+OUTBOX_CLAIM_TIMEOUT_SECONDS = 300 # Claims older than this are assumed lost and retried
+
+# Digest delivery configuration
+EMAIL_DIGEST_WINDOW_SECONDS = 900  # Events are collected for this long before one digest is sent
+EMAIL_DIGEST_CHECK_INTERVAL_SECONDS = 30
+EMAIL_DIGEST_TIME_FORMAT = "%H:%M UTC"  # Entry times are stored in UTC and users have no time zone setting
+
 logger = logging.getLogger(__name__)
 
-class EmailService:
-    def __init__(self):
-        self.smtp_server = SMTP_SERVER
-        self.smtp_port = SMTP_PORT
-        self.username = SMTP_USERNAME
-        self.password = SMTP_PASSWORD
-        self.from_email = FROM_EMAIL
+class EmailTemplate:
+    """A str.format-style template parsed into literal and field parts once, at import.
 
-    def send_email(self, to_email: str, subject: str, body: str, html_body: Optional[str] = None) -> bool:
-        """Send an email."""
-        try:
-            msg = MimeMultipart('alternative')
-            msg['Subject'] = subject
-            msg['From'] = self.from_email
-            msg['To'] = to_email
+    Rendering just joins the parts, so per-message work is limited to the
+    substituted values.
+    """
 
-            # Add plain text part
-            text_part = MimeText(body, 'plain')
-            msg.attach(text_part)
+    def __init__(self, source: str):
+        self._parts = [(literal, field) for literal, field, _, _ in string.Formatter().parse(source)]
 
-            # Add HTML part if provided
-            if html_body:
-                html_part = MimeText(html_body, 'html')
-                msg.attach(html_part)
+    def render(self, **values) -> str:
+        rendered = []
+        for literal, field in self._parts:
+            rendered.append(literal)
+            if field is not None:
+                rendered.append(str(values[field]))
+        return "".join(rendered)
 
-            # Send the email
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls()
-                server.login(self.username, self.password)
-                server.send_message(msg)
+class RenderedEmail:
+    """The shared sections of an event email, rendered once for all recipients."""
 
-            logger.info(f"Email sent successfully to {to_email}")
-            return True
+    def __init__(self, heading: str, text: str, html_body: str):
+        self.text = text
+        self.html_head = HTML_HEAD.render(heading=heading)
+        self.html_body = html_body
 
-        except Exception as e:
-            logger.error(f"Failed to send email to {to_email}: {str(e)}")
-            return False
+    def for_recipient(self, recipient: User) -> Tuple[str, str]:
+        """Add the recipient's salutation to the shared sections."""
+        return (
+            SALUTATION_TEXT.render(name=recipient.full_name) + self.text,
+            self.html_head + SALUTATION_HTML.render(name=recipient.full_name) + self.html_body
+        )
 
-    def send_issue_created_notification(self, issue: Issue, assignee: Optional[User] = None):
-        """Send notification when an issue is created."""
-        if not assignee or not assignee.email:
-            return
+PRIORITY_COLORS = {"critical": "red", "high": "orange"}
 
-        subject = f"New Issue Assigned: {issue.title}"
-        body = f"""
-Hello {assignee.full_name},
+SALUTATION_TEXT = EmailTemplate("""
+Hello {name},
 
-A new issue has been assigned to you:
+""")
 
-Title: {issue.title}
-Priority: {issue.priority.value.title()}
-Status: {issue.status.value.replace('_', ' ').title()}
-Created by: {issue.creator.full_name}
+SALUTATION_HTML = EmailTemplate("""
+    <p>Hello {name},</p>""")
 
-Description:
-{issue.description or 'No description provided'}
+HTML_HEAD = EmailTemplate("""
+<html>
+<body>
+    <h2>{heading}</h2>""")
 
-Please log in to the Issue Tracker to view more details.
+SIGNATURE_TEXT = """
 
 Best regards,
 Issue Tracker System
-        """
-
-        html_body = f"""
-        <html>
-        <body>
-            <h2>New Issue Assigned</h2>
-            <p>Hello {assignee.full_name},</p>
-            <p>A new issue has been assigned to you:</p>
-            
-            <div style="background-color: #f5f5f5; padding: 15px; border-radius: 5px; margin: 15px 0;">
-                <h3>{issue.title}</h3>
-                <p><strong>Priority:</strong> <span style="color: {'red' if issue.priority.value == 'critical' else 'orange' if issue.priority.value == 'high' else 'blue'};">{issue.priority.value.title()}</span></p>
-                <p><strong>Status:</strong> {issue.status.value.replace('_', ' ').title()}</p>
-                <p><strong>Created by:</strong> {issue.creator.full_name}</p>
-                <p><strong>Description:</strong></p>
-                <p>{issue.description or 'No description provided'}</p>
-            </div>
-            
-            <p>Please log in to the Issue Tracker to view more details.</p>
-            <p>Best regards,<br>Issue Tracker System</p>
-        </body>
-        </html>
-        """
+"""
 
-        return self.send_email(assignee.email, subject, body, html_body)
+SIGNATURE_HTML = """
+    <p>Best regards,<br>Issue Tracker System</p>
+</body>
+</html>
+"""
 
-    def send_issue_updated_notification(self, issue: Issue, updated_by: User, changes: dict):
-        """Send notification when an issue is updated."""
-        recipients = []
-        
-        # Notify assignee
-        if issue.assignee and issue.assignee.email:
-            recipients.append(issue.assignee)
-        
-        # Notify creator if different from updater
-        if issue.creator.id != updated_by.id and issue.creator.email:
-            recipients.append(issue.creator)
+ISSUE_CREATED_TEXT = EmailTemplate("""A new issue has been assigned to you:
 
-        if not recipients:
-            return
+Title: {title}
+Priority: {priority}
+Status: {status}
+Created by: {creator}
+
+Description:
+{description}
 
-        # Format changes
-        change_text = []
-        for field, (old_value, new_value) in changes.items():
-            change_text.append(f"- {field.replace('_', ' ').title()}: {old_value} → {new_value}")
+Please log in to the Issue Tracker to view more details.""" + SIGNATURE_TEXT)
 
-        changes_str = "\n".join(change_text)
+ISSUE_CREATED_HTML = EmailTemplate("""
+    <p>A new issue has been assigned to you:</p>
 
-        subject = f"Issue Updated: {issue.title}"
-        
-        for recipient in recipients:
-            body = f"""
-Hello {recipient.full_name},
+    <div style="background-color: #f5f5f5; padding: 15px; border-radius: 5px; margin: 15px 0;">
+        <h3>{title}</h3>
+        <p><strong>Priority:</strong> <span style="color: {priority_color};">{priority}</span></p>
+        <p><strong>Status:</strong> {status}</p>
+        <p><strong>Created by:</strong> {creator}</p>
+        <p><strong>Description:</strong></p>
+        <p>{description}</p>
+    </div>
+
+    <p>Please log in to the Issue Tracker to view more details.</p>""" + SIGNATURE_HTML)
 
-An issue has been updated:
+ISSUE_UPDATED_TEXT = EmailTemplate("""An issue has been updated:
 
-Title: {issue.title}
-Updated by: {updated_by.full_name}
+Title: {title}
+Updated by: {updated_by}
 
 Changes made:
-{changes_str}
+{changes}
 
-Current Status: {issue.status.value.replace('_', ' ').title()}
-Current Priority: {issue.priority.value.title()}
+Current Status: {status}
+Current Priority: {priority}
 
-Please log in to the Issue Tracker to view more details.
+Please log in to the Issue Tracker to view more details.""" + SIGNATURE_TEXT)
 
-Best regards,
-Issue Tracker System
-            """
-
-            html_body = f"""
-            <html>
-            <body>
-                <h2>Issue Updated</h2>
-                <p>Hello {recipient.full_name},</p>
-                <p>An issue has been updated:</p>
-                
-                <div style="background-color: #f5f5f5; padding: 15px; border-radius: 5px; margin: 15px 0;">
-                    <h3>{issue.title}</h3>
-                    <p><strong>Updated by:</strong> {updated_by.full_name}</p>
-                    
-                    <h4>Changes made:</h4>
-                    <ul>
-                        {"".join([f"<li>{field.replace('_', ' ').title()}: <strong>{old_value}</strong> → <strong>{new_value}</strong></li>" for field, (old_value, new_value) in changes.items()])}
-                    </ul>
-                    
-                    <p><strong>Current Status:</strong> {issue.status.value.replace('_', ' ').title()}</p>
-                    <p><strong>Current Priority:</strong> <span style="color: {'red' if issue.priority.value == 'critical' else 'orange' if issue.priority.value == 'high' else 'blue'};">{issue.priority.value.title()}</span></p>
-                </div>
-                
-                <p>Please log in to the Issue Tracker to view more details.</p>
-                <p>Best regards,<br>Issue Tracker System</p>
-            </body>
-            </html>
-            """
+ISSUE_UPDATED_HTML = EmailTemplate("""
+    <p>An issue has been updated:</p>
 
-            self.send_email(recipient.email, subject, body, html_body)
+    <div style="background-color: #f5f5f5; padding: 15px; border-radius: 5px; margin: 15px 0;">
+        <h3>{title}</h3>
+        <p><strong>Updated by:</strong> {updated_by}</p>
 
-    def send_comment_notification(self, issue: Issue, comment_author: User, comment_content: str):
-        """Send notification when a comment is added."""
-        recipients = []
+        <h4>Changes made:</h4>
+        <ul>
+            {changes}
+        </ul>
+
+        <p><strong>Current Status:</strong> {status}</p>
+        <p><strong>Current Priority:</strong> <span style="color: {priority_color};">{priority}</span></p>
+    </div>
+
+    <p>Please log in to the Issue Tracker to view more details.</p>""" + SIGNATURE_HTML)
+
+COMMENT_TEXT = EmailTemplate("""A new comment has been added to an issue:
+
+Issue: {title}
+Comment by: {author}
+
+Comment:
+{content}
+
+Please log in to the Issue Tracker to view the full conversation.""" + SIGNATURE_TEXT)
+
+COMMENT_HTML = EmailTemplate("""
+    <p>A new comment has been added to an issue:</p>
+
+    <div style="background-color: #f5f5f5; padding: 15px; border-radius: 5px; margin: 15px 0;">
+        <h3>{title}</h3>
+        <p><strong>Comment by:</strong> {author}</p>
+
+        <div style="background-color: white; padding: 10px; border-left: 4px solid #007bff; margin: 10px 0;">
+            <p>{content}</p>
+        </div>
+    </div>
+
+    <p>Please log in to the Issue Tracker to view the full conversation.</p>""" + SIGNATURE_HTML)
+
+DIGEST_TEXT = EmailTemplate("""Here is what happened on your issues:
+
+{sections}
+
+Please log in to the Issue Tracker to view more details.""" + SIGNATURE_TEXT)
+
+DIGEST_HTML = EmailTemplate("""
+    <p>Here is what happened on your issues:</p>
+
+    <div style="background-color: #f5f5f5; padding: 15px; border-radius: 5px; margin: 15px 0;">
+        {sections}
+    </div>
+
+    <p>Please log in to the Issue Tracker to view more details.</p>""" + SIGNATURE_HTML)
+
+DIGEST_ISSUE_HTML = EmailTemplate("<h3>{title}</h3><ul>{items}</ul>")
+DIGEST_ITEM_TEXT = EmailTemplate("  - [{time}] {summary}")
+DIGEST_ITEM_HTML = EmailTemplate("<li>[{time}] {summary}</li>")
+
+class SMTPConnectionPool:
+    """Keeps authenticated SMTP sessions open so messages don't each pay for connect, STARTTLS and login."""
+
+    def __init__(self, max_size: int = SMTP_POOL_SIZE):
+        self.max_size = max_size
+        self._idle: List[tuple] = []  # (connection, last_used)
+        self._lock = threading.Lock()
+        self.connections_opened = 0
+
+    def _open(self) -> smtplib.SMTP:
+        connection = smtplib.SMTP(SMTP_SERVER, SMTP_PORT, timeout=30)
+        if SMTP_USE_TLS:
+            connection.starttls()
+        if SMTP_USERNAME:
+            connection.login(SMTP_USERNAME, SMTP_PASSWORD)
+        self.connections_opened += 1
+        return connection
+
+    def acquire(self) -> smtplib.SMTP:
+        """Get a live SMTP session, reusing an idle one when possible."""
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                connection, last_used = self._idle.pop()
+
+            if time.monotonic() - last_used < SMTP_IDLE_TIMEOUT_SECONDS:
+                return connection
+            try:
+                # The server may have dropped a long-idle session
+                if connection.noop()[0] == 250:
+                    return connection
+            except smtplib.SMTPException:
+                pass
+            except OSError:
+                pass
+            self.discard(connection)
+
+        return self._open()
+
+    def release(self, connection: smtplib.SMTP):
+        """Return a healthy session to the pool."""
+        with self._lock:
+            if len(self._idle) < self.max_size:
+                self._idle.append((connection, time.monotonic()))
+                return
+        self.discard(connection)
+
+    def discard(self, connection: smtplib.SMTP):
+        """Close a session that failed or is no longer needed."""
+        try:
+            connection.quit()
+        except Exception:
+            connection.close()
+
+    def close_all(self):
+        """Close every idle session."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection, _ in idle:
+            self.discard(connection)
+
+class EmailService:
+    def __init__(self):
+        self.smtp_server = SMTP_SERVER
+        self.smtp_port = SMTP_PORT
+        self.username = SMTP_USERNAME
+        self.password = SMTP_PASSWORD
+        self.from_email = FROM_EMAIL
+        self.pool = SMTPConnectionPool()
+
+    def enqueue_email(self, db: Session, to_email: str, subject: str, body: str, html_body: Optional[str] = None):
+        """Queue an email in the outbox as part of the caller's transaction."""
+        db.add(EmailOutbox(
+            to_email=to_email,
+            subject=subject,
+            body=body,
+            html_body=html_body,
+            status=EmailOutboxStatus.PENDING,
+            next_attempt_at=datetime.utcnow()
+        ))
+
+    def send_email(self, to_email: str, subject: str, body: str, html_body: Optional[str] = None):
+        """Send an email over a pooled SMTP session. Raises on failure so the outbox can retry."""
+        msg = MIMEMultipart('alternative')
+        msg['Subject'] = subject
+        msg['From'] = self.from_email
+        msg['To'] = to_email
+
+        # Add plain text part
+        text_part = MIMEText(body, 'plain')
+        msg.attach(text_part)
+
+        # Add HTML part if provided
+        if html_body:
+            html_part = MIMEText(html_body, 'html')
+            msg.attach(html_part)
+
+        # Send the email
+        connection = self.pool.acquire()
+        try:
+            connection.send_message(msg)
+        except smtplib.SMTPRecipientsRefused:
+            # The session itself is fine, only this message was rejected
+            self.pool.release(connection)
+            raise
+        except Exception:
+            self.pool.discard(connection)
+            raise
+        self.pool.release(connection)
+
+        logger.info(f"Email sent successfully to {to_email}")
+
+    @staticmethod
+    def wants_digest(recipient: User) -> bool:
+        """Check whether a recipient has opted into digest delivery."""
+        return recipient.email_delivery == EmailDelivery.DIGEST
+
+    def add_digest_entry(self, db: Session, recipient: User, issue: Issue, summary: str):
+        """Buffer an event for the recipient's next digest, as part of the caller's transaction."""
+        db.add(EmailDigestEntry(
+            user_id=recipient.id,
+            issue_id=issue.id,
+            issue_title=issue.title,
+            summary=summary,
+            created_at=datetime.utcnow()
+        ))
+
+    def send_due_digests(self, db: Session) -> int:
+        """Turn every digest whose window has elapsed into one outbox email. Returns how many were queued."""
+        cutoff = datetime.utcnow() - timedelta(seconds=EMAIL_DIGEST_WINDOW_SECONDS)
+        due_users = db.query(EmailDigestEntry.user_id).group_by(EmailDigestEntry.user_id).having(
+            func.min(EmailDigestEntry.created_at) <= cutoff
+        ).all()
         
-        # Notify assignee
-        if issue.assignee and issue.assignee.email and issue.assignee.id != comment_author.id:
-            recipients.append(issue.assignee)
+        queued = 0
+        for (user_id,) in due_users:
+            entries = db.query(EmailDigestEntry).filter(
+                EmailDigestEntry.user_id == user_id
+            ).order_by(EmailDigestEntry.id).all()
+            recipient = db.query(User).filter(User.id == user_id).first()
+            
+            # Deleting first claims the entries; if another worker already took some, back off
+            deleted = db.query(EmailDigestEntry).filter(
+                EmailDigestEntry.id.in_([entry.id for entry in entries])
+            ).delete(synchronize_session=False)
+            if deleted != len(entries):
+                db.rollback()
+                continue
+            
+            if recipient and recipient.email and recipient.is_active:
+                subject, body, html_body = self._render_digest(recipient, entries)
+                self.enqueue_email(db, recipient.email, subject, body, html_body)
+                queued += 1
+            db.commit()
         
-        # Notify creator if different from comment author
-        if issue.creator.id != comment_author.id and issue.creator.email:
-            recipients.append(issue.creator)
+        return queued
 
-        if not recipients:
+    def _render_digest(self, recipient: User, entries: List[EmailDigestEntry]):
+        """Render one email covering all buffered events, grouped per issue."""
+        by_issue: "OrderedDict[Optional[int], List[EmailDigestEntry]]" = OrderedDict()
+        for entry in entries:
+            by_issue.setdefault(entry.issue_id, []).append(entry)
+        
+        text_sections = []
+        html_sections = []
+        for issue_entries in by_issue.values():
+            title = issue_entries[-1].issue_title
+            text_sections.append(title + "\n" + "\n".join(
+                DIGEST_ITEM_TEXT.render(time=entry.created_at.strftime(EMAIL_DIGEST_TIME_FORMAT), summary=entry.summary)
+                for entry in issue_entries
+            ))
+            html_sections.append(DIGEST_ISSUE_HTML.render(title=html.escape(title), items="".join(
+                DIGEST_ITEM_HTML.render(time=entry.created_at.strftime(EMAIL_DIGEST_TIME_FORMAT), summary=html.escape(entry.summary))
+                for entry in issue_entries
+            )))
+        
+        subject = f"Issue Tracker digest: {len(entries)} updates on {len(by_issue)} issues"
+        content = RenderedEmail(
+            "Your Issue Tracker Digest",
+            DIGEST_TEXT.render(sections="\n\n".join(text_sections)),
+            DIGEST_HTML.render(sections="".join(html_sections))
+        )
+        return (subject,) + content.for_recipient(recipient)
+
+    @staticmethod
+    def _load_users(db: Session, user_ids) -> Dict[int, User]:
+        """Load every user involved in an event with a single query."""
+        ids = {user_id for user_id in user_ids if user_id}
+        if not ids:
+            return {}
+        return {user.id: user for user in db.query(User).filter(User.id.in_(ids)).all()}
+
+    def _deliver_to(self, db: Session, recipients: List[User], issue: Issue, subject: str,
+                    content: "RenderedEmail", digest_summary: str):
+        """Queue an event for each recipient, honouring their delivery preference."""
+        for recipient in recipients:
+            if self.wants_digest(recipient):
+                self.add_digest_entry(db, recipient, issue, digest_summary)
+                continue
+            
+            body, html_body = content.for_recipient(recipient)
+            self.enqueue_email(db, recipient.email, subject, body, html_body)
+
+    @staticmethod
+    def _issue_fields(issue: Issue) -> dict:
+        return {
+            "title": issue.title,
+            "status": issue.status.value.replace('_', ' ').title(),
+            "priority": issue.priority.value.title(),
+            "priority_color": PRIORITY_COLORS.get(issue.priority.value, "blue")
+        }
+
+    def send_issue_created_notification(self, db: Session, issue: Issue):
+        """Send notification when an issue is created."""
+        users = self._load_users(db, [issue.assignee_id, issue.creator_id])
+        assignee = users.get(issue.assignee_id)
+        if not assignee or not assignee.email:
             return
 
-        subject = f"New Comment on Issue: {issue.title}"
+        creator_name = users[issue.creator_id].full_name
+        subject = f"New Issue Assigned: {issue.title}"
+        fields = self._issue_fields(issue)
+        description = issue.description or 'No description provided'
+        content = RenderedEmail(
+            "New Issue Assigned",
+            ISSUE_CREATED_TEXT.render(creator=creator_name, description=description, **fields),
+            ISSUE_CREATED_HTML.render(creator=creator_name, description=description, **fields)
+        )
+
+        self._deliver_to(db, [assignee], issue, subject, content, f"Assigned to you by {creator_name}")
+
+    def send_issue_updated_notification(self, db: Session, issue: Issue, updated_by: User, changes: dict):
+        """Send notification when an issue is updated."""
+        # Notify assignee, and creator if different from updater
+        candidate_ids = [issue.assignee_id]
+        if issue.creator_id != updated_by.id:
+            candidate_ids.append(issue.creator_id)
         
-        for recipient in recipients:
-            body = f"""
-Hello {recipient.full_name},
+        users = self._load_users(db, candidate_ids)
+        recipients = [users[user_id] for user_id in dict.fromkeys(candidate_ids)
+                      if user_id in users and users[user_id].email]
+        if not recipients:
+            return
 
-A new comment has been added to an issue:
+        # Format changes once for every recipient
+        change_items = [
+            (field.replace('_', ' ').title(), old_value, new_value)
+            for field, (old_value, new_value) in changes.items()
+        ]
+        changes_text = "\n".join(f"- {field}: {old_value} → {new_value}" for field, old_value, new_value in change_items)
+        changes_html = "".join(
+            f"<li>{field}: <strong>{old_value}</strong> → <strong>{new_value}</strong></li>"
+            for field, old_value, new_value in change_items
+        )
+
+        subject = f"Issue Updated: {issue.title}"
+        fields = self._issue_fields(issue)
+        content = RenderedEmail(
+            "Issue Updated",
+            ISSUE_UPDATED_TEXT.render(updated_by=updated_by.full_name, changes=changes_text, **fields),
+            ISSUE_UPDATED_HTML.render(updated_by=updated_by.full_name, changes=changes_html, **fields)
+        )
+        digest_summary = f"Updated by {updated_by.full_name}: " + "; ".join(
+            f"{field}: {old_value} → {new_value}" for field, old_value, new_value in change_items
+        )
+
+        self._deliver_to(db, recipients, issue, subject, content, digest_summary)
+
+    def send_comment_notification(self, db: Session, issue: Issue, comment_author: User, comment_content: str):
+        """Send notification when a comment is added."""
+        # Notify assignee and creator, except the comment author
+        candidate_ids = [user_id for user_id in (issue.assignee_id, issue.creator_id)
+                         if user_id and user_id != comment_author.id]
+        
+        users = self._load_users(db, candidate_ids)
+        recipients = [users[user_id] for user_id in dict.fromkeys(candidate_ids)
+                      if user_id in users and users[user_id].email]
+        if not recipients:
+            return
 
-Issue: {issue.title}
-Comment by: {comment_author.full_name}
+        subject = f"New Comment on Issue: {issue.title}"
+        content = RenderedEmail(
+            "New Comment Added",
+            COMMENT_TEXT.render(title=issue.title, author=comment_author.full_name, content=comment_content),
+            COMMENT_HTML.render(title=issue.title, author=comment_author.full_name, content=comment_content)
+        )
+        preview = comment_content[:200] + "..." if len(comment_content) > 200 else comment_content
 
-Comment:
-{comment_content}
+        self._deliver_to(db, recipients, issue, subject, content, f"{comment_author.full_name} commented: {preview}")
 
-Please log in to the Issue Tracker to view the full conversation.
+# Global email service instance
+email_service = EmailService()
 
-Best regards,
-Issue Tracker System
-            """
-
-            html_body = f"""
-            <html>
-            <body>
-                <h2>New Comment Added</h2>
-                <p>Hello {recipient.full_name},</p>
-                <p>A new comment has been added to an issue:</p>
+class EmailOutboxWorker:
+    """Background threads that drain the email outbox.
+
+    Messages are claimed with a conditional UPDATE, so several workers (or
+    processes) never send the same row twice. Failures are retried with
+    exponential backoff and dead-lettered after OUTBOX_MAX_ATTEMPTS; dead
+    rows stay in the table for inspection. Sent rows are deleted.
+    """
+
+    def __init__(self, service: EmailService, workers: int = OUTBOX_WORKERS):
+        self.service = service
+        self.workers = workers
+        self._threads: List[threading.Thread] = []
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self.sent = 0
+        self.failed = 0
+        self.dead_lettered = 0
+        self.digests_queued = 0
+
+    def start(self):
+        """Start the worker threads."""
+        self._stopping.clear()
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._run, args=(index,), name=f"email-outbox-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        """Stop the worker threads and close pooled SMTP sessions."""
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout=10)
+        self._threads = []
+        self.service.pool.close_all()
+
+    def notify(self):
+        """Wake the workers after a transaction with new outbox rows has committed."""
+        self._wakeup.set()
+
+    def _run(self, index: int):
+        # One thread per process also turns elapsed digest windows into outbox rows
+        is_digest_thread = index == 0
+        next_digest_check = 0.0
+        while not self._stopping.is_set():
+            if is_digest_thread and time.monotonic() >= next_digest_check:
+                next_digest_check = time.monotonic() + EMAIL_DIGEST_CHECK_INTERVAL_SECONDS
+                try:
+                    self.send_due_digests()
+                except Exception as e:
+                    logger.error(f"Email digest error: {e}")
+
+            try:
+                processed = self.drain_once()
+            except Exception as e:
+                logger.error(f"Email outbox worker error: {e}")
+                processed = 0
+
+            if not processed:
+                self._wakeup.wait(OUTBOX_POLL_INTERVAL_SECONDS)
+                self._wakeup.clear()
+
+    def send_due_digests(self) -> int:
+        """Queue digests whose window has elapsed. Returns how many were queued."""
+        db = SessionLocal()
+        try:
+            queued = self.service.send_due_digests(db)
+        finally:
+            db.close()
+        self.digests_queued += queued
+        return queued
+
+    def drain_once(self) -> int:
+        """Claim and deliver one batch of due messages. Returns how many were processed."""
+        db = SessionLocal()
+        try:
+            now = datetime.utcnow()
+            
+            # Release claims from workers that died mid-send
+            db.query(EmailOutbox).filter(
+                EmailOutbox.status == EmailOutboxStatus.SENDING,
+                EmailOutbox.claimed_at < now - timedelta(seconds=OUTBOX_CLAIM_TIMEOUT_SECONDS)
+            ).update({"status": EmailOutboxStatus.PENDING}, synchronize_session=False)
+            db.commit()
+            
+            candidates = db.query(EmailOutbox.id).filter(
+                EmailOutbox.status == EmailOutboxStatus.PENDING,
+                EmailOutbox.next_attempt_at <= now
+            ).order_by(EmailOutbox.id).limit(OUTBOX_BATCH_SIZE).all()
+            
+            processed = 0
+            for (message_id,) in candidates:
+                if self._stopping.is_set():
+                    break
                 
-                <div style="background-color: #f5f5f5; padding: 15px; border-radius: 5px; margin: 15px 0;">
-                    <h3>{issue.title}</h3>
-                    <p><strong>Comment by:</strong> {comment_author.full_name}</p>
-                    
-                    <div style="background-color: white; padding: 10px; border-left: 4px solid #007bff; margin: 10px 0;">
-                        <p>{comment_content}</p>
-                    </div>
-                </div>
+                claimed = db.query(EmailOutbox).filter(
+                    EmailOutbox.id == message_id,
+                    EmailOutbox.status == EmailOutboxStatus.PENDING
+                ).update({"status": EmailOutboxStatus.SENDING, "claimed_at": now}, synchronize_session=False)
+                db.commit()
+                if not claimed:
+                    continue  # Another worker got it first
                 
-                <p>Please log in to the Issue Tracker to view the full conversation.</p>
-                <p>Best regards,<br>Issue Tracker System</p>
-            </body>
-            </html>
-            """
+                self._deliver(db, db.query(EmailOutbox).filter(EmailOutbox.id == message_id).first())
+                processed += 1
+            
+            return processed
+        finally:
+            db.close()
 
-            self.send_email(recipient.email, subject, body, html_body)
+    def _deliver(self, db: Session, message: EmailOutbox):
+        try:
+            self.service.send_email(message.to_email, message.subject, message.body, message.html_body)
+        except Exception as e:
+            message.attempts += 1
+            message.last_error = str(e)[:1000]
+            self.failed += 1
+            if message.attempts >= OUTBOX_MAX_ATTEMPTS:
+                message.status = EmailOutboxStatus.DEAD
+                self.dead_lettered += 1
+                logger.error(f"Email to {message.to_email} dead-lettered after {message.attempts} attempts: {e}")
+            else:
+                backoff = OUTBOX_BACKOFF_BASE_SECONDS * (2 ** (message.attempts - 1))
+                message.status = EmailOutboxStatus.PENDING
+                message.next_attempt_at = datetime.utcnow() + timedelta(seconds=backoff * random.uniform(0.8, 1.2))
+                logger.warning(f"Failed to send email to {message.to_email} (attempt {message.attempts}): {e}")
+            db.commit()
+            return
+        
+        db.delete(message)
+        db.commit()
+        self.sent += 1
 
-# Global email service instance
-email_service = EmailService()
+    def stats(self) -> dict:
+        """Get delivery metrics and the current outbox backlog."""
+        db = SessionLocal()
+        try:
+            pending = db.query(EmailOutbox).filter(EmailOutbox.status != EmailOutboxStatus.DEAD).count()
+            dead = db.query(EmailOutbox).filter(EmailOutbox.status == EmailOutboxStatus.DEAD).count()
+        finally:
+            db.close()
+        return {
+            "workers": len(self._threads),
+            "pending": pending,
+            "dead": dead,
+            "sent": self.sent,
+            "failed_attempts": self.failed,
+            "dead_lettered": self.dead_lettered,
+            "digests_queued": self.digests_queued,
+            "smtp_connections_opened": self.service.pool.connections_opened
+        }
+
+# Global email outbox worker instance
+email_outbox = EmailOutboxWorker(email_service)
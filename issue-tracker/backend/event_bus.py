@@ -0,0 +1,124 @@
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import asyncio
+import logging
+import queue
+
+# Event bus configuration
+EVENT_BUS_MAX_PENDING = 10000   # Events beyond this are dropped rather than blocking the publisher
+EVENT_BUS_BATCH_SIZE = 200
+EVENT_BUS_LINGER_SECONDS = 0.01  # Short wait after the first event so bursts share a batch
+
+logger = logging.getLogger(__name__)
+
+class RealtimeEvent:
+    """A payload addressed to a set of users, or to the subscribers of a topic."""
+
+    __slots__ = ("user_ids", "payload", "topic")
+
+    def __init__(self, user_ids: List[int], payload: Dict[str, Any], topic: Optional[str] = None):
+        self.user_ids = user_ids
+        self.payload = payload
+        self.topic = topic
+
+class EventBus:
+    """In-process bridge from synchronous service code to the asyncio event loop.
+
+    Services call publish() after their transaction commits; it only enqueues,
+    so the originating request pays no delivery latency. A single consumer
+    task on the event loop drains the queue in batches and hands each batch
+    to the handler registered in start().
+    """
+
+    def __init__(self, max_pending: int = EVENT_BUS_MAX_PENDING):
+        self._queue: "queue.Queue[RealtimeEvent]" = queue.Queue(maxsize=max_pending)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._handler: Optional[Callable[[List[RealtimeEvent]], Awaitable[None]]] = None
+        self.published = 0
+        self.dropped = 0
+        self.batches = 0
+        self.handler_errors = 0
+
+    def publish(self, user_ids: List[int], payload: Dict[str, Any]):
+        """Queue a notification for delivery. Safe to call from any thread."""
+        user_ids = list(dict.fromkeys(user_ids))
+        if user_ids:
+            self._put(RealtimeEvent(user_ids, payload))
+
+    def publish_topic(self, topic: str, payload: Dict[str, Any]):
+        """Queue a live update for the subscribers of a topic. Safe to call from any thread."""
+        self._put(RealtimeEvent([], payload, topic))
+
+    def _put(self, event: RealtimeEvent):
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+            logger.warning(f"Event bus full, dropping {event.payload.get('type')} event")
+            return
+
+        self.published += 1
+        if self._loop is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._wakeup.set)
+            except RuntimeError:
+                pass  # Loop already closed during shutdown
+
+    async def start(self, handler: Callable[[List[RealtimeEvent]], Awaitable[None]]):
+        """Start consuming events on the running loop."""
+        self._handler = handler
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._wakeup.set()  # Deliver anything published before startup
+        self._task = asyncio.create_task(self._consume())
+
+    async def stop(self):
+        """Stop the consumer task."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._loop = None
+        self._task = None
+
+    async def _consume(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            await asyncio.sleep(EVENT_BUS_LINGER_SECONDS)
+
+            while True:
+                batch = self._take_batch()
+                if not batch:
+                    break
+                self.batches += 1
+                try:
+                    await self._handler(batch)
+                except Exception as e:
+                    self.handler_errors += 1
+                    logger.error(f"Error delivering {len(batch)} events: {e}")
+
+    def _take_batch(self) -> List[RealtimeEvent]:
+        batch = []
+        while len(batch) < EVENT_BUS_BATCH_SIZE:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def stats(self) -> Dict[str, Any]:
+        """Get throughput and queue-depth metrics."""
+        return {
+            "queue_depth": self._queue.qsize(),
+            "published": self.published,
+            "dropped": self.dropped,
+            "batches": self.batches,
+            "handler_errors": self.handler_errors
+        }
+
+# Global event bus instance
+event_bus = EventBus()
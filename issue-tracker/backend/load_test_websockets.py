@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+Load-test WebSocket fan-out: open many connections, trigger notification bursts,
+and report delivery latency, server memory per connection and drops.
+With --sse the connections are Server-Sent Events streams instead, to compare
+their memory per connection with WebSockets.
+
+Every connection subscribes to the topic of a scratch issue; each comment
+posted on it is delivered to all of them as a comment_created update, through
+the same service, event bus and pub/sub path as production traffic. Latency is
+measured from just before the comment is posted to when a client receives it.
+Connections authenticate as a pool of load-test users (loadtest_0, loadtest_1,
+...), registered on first use and logged in for real tokens, spread round-robin.
+
+By default a server is started on a free local port from this directory;
+pass --url to target one that is already running (--server-pid then enables
+the memory figure). Clients run in this process, so with many thousands of
+connections part of the measured latency is client-side scheduling.
+
+    python load_test_websockets.py --connections 2000 --bursts 5 --burst-size 20
+    python load_test_websockets.py --connections 2000 --sse
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from typing import Dict, List, Optional, Tuple
+
+import websockets
+
+import binary_codec
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", help="Base URL of a running server, e.g. http://localhost:8000")
+    parser.add_argument("--server-pid", type=int, help="Process id of the --url server, to measure its memory")
+    parser.add_argument("--connections", type=int, default=1000)
+    parser.add_argument("--connect-concurrency", type=int, default=200, help="Handshakes in flight at once")
+    parser.add_argument("--bursts", type=int, default=5)
+    parser.add_argument("--burst-size", type=int, default=10, help="Comments posted concurrently per burst")
+    parser.add_argument("--interval", type=float, default=1.0, help="Seconds between bursts")
+    parser.add_argument("--drain", type=float, default=3.0, help="Seconds to wait for deliveries after the last burst")
+    parser.add_argument("--coalesce-ms", type=int, help="Request coalesced array frames")
+    parser.add_argument("--binary", action="store_true", help="Use the MessagePack subprotocol")
+    parser.add_argument("--sse", action="store_true", help="Open Server-Sent Events streams instead of WebSockets")
+    parser.add_argument("--no-deflate", action="store_true", help="Do not negotiate permessage-deflate")
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--password", default="admin123")
+    parser.add_argument("--users", type=int, default=10, help="Load-test users the connections are spread across")
+    parser.add_argument("--user-password", default="loadtest123", help="Password of the load-test users")
+    return parser.parse_args()
+
+class Api:
+    """Minimal JSON client for the REST endpoints; calls block, so run them in a thread."""
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url.rstrip("/")
+        self.token: Optional[str] = None
+
+    def request(self, method: str, path: str, body: Optional[dict] = None) -> dict:
+        headers = {"Content-Type": "application/json"}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        data = json.dumps(body).encode() if body is not None else None
+        request = urllib.request.Request(self.base_url + path, data=data, headers=headers, method=method)
+        with urllib.request.urlopen(request, timeout=30) as response:
+            return json.loads(response.read() or b"null")
+
+    def login(self, username: str, password: str) -> dict:
+        """Log in, waiting out login rate limiting, and return the user."""
+        while True:
+            try:
+                response = self.request("POST", "/auth/login", {"username": username, "password": password})
+            except urllib.error.HTTPError as e:
+                if e.code != 429:
+                    raise
+                time.sleep(int(e.headers.get("Retry-After", "1")))
+                continue
+            self.token = response["access_token"]
+            return response["user"]
+
+def test_user_session(base_url: str, index: int, password: str) -> Tuple[int, str]:
+    """Register load-test user number index unless it exists, log in, and return its id and token."""
+    api = Api(base_url)
+    username = f"loadtest_{index}"
+    try:
+        api.request("POST", "/auth/register", {
+            "username": username, "email": f"{username}@example.com",
+            "full_name": f"Load Test {index}", "password": password
+        })
+    except urllib.error.HTTPError as e:
+        if e.code != 400:  # 400 means it was registered by an earlier run
+            raise
+    user = api.login(username, password)
+    return user["id"], api.token
+
+def server_rss(pid: Optional[int]) -> Optional[int]:
+    """Resident memory of a process in bytes, where /proc is available."""
+    if pid is None:
+        return None
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def raise_file_limit():
+    """Allow as many sockets as the hard limit permits."""
+    if resource is not None:
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if soft < hard:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+def start_server() -> Tuple[subprocess.Popen, str]:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    for _ in range(300):
+        try:
+            urllib.request.urlopen(base_url + "/health", timeout=1)
+            return process, base_url
+        except (urllib.error.URLError, ConnectionError):
+            if process.poll() is not None:
+                raise SystemExit("Server exited during startup")
+            time.sleep(0.1)
+    process.terminate()
+    raise SystemExit("Server did not start")
+
+class LoadClient:
+    """One WebSocket connection; records when each marked comment arrives."""
+
+    def __init__(self, args, url: str, topic: str):
+        self.args = args
+        self.url = url
+        self.topic = topic
+        self.subscribed = asyncio.Event()
+        self.received: Dict[str, float] = {}
+        self.failed = False
+        self.closed_code: Optional[int] = None
+
+    def messages(self, frame) -> list:
+        if isinstance(frame, bytes):
+            items = binary_codec.unpackb(frame)
+            items = items if isinstance(items[0], list) else [items]
+            return [binary_codec.decode_frame(binary_codec.packb(item)) for item in items]
+        message = json.loads(frame)
+        return message if isinstance(message, list) else [message]
+
+    async def run(self, connect_slots: asyncio.Semaphore):
+        subprotocols = [binary_codec.SUBPROTOCOL] if self.args.binary else None
+        try:
+            async with connect_slots:
+                websocket = await websockets.connect(
+                    self.url, subprotocols=subprotocols, open_timeout=60,
+                    compression=None if self.args.no_deflate else "deflate", ping_interval=None
+                )
+                await websocket.send(json.dumps({"action": "subscribe", "topic": self.topic}))
+        except (OSError, asyncio.TimeoutError, websockets.WebSocketException):
+            self.failed = True
+            self.subscribed.set()
+            return
+
+        try:
+            async for frame in websocket:
+                now = time.monotonic()
+                for message in self.messages(frame):
+                    message_type = message.get("type")
+                    if message_type == "comment_created":
+                        self.received[message["data"]["content"]] = now
+                    elif message_type == "ping":
+                        ts = message.get("data", message)["ts"]  # Control messages have no envelope in JSON
+                        await websocket.send(json.dumps({"action": "pong", "ts": ts}))
+                    elif message_type in ("subscribed", "subscribe_rejected"):
+                        self.subscribed.set()
+        except websockets.ConnectionClosed as e:
+            self.closed_code = e.code
+        finally:
+            self.subscribed.set()
+            await websocket.close()
+
+class SseLoadClient(LoadClient):
+    """One Server-Sent Events stream over a raw HTTP/1.1 connection; records when each marked comment arrives."""
+
+    @staticmethod
+    async def read_chunk(reader: asyncio.StreamReader) -> bytes:
+        size = int((await reader.readline()).split(b";")[0], 16)
+        return (await reader.readexactly(size + 2))[:-2]
+
+    async def run(self, connect_slots: asyncio.Semaphore):
+        url = urllib.parse.urlsplit(self.url)
+        try:
+            async with connect_slots:
+                reader, writer = await asyncio.wait_for(asyncio.open_connection(url.hostname, url.port), 60)
+                writer.write(f"GET {url.path}?{url.query} HTTP/1.1\r\nHost: {url.netloc}\r\n"
+                             f"Accept: text/event-stream\r\n\r\n".encode())
+                status = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), 60)
+                if b" 200 " not in status.split(b"\r\n", 1)[0]:
+                    raise ConnectionError(status.split(b"\r\n", 1)[0].decode())
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+            self.failed = True
+            self.subscribed.set()
+            return
+
+        buffer = ""
+        try:
+            while True:
+                chunk = await self.read_chunk(reader)
+                if not chunk:
+                    self.closed_code = 0
+                    break
+                now = time.monotonic()
+                buffer += chunk.decode()
+                *events, buffer = buffer.split("\n\n")
+                for event in events:
+                    data = "".join(line[6:] for line in event.split("\n") if line.startswith("data: "))
+                    if not data:
+                        continue
+                    for message in self.messages(data):
+                        if message.get("type") == "comment_created":
+                            self.received[message["data"]["content"]] = now
+                        elif message.get("type") == "hello":
+                            self.subscribed.set()  # Topics are subscribed before the stream starts
+        except (OSError, asyncio.IncompleteReadError, ValueError):
+            self.closed_code = 0
+        finally:
+            self.subscribed.set()
+            writer.close()
+
+async def post_burst(api: Api, issue_id: int, markers: List[str], sent: Dict[str, float]) -> int:
+    async def post(marker: str) -> bool:
+        sent[marker] = time.monotonic()
+        try:
+            await asyncio.to_thread(api.request, "POST", "/comments", {"content": marker, "issue_id": issue_id})
+            return True
+        except (urllib.error.URLError, OSError):
+            del sent[marker]
+            return False
+    return sum(await asyncio.gather(*(post(marker) for marker in markers)))
+
+async def main():
+    args = parse_args()
+    raise_file_limit()
+    process = None
+    if args.url:
+        base_url, server_pid = args.url.rstrip("/"), args.server_pid
+    else:
+        process, base_url = start_server()
+        server_pid = process.pid
+
+    try:
+        api = Api(base_url)
+        await asyncio.to_thread(api.login, args.username, args.password)
+        issue = await asyncio.to_thread(api.request, "POST", "/issues", {"title": "WebSocket load test", "description": "Scratch issue"})
+        topic = f"issue:{issue['id']}"
+        metrics_before = (await asyncio.to_thread(api.request, "GET", "/metrics"))["websockets"]
+        rss_before = server_rss(server_pid)
+
+        sessions = await asyncio.gather(*(
+            asyncio.to_thread(test_user_session, base_url, i, args.user_password)
+            for i in range(max(1, min(args.users, args.connections)))
+        ))
+        if args.sse:
+            urls = [f"{base_url}/notifications/stream?token={urllib.parse.quote(token)}&topics={topic}"
+                    for _, token in sessions]
+        else:
+            ws_base = base_url.replace("http", "ws", 1)
+            coalesce = f"&coalesce_ms={args.coalesce_ms}" if args.coalesce_ms else ""
+            urls = [f"{ws_base}/ws/{user_id}?token={urllib.parse.quote(token)}{coalesce}" for user_id, token in sessions]
+        client_class = SseLoadClient if args.sse else LoadClient
+        clients = [client_class(args, urls[i % len(urls)], topic) for i in range(args.connections)]
+        connect_slots = asyncio.Semaphore(args.connect_concurrency)
+        start = time.monotonic()
+        tasks = [asyncio.create_task(client.run(connect_slots)) for client in clients]
+        await asyncio.gather(*(client.subscribed.wait() for client in clients))
+        connect_seconds = time.monotonic() - start
+        connected = [client for client in clients if not client.failed]
+        await asyncio.sleep(1)
+        rss_connected = server_rss(server_pid)
+
+        run_id = f"{random.getrandbits(32):08x}"
+        sent: Dict[str, float] = {}
+        posted = 0
+        for burst in range(args.bursts):
+            markers = [f"load {run_id} {burst}-{i}" for i in range(args.burst_size)]
+            posted += await post_burst(api, issue["id"], markers, sent)
+            await asyncio.sleep(args.interval)
+        await asyncio.sleep(args.drain)
+
+        metrics_after = (await asyncio.to_thread(api.request, "GET", "/metrics"))["websockets"]
+        latencies = [received - sent[marker] for client in connected
+                     for marker, received in client.received.items() if marker in sent]
+        expected = posted * len(connected)
+
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await asyncio.to_thread(api.request, "DELETE", f"/issues/{issue['id']}")
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    if args.sse:
+        transport = "Server-Sent Events"
+    else:
+        transport = (f"WebSocket, {'msgpack' if args.binary else 'json'}, deflate {'off' if args.no_deflate else 'on'}, "
+                     f"coalesce_ms {args.coalesce_ms or 'off'}")
+    print(f"Connections: {len(connected)}/{args.connections} opened in {connect_seconds:.1f} s as {len(sessions)} users "
+          f"({transport})")
+    print(f"Comments posted: {posted} in {args.bursts} bursts of {args.burst_size}")
+    print(f"Deliveries: {len(latencies)}/{expected}, missing {expected - len(latencies)}")
+    if latencies:
+        print("Latency ms: " + ", ".join(
+            f"p{int(fraction * 100)} {percentile(latencies, fraction) * 1000:.1f}" for fraction in (0.5, 0.9, 0.99)
+        ) + f", max {max(latencies) * 1000:.1f}")
+    if rss_before is not None and rss_connected is not None and connected:
+        print(f"Server memory: {(rss_connected - rss_before) / len(connected) / 1024:.1f} KiB per connection (RSS)")
+    for counter in ("messages_dropped", "slow_consumer_disconnects", "send_errors", "idle_disconnects"):
+        print(f"Server {counter}: {metrics_after[counter] - metrics_before[counter]}")
+    closed = sum(1 for client in connected if client.closed_code is not None)
+    if closed:
+        print(f"Connections closed by the server: {closed}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,16 +1,17 @@
-from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, Form, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, Form, WebSocket, WebSocketDisconnect, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from fastapi.security import HTTPBearer
 from sqlalchemy.orm import Session
 from datetime import timedelta
+from typing import Optional
 import math
 import os
 import json
 
 from models import (
     # User models
-    User, UserCreate, UserUpdate, UserLogin, Token, UserResponse,
+    User, UserCreate, UserUpdate, UserLogin, Token, UserResponse, UserSuggestionResponse,
     # Issue models
     Issue, IssueCreate, IssueUpdate, IssueResponse,
     # Comment models
@@ -25,6 +26,8 @@ from models import (
     IssueTemplate, IssueTemplateCreate, IssueTemplateUpdate, IssueTemplateResponse,
     # Search models
     SearchFilters,
+    # Change feed models
+    ChangeFeedResponse,
     # Response models
     HealthResponse, MessageResponse,
     # Enums
@@ -32,15 +35,21 @@ from models import (
 )
 from database import get_db, init_database
 from auth import (
-    create_access_token, get_current_active_user, require_admin, 
-    require_manager_or_admin, ACCESS_TOKEN_EXPIRE_MINUTES
+    authenticate_stream, create_user_access_token, get_current_active_user, get_current_user_profile,
+    get_stream_user, require_admin, require_manager_or_admin, token_versions, ACCESS_TOKEN_EXPIRE_MINUTES
 )
 from services import (
     UserService, IssueService, CommentService, AttachmentService,
-    NotificationService, TimeTrackingService, IssueTemplateService, MentionService
+    NotificationService, TimeTrackingService, IssueTemplateService, MentionService, ChangeLogService
 )
-from websocket_manager import manager
+from websocket_manager import manager, EventStreamResponse, WS_POLICY_VIOLATION_CLOSE_CODE
 from auth import verify_token
+from cache import user_cache, search_cache, issue_cache, template_cache
+from password_hasher import password_hasher
+from rate_limit import login_admission
+from email_service import email_outbox
+from event_bus import event_bus
+from user_index import username_index
 
 # Initialize database
 init_database()
@@ -62,6 +71,22 @@ app.add_middleware(
 
 security = HTTPBearer()
 
+@app.on_event("startup")
+async def start_workers():
+    """Start background workers"""
+    email_outbox.start()
+    manager.topic_authorizer = IssueService.can_view_topic
+    await manager.start()
+    await event_bus.start(NotificationService.deliver_events)
+
+@app.on_event("shutdown")
+async def shutdown_workers():
+    """Stop background worker pools"""
+    await event_bus.stop()
+    await manager.stop()
+    email_outbox.stop()
+    password_hasher.shutdown()
+
 # Health Check
 @app.get("/health", response_model=HealthResponse)
 async def health_check():
@@ -72,30 +97,52 @@ async def health_check():
 @app.post("/auth/register", response_model=User)
 async def register(user_data: UserCreate, db: Session = Depends(get_db)):
     """Register a new user"""
-    return UserService.create_user(db, user_data)
+    return await UserService.create_user(db, user_data)
 
 @app.post("/auth/login", response_model=Token)
-async def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
+async def login(user_credentials: UserLogin, request: Request, db: Session = Depends(get_db)):
     """Login user and return access token"""
-    user = UserService.authenticate_user(db, user_credentials.username, user_credentials.password)
+    # Shed floods with a fast 429 before spending a bcrypt verification on them
+    client_ip = request.client.host if request.client else "unknown"
+    login_admission.check(client_ip, user_credentials.username)
+    
+    user = await UserService.authenticate_user(db, user_credentials.username, user_credentials.password)
     if not user:
+        login_admission.record_failure(client_ip, user_credentials.username)
         raise HTTPException(status_code=401, detail="Invalid username or password")
     
     if not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
-    )
+    access_token = create_user_access_token(user, expires_delta=access_token_expires)
     
     return Token(access_token=access_token, user=user)
 
 @app.get("/auth/me", response_model=User)
-async def get_current_user_info(current_user: User = Depends(get_current_active_user)):
+async def get_current_user_info(current_user: User = Depends(get_current_user_profile)):
     """Get current user information"""
     return current_user
 
+@app.get("/metrics")
+async def get_metrics(current_user: User = Depends(require_admin)):
+    """Get runtime cache and worker pool metrics (Admin only)"""
+    return {
+        "caches": {
+            "users": user_cache.stats(),
+            "issue_search": search_cache.stats(),
+            "issues": issue_cache.stats(),
+            "templates": template_cache.stats(),
+            "token_versions": token_versions.stats()
+        },
+        "username_index": username_index.stats(),
+        "password_hasher": password_hasher.stats(),
+        "login_admission": login_admission.stats(),
+        "email_outbox": email_outbox.stats(),
+        "event_bus": event_bus.stats(),
+        "websockets": manager.stats()
+    }
+
 # User Management Endpoints
 @app.get("/users", response_model=UserResponse)
 async def get_users(
@@ -108,6 +155,18 @@ async def get_users(
     users = UserService.get_users(db, skip=skip, limit=limit)
     return UserResponse(users=users, total=len(users))
 
+@app.get("/users/suggest", response_model=UserSuggestionResponse)
+async def suggest_users(
+    prefix: str = "",
+    limit: int = 10,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Get active users whose username starts with a prefix, for @mention autocomplete"""
+    return UserSuggestionResponse(users=[
+        user._asdict() for user in username_index.suggest(db, prefix, limit)
+    ])
+
 @app.get("/users/{user_id}", response_model=User)
 async def get_user(
     user_id: int, 
@@ -154,7 +213,7 @@ async def get_issue(
     current_user: User = Depends(get_current_active_user)
 ):
     """Get a specific issue by ID"""
-    issue = IssueService.get_issue_by_id(db, issue_id)
+    issue = IssueService.get_issue_cached(db, issue_id)
     if not issue:
         raise HTTPException(status_code=404, detail="Issue not found")
     return issue
@@ -164,13 +223,13 @@ async def update_issue(
     issue_id: int, 
     issue_update: IssueUpdate, 
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_user_profile)
 ):
     """Update an existing issue"""
     issue = IssueService.update_issue(db, issue_id, issue_update, current_user)
     if not issue:
         raise HTTPException(status_code=404, detail="Issue not found")
-    return issue
+    return IssueService.serialize_issue(db, issue)
 
 @app.delete("/issues/{issue_id}", response_model=MessageResponse)
 async def delete_issue(
@@ -211,7 +270,7 @@ async def search_issues(
         sort_order=sort_order
     )
     
-    issues, total = IssueService.search_issues(db, filters)
+    issues, total = IssueService.search_issues_cached(db, filters)
     total_pages = math.ceil(total / page_size)
     
     return IssueResponse(
@@ -235,12 +294,33 @@ async def create_comment(
 @app.get("/issues/{issue_id}/comments", response_model=CommentResponse)
 async def get_issue_comments(
     issue_id: int, 
+    cursor: Optional[str] = None,
+    limit: int = CommentService.DEFAULT_PAGE_SIZE,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Get a page of comments for an issue; pass next_cursor back to get the following page"""
+    comments, next_cursor = CommentService.get_comments_page(db, issue_id, cursor, limit)
+    return CommentResponse(
+        comments=comments,
+        total=CommentService.count_comments(db, issue_id),
+        next_cursor=next_cursor
+    )
+
+@app.get("/issues/{issue_id}/comments/export")
+async def export_issue_comments(
+    issue_id: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    """Get all comments for an issue"""
-    comments = CommentService.get_comments_by_issue(db, issue_id)
-    return CommentResponse(comments=comments, total=len(comments))
+    """Stream every comment of an issue as newline-delimited JSON"""
+    if not IssueService.get_issue_by_id(db, issue_id):
+        raise HTTPException(status_code=404, detail="Issue not found")
+    return StreamingResponse(
+        CommentService.export_comments(issue_id),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="issue-{issue_id}-comments.ndjson"'}
+    )
 
 @app.put("/comments/{comment_id}", response_model=Comment)
 async def update_comment(
@@ -310,18 +390,59 @@ async def delete_attachment(
         raise HTTPException(status_code=404, detail="Attachment not found")
     return MessageResponse(message="Attachment deleted successfully")
 
+# Change Feed Endpoints
+@app.get("/changes", response_model=ChangeFeedResponse)
+async def get_changes(
+    since: Optional[int] = None,
+    limit: int = 500,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Issues, comments, attachments and time entries changed since a cursor.
+    
+    Without since, only the current cursor is returned: take it before a full
+    load, then poll with ?since=<cursor> and apply the changes and tombstones.
+    Follow the returned cursor while has_more is true.
+    """
+    if since is None:
+        return ChangeFeedResponse(changes=[], cursor=ChangeLogService.current_cursor(db))
+    changes, cursor, has_more = ChangeLogService.get_changes(db, since, limit)
+    return ChangeFeedResponse(changes=changes, cursor=cursor, has_more=has_more)
+
 # WebSocket Endpoints
 @app.websocket("/ws/{user_id}")
-async def websocket_endpoint(websocket: WebSocket, user_id: int):
-    """WebSocket endpoint for real-time notifications."""
-    await manager.connect(websocket, user_id)
+async def websocket_endpoint(websocket: WebSocket, user_id: int, token: Optional[str] = None,
+                             coalesce_ms: Optional[int] = None, last_seq: Optional[int] = None):
+    """WebSocket endpoint for real-time notifications.
+    
+    Authenticate with ?token=<access token> (browsers cannot set headers on a
+    WebSocket) or an Authorization header; the token must belong to user_id.
+    Pass ?coalesce_ms=25 to receive events batched into array frames, and offer
+    the "issuetracker.msgpack.v1" subprotocol to receive compact binary frames.
+    After a reconnect, pass ?last_seq=N to receive only the missed notifications.
+    """
+    authorization = websocket.headers.get("authorization", "")
+    if authorization.lower().startswith("bearer "):
+        token = authorization[7:]
+    try:
+        principal = authenticate_stream(token)
+    except HTTPException:
+        principal = None
+    if principal is None or principal.id != user_id:
+        # Rejected before the handshake completes, so nothing is accepted or replayed
+        await websocket.close(code=WS_POLICY_VIOLATION_CLOSE_CODE)
+        return
+    
+    connection = await manager.connect(websocket, user_id, coalesce_ms, last_seq, authenticated=True)
     try:
         while True:
-            # Keep connection alive and listen for messages
+            # Pongs for the server heartbeat and topic subscriptions,
+            # e.g. {"action": "subscribe", "topic": "issue:42"}
             data = await websocket.receive_text()
-            # Echo back for heartbeat
-            await websocket.send_text(f"Connected as user {user_id}")
+            manager.handle_client_message(connection, data)
     except WebSocketDisconnect:
+        pass
+    finally:
         manager.disconnect(websocket, user_id)
 
 # Notification Endpoints
@@ -337,6 +458,27 @@ async def get_notifications(
     unread_count = NotificationService.get_unread_count(db, current_user.id)
     return NotificationResponse(notifications=notifications, total=total, unread_count=unread_count)
 
+@app.get("/notifications/stream")
+async def stream_notifications(
+    request: Request,
+    topics: Optional[str] = None,
+    last_event_id: Optional[int] = None,
+    current_user: User = Depends(get_stream_user)
+):
+    """Server-Sent Events stream of real-time notifications.
+    
+    Carries the same messages as the WebSocket endpoint. Browsers reconnect
+    with the Last-Event-ID header and receive only what they missed; pass
+    ?topics=issue:1,issue:2 to also receive live issue updates.
+    """
+    header = request.headers.get("last-event-id")
+    if header and header.isdigit():
+        last_event_id = int(header)
+    topic_list = [topic for topic in (topics or "").split(",") if topic]
+    
+    connection = manager.open_stream(current_user.id, last_event_id, topic_list, authenticated=True)
+    return EventStreamResponse(manager, connection, headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 @app.put("/notifications/{notification_id}/read", response_model=Notification)
 async def mark_notification_read(
     notification_id: int,
@@ -433,7 +575,7 @@ async def get_templates(
     current_user: User = Depends(get_current_active_user)
 ):
     """Get issue templates."""
-    templates = IssueTemplateService.get_templates(db, skip, limit, active_only)
+    templates = IssueTemplateService.get_templates_cached(db, skip, limit, active_only)
     return IssueTemplateResponse(templates=templates, total=len(templates))
 
 @app.get("/templates/{template_id}", response_model=IssueTemplate)
@@ -443,7 +585,7 @@ async def get_template(
     current_user: User = Depends(get_current_active_user)
 ):
     """Get a template by ID."""
-    template = IssueTemplateService.get_template_by_id(db, template_id)
+    template = IssueTemplateService.get_template_cached(db, template_id)
     if not template:
         raise HTTPException(status_code=404, detail="Template not found")
     return template
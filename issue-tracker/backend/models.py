@@ -20,6 +20,10 @@ class IssuePriority(str, Enum):
     HIGH = "high"
     CRITICAL = "critical"
 
+class EmailDelivery(str, Enum):
+    IMMEDIATE = "immediate"
+    DIGEST = "digest"
+
 # User Models
 class UserBase(BaseModel):
     username: str = Field(..., min_length=3, max_length=50)
@@ -36,16 +40,25 @@ class UserUpdate(BaseModel):
     full_name: Optional[str] = Field(None, min_length=1, max_length=100)
     role: Optional[UserRole] = None
     is_active: Optional[bool] = None
+    email_delivery: Optional[EmailDelivery] = None
 
 class User(UserBase):
     id: int
     is_active: bool
+    email_delivery: EmailDelivery = EmailDelivery.IMMEDIATE
     created_at: datetime
     updated_at: datetime
 
     class Config:
         from_attributes = True
 
+class UserPrincipal(BaseModel):
+    """Identity carried in the signed access token claims."""
+    id: int
+    username: str
+    role: UserRole
+    is_active: bool = True
+
 class UserLogin(BaseModel):
     username: str
     password: str
@@ -117,7 +130,9 @@ class Issue(IssueBase):
     creator_id: int
     creator: User
     assignee: Optional[User] = None
-    comments: List[Comment] = []
+    comments: List[Comment] = []  # First page only; fetch the rest from comments_cursor
+    comment_count: int = 0
+    comments_cursor: Optional[str] = None
     attachments: List[Attachment] = []
     created_at: datetime
     updated_at: datetime
@@ -164,9 +179,18 @@ class UserResponse(BaseModel):
     users: List[User]
     total: int
 
+class UserSuggestion(BaseModel):
+    id: int
+    username: str
+    full_name: str
+
+class UserSuggestionResponse(BaseModel):
+    users: List[UserSuggestion]
+
 class CommentResponse(BaseModel):
     comments: List[Comment]
     total: int
+    next_cursor: Optional[str] = None
 
 # Notification Models
 class NotificationType(str, Enum):
@@ -278,3 +302,16 @@ class TimeEntryResponse(BaseModel):
 class IssueTemplateResponse(BaseModel):
     templates: List[IssueTemplate]
     total: int
+
+# Change feed models
+class Change(BaseModel):
+    entity: str
+    id: int
+    seq: int
+    deleted: bool = False
+    data: Optional[dict] = None  # Current column values; None for deletions
+
+class ChangeFeedResponse(BaseModel):
+    changes: List[Change]
+    cursor: int
+    has_more: bool = False
@@ -0,0 +1,103 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+from fastapi import HTTPException
+from passlib.context import CryptContext
+import asyncio
+import threading
+import time
+
+# Password hashing configuration
+BCRYPT_ROUNDS = 12
+PASSWORD_HASH_WORKERS = 4
+PASSWORD_HASH_MAX_QUEUE = 64  # Requests allowed to wait for a worker before rejecting
+
+# Hashes created with a different cost than BCRYPT_ROUNDS are reported as
+# needing an update, so changing the setting re-hashes users on their next login
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=BCRYPT_ROUNDS,
+    bcrypt__min_desired_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_desired_rounds=BCRYPT_ROUNDS
+)
+
+class PasswordHasher:
+    """Runs bcrypt in a bounded thread pool so it never blocks the event loop.
+
+    bcrypt releases the GIL while hashing, so a small thread pool gives real
+    parallelism. At most max_workers hashes run at once and at most max_queue
+    more may wait; anything beyond that is rejected with a 503 straight away
+    instead of piling up behind a login burst.
+    """
+
+    def __init__(self, max_workers: int = PASSWORD_HASH_WORKERS, max_queue: int = PASSWORD_HASH_MAX_QUEUE):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="password-hasher")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.peak_queue_depth = 0
+        self._total_wait = 0.0
+        self._total_run = 0.0
+
+    def _timed(self, func, submitted_at: float, *args):
+        started_at = time.perf_counter()
+        with self._lock:
+            self._running += 1
+            self._total_wait += started_at - submitted_at
+        try:
+            return func(*args)
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._total_run += time.perf_counter() - started_at
+
+    async def _submit(self, func, *args):
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise HTTPException(status_code=503, detail="Server busy, please retry shortly")
+            self._pending += 1
+            self.peak_queue_depth = max(self.peak_queue_depth, self._pending - self.max_workers)
+
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, self._timed, func, time.perf_counter(), *args)
+        finally:
+            with self._lock:
+                self._pending -= 1
+                self.completed += 1
+
+    async def hash(self, password: str) -> str:
+        """Hash a password with the configured bcrypt cost."""
+        return await self._submit(pwd_context.hash, password)
+
+    async def verify_and_update(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """Verify a password; also return a new hash if the stored one uses outdated settings."""
+        return await self._submit(pwd_context.verify_and_update, password, hashed_password)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get concurrency and queue-depth metrics."""
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "running": self._running,
+                "queue_depth": max(self._pending - self._running, 0),
+                "peak_queue_depth": self.peak_queue_depth,
+                "max_queue": self.max_queue,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "avg_wait_ms": self._total_wait / self.completed * 1000 if self.completed else 0.0,
+                "avg_hash_ms": self._total_run / self.completed * 1000 if self.completed else 0.0,
+                "bcrypt_rounds": BCRYPT_ROUNDS
+            }
+
+    def shutdown(self):
+        """Stop the worker threads."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+# Global password hasher instance
+password_hasher = PasswordHasher()
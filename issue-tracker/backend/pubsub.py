@@ -0,0 +1,222 @@
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+# Pub/sub configuration
+PUBSUB_BACKEND = "memory"  # "memory" for a single process, "sqlite" to fan out across uvicorn workers
+PUBSUB_SQLITE_PATH = "./pubsub.db"
+PUBSUB_POLL_INTERVAL_SECONDS = 0.02
+PUBSUB_FETCH_LIMIT = 500
+PUBSUB_RETENTION_SECONDS = 300
+PUBSUB_PRUNE_INTERVAL_SECONDS = 30
+
+logger = logging.getLogger(__name__)
+
+def boot_epoch() -> int:
+    """First message id for a fresh log: microseconds since the Unix epoch.
+
+    Ids then stay above every id handed out before a restart, so clients
+    resuming from an older id are detected and resynced, not replayed
+    events that merely reuse the numbers.
+    """
+    return int(time.time() * 1000000)
+
+Subscriber = Callable[[List[int], Dict[str, Any], Optional[str], int, Optional[List[int]]], None]
+
+class PubSubBackend(ABC):
+    """Carries realtime payloads to every process that holds WebSocket connections.
+
+    publish() may be called from any process; every subscribed process gets
+    each message exactly once, including the one that published it, and
+    delivers it to its own local sockets. A message is addressed either to
+    user ids or to a topic such as "issue:42". Every message carries an id
+    that increases monotonically in publish order, the same in every process.
+    A message to users may carry each recipient's stored notification id,
+    aligned with user_ids.
+    """
+
+    def __init__(self):
+        self._subscriber: Optional[Subscriber] = None
+        self._last_id = 0
+        self.published = 0
+        self.delivered = 0
+        self.subscriber_errors = 0
+
+    async def start(self, subscriber: Subscriber):
+        self._subscriber = subscriber
+
+    async def stop(self):
+        self._subscriber = None
+
+    @abstractmethod
+    async def publish(self, user_ids: List[int], payload: Dict[str, Any], topic: Optional[str] = None,
+                      notification_ids: Optional[List[int]] = None):
+        """Send a message to every subscribed process."""
+
+    @property
+    def last_id(self) -> int:
+        """Id of the last message delivered in this process."""
+        return self._last_id
+
+    def _deliver(self, user_ids: List[int], payload: Dict[str, Any], topic: Optional[str], message_id: int,
+                 notification_ids: Optional[List[int]] = None):
+        self._last_id = message_id
+        if self._subscriber is None:
+            return
+        try:
+            self._subscriber(user_ids, payload, topic, message_id, notification_ids)
+            self.delivered += 1
+        except Exception as e:
+            self.subscriber_errors += 1
+            logger.error(f"Error delivering {payload.get('type')} message: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Get message counters for this process."""
+        return {
+            "backend": type(self).__name__,
+            "published": self.published,
+            "delivered": self.delivered,
+            "subscriber_errors": self.subscriber_errors
+        }
+
+class InProcessPubSub(PubSubBackend):
+    """Delivers straight to the local subscriber; for single-worker deployments.
+
+    Ids live only as long as the process, so each start continues from the boot epoch.
+    """
+
+    async def start(self, subscriber: Subscriber):
+        await super().start(subscriber)
+        self._last_id = max(self._last_id, boot_epoch())
+
+    async def publish(self, user_ids: List[int], payload: Dict[str, Any], topic: Optional[str] = None,
+                      notification_ids: Optional[List[int]] = None):
+        self.published += 1
+        self._deliver(user_ids, payload, topic, self._last_id + 1, notification_ids)
+
+class SQLitePubSub(PubSubBackend):
+    """Shared append-only message log in a SQLite file, tailed by every worker.
+
+    Publishing appends a row; each process polls for rows past the last id it
+    has seen and delivers them locally. No broker is needed, only a file all
+    workers on the host can reach. Rows older than the retention window are
+    pruned by publishers.
+    """
+
+    def __init__(self, path: str, poll_interval: float = PUBSUB_POLL_INTERVAL_SECONDS):
+        super().__init__()
+        self.path = path
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pubsub_messages ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " user_ids TEXT NOT NULL,"
+            " payload TEXT NOT NULL,"
+            " topic TEXT,"
+            " notification_ids TEXT,"
+            " created_at REAL NOT NULL)"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(pubsub_messages)")}
+        if "notification_ids" not in columns:
+            self._conn.execute("ALTER TABLE pubsub_messages ADD COLUMN notification_ids TEXT")
+        # A new or recreated log starts its ids at the boot epoch rather than 1
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            if self._conn.execute("SELECT 1 FROM sqlite_sequence WHERE name = 'pubsub_messages'").fetchone() is None:
+                self._conn.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('pubsub_messages', ?)", (boot_epoch(),))
+            self._conn.execute("COMMIT")
+        except sqlite3.Error:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._last_prune = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self.polls = 0
+
+    async def start(self, subscriber: Subscriber):
+        await super().start(subscriber)
+        # Only messages published after startup are delivered
+        with self._lock:
+            self._last_id = self._conn.execute(
+                "SELECT seq FROM sqlite_sequence WHERE name = 'pubsub_messages'"
+            ).fetchone()[0]
+        self._task = asyncio.create_task(self._poll())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await super().stop()
+
+    async def publish(self, user_ids: List[int], payload: Dict[str, Any], topic: Optional[str] = None,
+                      notification_ids: Optional[List[int]] = None):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(
+            None, self._append, json.dumps(user_ids), json.dumps(payload, default=str), topic,
+            json.dumps(notification_ids) if notification_ids is not None else None
+        )
+        self.published += 1
+
+    def _append(self, user_ids: str, payload: str, topic: Optional[str], notification_ids: Optional[str]):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO pubsub_messages (user_ids, payload, topic, notification_ids, created_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (user_ids, payload, topic, notification_ids, now)
+            )
+            if now - self._last_prune >= PUBSUB_PRUNE_INTERVAL_SECONDS:
+                self._conn.execute(
+                    "DELETE FROM pubsub_messages WHERE created_at < ?", (now - PUBSUB_RETENTION_SECONDS,)
+                )
+                self._last_prune = now
+
+    def _fetch(self) -> List[Tuple[int, str, str, Optional[str], Optional[str]]]:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT id, user_ids, payload, topic, notification_ids FROM pubsub_messages"
+                " WHERE id > ? ORDER BY id LIMIT ?",
+                (self._last_id, PUBSUB_FETCH_LIMIT)
+            ).fetchall()
+
+    async def _poll(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                rows = await loop.run_in_executor(None, self._fetch)
+            except sqlite3.Error as e:
+                logger.error(f"Error reading pub/sub log: {e}")
+                rows = []
+            self.polls += 1
+
+            for message_id, user_ids, payload, topic, notification_ids in rows:
+                self._deliver(json.loads(user_ids), json.loads(payload), topic, message_id,
+                              json.loads(notification_ids) if notification_ids is not None else None)
+
+            if len(rows) < PUBSUB_FETCH_LIMIT:
+                await asyncio.sleep(self.poll_interval)
+
+    def stats(self) -> Dict[str, Any]:
+        stats = super().stats()
+        stats.update({"last_id": self._last_id, "polls": self.polls})
+        return stats
+
+def create_pubsub() -> PubSubBackend:
+    """Create a pub/sub layer using the configured backend."""
+    if PUBSUB_BACKEND == "sqlite":
+        return SQLitePubSub(PUBSUB_SQLITE_PATH)
+    if PUBSUB_BACKEND == "memory":
+        return InProcessPubSub()
+    raise ValueError(f"Unknown pub/sub backend: {PUBSUB_BACKEND}")
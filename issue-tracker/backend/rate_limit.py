@@ -0,0 +1,126 @@
+from typing import Any, Dict, Hashable, Tuple
+from fastapi import HTTPException
+import math
+import threading
+import time
+
+# Login admission control configuration
+LOGIN_IP_BURST = 20
+LOGIN_IP_REFILL_PER_SECOND = 0.5  # 30 attempts/minute sustained per client IP
+LOGIN_FAILURE_BURST = 5
+LOGIN_FAILURE_REFILL_PER_SECOND = 5 / 60  # 5 failed attempts/minute sustained per (client IP, username)
+BUCKET_IDLE_SECONDS = 600
+BUCKET_SWEEP_INTERVAL_SECONDS = 60
+
+class TokenBucketLimiter:
+    """In-memory token buckets keyed by an arbitrary client identifier.
+
+    Each key may burst up to capacity requests and then gets refill_rate
+    tokens per second. Buckets idle for longer than idle_seconds are dropped
+    by a sweep that piggybacks on regular calls at most once per
+    sweep_interval, so memory stays bounded without a background task.
+    """
+
+    def __init__(self, capacity: float, refill_rate: float,
+                 idle_seconds: float = BUCKET_IDLE_SECONDS,
+                 sweep_interval: float = BUCKET_SWEEP_INTERVAL_SECONDS):
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self.idle_seconds = idle_seconds
+        self.sweep_interval = sweep_interval
+        self._buckets: Dict[Hashable, list] = {}  # key -> [tokens, last_refill]
+        self._lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+        self.allowed = 0
+        self.rejected = 0
+        self.evicted = 0
+
+    def try_acquire(self, key: Hashable) -> Tuple[bool, float]:
+        """Take one token for key. Returns (allowed, seconds until a token is available)."""
+        with self._lock:
+            bucket = self._refill(key)
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                self.allowed += 1
+                return True, 0.0
+
+            self.rejected += 1
+            return False, (1 - bucket[0]) / self.refill_rate
+
+    def peek(self, key: Hashable) -> Tuple[bool, float]:
+        """Check whether key has a token without taking it. Returns (available, seconds until one is)."""
+        with self._lock:
+            bucket = self._refill(key)
+            if bucket[0] >= 1:
+                return True, 0.0
+            self.rejected += 1
+            return False, (1 - bucket[0]) / self.refill_rate
+
+    def _refill(self, key: Hashable) -> list:
+        now = time.monotonic()
+        if now - self._last_sweep >= self.sweep_interval:
+            self._sweep(now)
+
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [self.capacity, now]
+        else:
+            bucket[0] = min(self.capacity, bucket[0] + (now - bucket[1]) * self.refill_rate)
+            bucket[1] = now
+        return bucket
+
+    def _sweep(self, now: float):
+        idle = [key for key, (_, last) in self._buckets.items() if now - last >= self.idle_seconds]
+        for key in idle:
+            del self._buckets[key]
+        self.evicted += len(idle)
+        self._last_sweep = now
+
+    def stats(self) -> Dict[str, Any]:
+        """Get admission metrics."""
+        return {
+            "buckets": len(self._buckets),
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+            "evicted": self.evicted
+        }
+
+class LoginAdmissionControl:
+    """Rejects login attempts over budget before any database or bcrypt work.
+
+    Every attempt is charged to the client IP. Failed verifications are also
+    charged to the (client IP, username) pair, so guessing at one account is
+    slowed from each address, while attempts from other addresses cannot
+    lock its owner out, and successful logins cost nothing there.
+    """
+
+    def __init__(self):
+        self.by_ip = TokenBucketLimiter(LOGIN_IP_BURST, LOGIN_IP_REFILL_PER_SECOND)
+        self.failures = TokenBucketLimiter(LOGIN_FAILURE_BURST, LOGIN_FAILURE_REFILL_PER_SECOND)
+
+    def check(self, client_ip: str, username: str):
+        """Raise a 429 if the client IP is over its budget or has used up its failures for the username."""
+        allowed, retry_after = self.by_ip.try_acquire(client_ip)
+        if allowed:
+            allowed, retry_after = self.failures.peek((client_ip, username.lower()))
+
+        if not allowed:
+            raise HTTPException(
+                status_code=429,
+                detail="Too many login attempts, please try again later",
+                headers={"Retry-After": str(math.ceil(retry_after))}
+            )
+
+    def record_failure(self, client_ip: str, username: str):
+        """Charge a failed credential check to the (client IP, username) budget."""
+        self.failures.try_acquire((client_ip, username.lower()))
+
+    def stats(self) -> Dict[str, Any]:
+        """Get admission metrics per dimension."""
+        return {
+            "by_ip": self.by_ip.stats(),
+            "failures_by_ip_username": self.failures.stats()
+        }
+
+# Global login admission control instance
+login_admission = LoginAdmissionControl()
@@ -1,15 +1,19 @@
-from typing import List, Optional, Tuple
-from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_, desc, asc
+from typing import Dict, Iterator, List, Optional, Tuple
+from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy import or_, and_, desc, asc, func, insert, select, type_coerce, String
 from fastapi import HTTPException, UploadFile
 from datetime import datetime
+import asyncio
+import base64
+import json
 import os
 import uuid
 import shutil
 
 from database_models import (
-    User, Issue, Comment, Attachment, IssueStatus, IssuePriority,
-    Notification, NotificationType, TimeEntry, IssueTemplate, CommentMention
+    User, UserRole, EmailDelivery, Issue, Comment, Attachment, IssueStatus, IssuePriority,
+    Notification, NotificationType, NotificationWatermark, NotificationRead,
+    TimeEntry, IssueTemplate, CommentMention, ChangeLog
 )
 from models import (
     UserCreate, UserUpdate, IssueCreate, IssueUpdate, 
@@ -17,13 +21,21 @@ from models import (
     NotificationCreate, TimeEntryCreate, TimeEntryUpdate,
     IssueTemplateCreate, IssueTemplateUpdate, CommentCreateWithMentions
 )
-from email_service import email_service
-from websocket_manager import notification_service
+from models import Issue as IssueSchema, IssueTemplate as IssueTemplateSchema, Notification as NotificationSchema
+from models import Comment as CommentSchema
+from database import SessionLocal
+from email_service import email_service, email_outbox
+from websocket_manager import manager, notification_service, issue_topic
+from event_bus import event_bus, RealtimeEvent
+from cache import user_cache, search_cache, issue_cache, template_cache, cache_versions
+from password_hasher import password_hasher
+from auth import token_versions
+from user_index import username_index
 import re
 
 class UserService:
     @staticmethod
-    def create_user(db: Session, user_data: UserCreate) -> User:
+    async def create_user(db: Session, user_data: UserCreate) -> User:
         """Create a new user."""
         # Check if username or email already exists
         existing_user = db.query(User).filter(
@@ -34,26 +46,37 @@ class UserService:
             raise HTTPException(status_code=400, detail="Username or email already registered")
         
         # Create new user
-        hashed_password = User.get_password_hash(user_data.password)
+        hashed_password = await password_hasher.hash(user_data.password)
         db_user = User(
             username=user_data.username,
             email=user_data.email,
             full_name=user_data.full_name,
             hashed_password=hashed_password,
-            role=user_data.role
+            role=UserRole(user_data.role.value)
         )
         
         db.add(db_user)
         db.commit()
         db.refresh(db_user)
+        cache_versions.bump("users")
         return db_user
     
     @staticmethod
-    def authenticate_user(db: Session, username: str, password: str) -> Optional[User]:
+    async def authenticate_user(db: Session, username: str, password: str) -> Optional[User]:
         """Authenticate a user."""
         user = db.query(User).filter(User.username == username).first()
-        if not user or not user.verify_password(password):
+        if not user:
+            return None
+        
+        valid, new_hash = await password_hasher.verify_and_update(password, user.hashed_password)
+        if not valid:
             return None
+        
+        # Transparently re-hash with the current bcrypt settings
+        if new_hash:
+            user.hashed_password = new_hash
+            db.commit()
+            db.refresh(user)
         return user
     
     @staticmethod
@@ -78,12 +101,37 @@ class UserService:
         if not user:
             return None
         
+        previous_username = user.username
         update_data = user_update.model_dump(exclude_unset=True)
+        if update_data.get("role") is not None:
+            update_data["role"] = UserRole(update_data["role"].value)
+        if update_data.get("email_delivery") is not None:
+            update_data["email_delivery"] = EmailDelivery(update_data["email_delivery"].value)
+        
+        # Claims baked into issued tokens are about to change; revoke those tokens
+        revoke_tokens = any(
+            field in update_data and update_data[field] != getattr(user, field)
+            for field in ("username", "role", "is_active")
+        )
+        
         for field, value in update_data.items():
             setattr(user, field, value)
+        if revoke_tokens:
+            user.token_version += 1
         
         db.commit()
         db.refresh(user)
+        
+        if revoke_tokens:
+            token_versions.set(user.id, user.token_version)
+        
+        # Drop cached profiles so changes apply immediately
+        user_cache.invalidate(previous_username)
+        user_cache.invalidate(user.username)
+        # Cached issues and templates embed creator/assignee details
+        cache_versions.bump("issues")
+        cache_versions.bump("templates")
+        cache_versions.bump("users")
         return user
 
 class IssueService:
@@ -93,19 +141,30 @@ class IssueService:
         db_issue = Issue(
             title=issue_data.title,
             description=issue_data.description,
-            status=issue_data.status,
-            priority=issue_data.priority,
+            status=IssueStatus(issue_data.status.value),
+            priority=IssuePriority(issue_data.priority.value),
             creator_id=creator_id,
             assignee_id=issue_data.assignee_id
         )
         
         db.add(db_issue)
+        db.flush()
+        ChangeLogService.record(db, "issue", db_issue.id)
+        
+        # Queue email notification if assigned, in the same transaction as the issue
+        if db_issue.assignee_id:
+            email_service.send_issue_created_notification(db, db_issue)
+        
         db.commit()
         db.refresh(db_issue)
+        cache_versions.bump("issues")
+        email_outbox.notify()
         
-        # Send email notification if assigned
-        if db_issue.assignee:
-            email_service.send_issue_created_notification(db_issue, db_issue.assignee)
+        # Send real-time notification to the assignee
+        if db_issue.assignee_id and db_issue.assignee_id != creator_id:
+            event_bus.publish([db_issue.assignee_id], notification_service.issue_assigned_payload(
+                db_issue.id, db_issue.title, db_issue.creator.full_name
+            ))
         
         return db_issue
     
@@ -114,6 +173,70 @@ class IssueService:
         """Get issue by ID with all relationships."""
         return db.query(Issue).filter(Issue.id == issue_id).first()
     
+    @staticmethod
+    def can_view_issue(db: Session, issue_id: int, user_id: int) -> bool:
+        """Whether a user may read an issue; like GET /issues/{id}, every active user may read existing issues."""
+        return db.query(Issue.id).filter(Issue.id == issue_id).first() is not None
+    
+    @staticmethod
+    def can_view_topic(user_id: int, topic: str) -> bool:
+        """Topic authorizer for live updates: an "issue:N" topic is visible to whoever may read issue N."""
+        issue_id = topic[len("issue:"):] if topic.startswith("issue:") else ""
+        if not issue_id.isdigit():
+            return False
+        
+        db = SessionLocal()
+        try:
+            return IssueService.can_view_issue(db, int(issue_id), user_id)
+        finally:
+            db.close()
+    
+    @staticmethod
+    def get_issue_cached(db: Session, issue_id: int) -> Optional[IssueSchema]:
+        """Get a serialized issue by ID, served from the issue cache when possible."""
+        key = (cache_versions.get("issues"), issue_id)
+        cached = issue_cache.get(key)
+        if cached is not None:
+            return cached
+        
+        issue = IssueService.get_issue_by_id(db, issue_id)
+        if not issue:
+            return None
+        
+        result = IssueService.serialize_issue(db, issue)
+        issue_cache.set(key, result, weight=len(result.model_dump_json()))
+        return result
+    
+    @staticmethod
+    def serialize_issue(db: Session, issue: Issue) -> IssueSchema:
+        """Serialize an issue with only the first page of its comments."""
+        return IssueService.serialize_issues(db, [issue])[0]
+    
+    @staticmethod
+    def serialize_issues(db: Session, issues: List[Issue]) -> List[IssueSchema]:
+        """Serialize issues with only the first page of each one's comments.
+        
+        Reading issue.comments would load whole threads, so the embedded pages
+        and comment counts are fetched for all issues at once by CommentService
+        and the rest of each thread is left to its cursor.
+        """
+        issue_ids = [issue.id for issue in issues]
+        pages = CommentService.get_first_pages(db, issue_ids, limit=CommentService.EMBEDDED_COMMENTS)
+        counts = CommentService.count_comments_by_issue(db, issue_ids)
+        
+        results = []
+        for issue in issues:
+            comments, next_cursor = pages[issue.id]
+            fields = {name: getattr(issue, name) for name in IssueSchema.model_fields
+                      if name not in ("comments", "comment_count", "comments_cursor")}
+            results.append(IssueSchema.model_validate({
+                **fields,
+                "comments": comments,
+                "comment_count": counts.get(issue.id, 0),
+                "comments_cursor": next_cursor
+            }, from_attributes=True))
+        return results
+    
     @staticmethod
     def update_issue(db: Session, issue_id: int, issue_update: IssueUpdate, updated_by: User) -> Optional[Issue]:
         """Update an issue."""
@@ -124,6 +247,10 @@ class IssueService:
         # Track changes for notifications
         changes = {}
         update_data = issue_update.model_dump(exclude_unset=True)
+        if update_data.get("status") is not None:
+            update_data["status"] = IssueStatus(update_data["status"].value)
+        if update_data.get("priority") is not None:
+            update_data["priority"] = IssuePriority(update_data["priority"].value)
         
         for field, new_value in update_data.items():
             old_value = getattr(issue, field)
@@ -132,11 +259,29 @@ class IssueService:
                 setattr(issue, field, new_value)
         
         if changes:
+            # Queue email notifications in the same transaction as the update
+            db.flush()
+            ChangeLogService.record(db, "issue", issue.id)
+            email_service.send_issue_updated_notification(db, issue, updated_by, changes)
+            
             db.commit()
             db.refresh(issue)
+            cache_versions.bump("issues")
+            email_outbox.notify()
             
-            # Send email notifications
-            email_service.send_issue_updated_notification(issue, updated_by, changes)
+            # Send real-time notifications to everyone involved except the updater
+            watchers = [user_id for user_id in (issue.assignee_id, issue.creator_id)
+                        if user_id and user_id != updated_by.id]
+            event_bus.publish(watchers, notification_service.issue_updated_payload(
+                issue.id, issue.title, updated_by.full_name, changes
+            ))
+            if "assignee_id" in changes and issue.assignee_id and issue.assignee_id != updated_by.id:
+                event_bus.publish([issue.assignee_id], notification_service.issue_assigned_payload(
+                    issue.id, issue.title, updated_by.full_name
+                ))
+            event_bus.publish_topic(issue_topic(issue.id), notification_service.issue_changed_payload(
+                issue.id, updated_by.full_name, changes
+            ))
         
         return issue
     
@@ -147,8 +292,21 @@ class IssueService:
         if not issue:
             return False
         
+        # Comments and attachments are deleted with the issue
+        ChangeLogService.record(db, "issue", issue.id, deleted=True)
+        for comment in issue.comments:
+            ChangeLogService.record(db, "comment", comment.id, deleted=True)
+        for attachment in issue.attachments:
+            ChangeLogService.record(db, "attachment", attachment.id, deleted=True)
+        
+        # Time entries have no cascade from the issue, so they are removed here
+        for entry_id, in db.query(TimeEntry.id).filter(TimeEntry.issue_id == issue.id):
+            ChangeLogService.record(db, "time_entry", entry_id, deleted=True)
+        db.query(TimeEntry).filter(TimeEntry.issue_id == issue.id).delete(synchronize_session=False)
+        
         db.delete(issue)
         db.commit()
+        cache_versions.bump("issues")
         return True
     
     @staticmethod
@@ -167,10 +325,10 @@ class IssueService:
             )
         
         if filters.status:
-            query = query.filter(Issue.status == filters.status)
+            query = query.filter(Issue.status == IssueStatus(filters.status.value))
         
         if filters.priority:
-            query = query.filter(Issue.priority == filters.priority)
+            query = query.filter(Issue.priority == IssuePriority(filters.priority.value))
         
         if filters.assignee_id:
             query = query.filter(Issue.assignee_id == filters.assignee_id)
@@ -208,11 +366,43 @@ class IssueService:
         
         # Apply pagination
         offset = (filters.page - 1) * filters.page_size
-        issues = query.offset(offset).limit(filters.page_size).all()
+        # Attachments are serialized with every issue, so load them for the whole page at once
+        issues = query.options(selectinload(Issue.attachments)).offset(offset).limit(filters.page_size).all()
         
         return issues, total
+    
+    @staticmethod
+    def _search_cache_key(filters: SearchFilters) -> tuple:
+        """Build a normalized cache key so equivalent filter sets share an entry."""
+        normalized = filters.model_dump(mode="json")
+        search = (normalized["search"] or "").strip()
+        normalized["search"] = search or None
+        normalized["sort_order"] = normalized["sort_order"].lower()
+        if normalized["sort_by"] not in ("id", "title", "status", "priority", "created_at"):
+            normalized["sort_by"] = "updated_at"
+        return tuple(sorted(normalized.items()))
+    
+    @staticmethod
+    def search_issues_cached(db: Session, filters: SearchFilters) -> Tuple[List[IssueSchema], int]:
+        """Search issues, serving repeated filter sets from the result cache."""
+        # Read the version before querying so a concurrent write can't be cached as current
+        key = (cache_versions.get("issues"), IssueService._search_cache_key(filters))
+        cached = search_cache.get(key)
+        if cached is not None:
+            return cached
+        
+        issues, total = IssueService.search_issues(db, filters)
+        results = IssueService.serialize_issues(db, issues)
+        size = sum(len(result.model_dump_json()) for result in results)
+        search_cache.set(key, (results, total), weight=size)
+        return results, total
 
 class CommentService:
+    DEFAULT_PAGE_SIZE = 50
+    MAX_PAGE_SIZE = 500
+    EMBEDDED_COMMENTS = 20  # Comments included in an issue response
+    EXPORT_BATCH_SIZE = 500
+    
     @staticmethod
     def create_comment(db: Session, comment_data: CommentCreate, author_id: int) -> Comment:
         """Create a new comment."""
@@ -228,11 +418,26 @@ class CommentService:
         )
         
         db.add(db_comment)
+        db.flush()
+        ChangeLogService.record(db, "comment", db_comment.id)
+        
+        # Queue email notification in the same transaction as the comment
+        email_service.send_comment_notification(db, issue, db_comment.author, comment_data.content)
+        
         db.commit()
         db.refresh(db_comment)
-        
-        # Send email notification
-        email_service.send_comment_notification(issue, db_comment.author, comment_data.content)
+        cache_versions.bump("issues")
+        email_outbox.notify()
+        
+        # Send real-time notification to everyone involved except the author
+        watchers = [user_id for user_id in (issue.assignee_id, issue.creator_id)
+                    if user_id and user_id != author_id]
+        event_bus.publish(watchers, notification_service.comment_added_payload(
+            issue.id, issue.title, db_comment.author.full_name, comment_data.content
+        ))
+        event_bus.publish_topic(issue_topic(issue.id), notification_service.comment_created_payload(
+            issue.id, db_comment.id, author_id, db_comment.author.full_name, db_comment.content, db_comment.created_at
+        ))
         
         return db_comment
     
@@ -241,6 +446,130 @@ class CommentService:
         """Get all comments for an issue."""
         return db.query(Comment).filter(Comment.issue_id == issue_id).order_by(Comment.created_at).all()
     
+    @staticmethod
+    def count_comments(db: Session, issue_id: int) -> int:
+        """Count an issue's comments from the (issue_id, created_at) index."""
+        return db.query(func.count(Comment.id)).filter(Comment.issue_id == issue_id).scalar()
+    
+    @staticmethod
+    def count_comments_by_issue(db: Session, issue_ids: List[int]) -> Dict[int, int]:
+        """Count the comments of several issues in one grouped query; issues without any are left out."""
+        if not issue_ids:
+            return {}
+        rows = (
+            db.query(Comment.issue_id, func.count(Comment.id))
+            .filter(Comment.issue_id.in_(issue_ids))
+            .group_by(Comment.issue_id)
+            .all()
+        )
+        return dict(rows)
+    
+    @staticmethod
+    def _encode_cursor(created_at: str, comment_id: int) -> str:
+        return base64.urlsafe_b64encode(json.dumps([created_at, comment_id]).encode()).decode().rstrip("=")
+    
+    @staticmethod
+    def _decode_cursor(cursor: str) -> Tuple[str, int]:
+        try:
+            position = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        if (not isinstance(position, list) or len(position) != 2
+                or not isinstance(position[0], str) or type(position[1]) is not int):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        return position[0], position[1]
+    
+    @staticmethod
+    def get_comments_page(db: Session, issue_id: int, cursor: Optional[str] = None,
+                          limit: int = DEFAULT_PAGE_SIZE) -> Tuple[List[Comment], Optional[str]]:
+        """Get a page of an issue's comments in (created_at, id) order, and the cursor of the next page.
+        
+        Pages are keyset-based, so each one is an index range scan however deep
+        into the thread it starts. The cursor holds created_at as stored rather
+        than a parsed datetime, which would not compare equal to the stored text.
+        """
+        created_at = type_coerce(Comment.created_at, String)
+        query = (
+            db.query(Comment, created_at)
+            .options(joinedload(Comment.author))
+            .filter(Comment.issue_id == issue_id)
+        )
+        if cursor:
+            after_created_at, after_id = CommentService._decode_cursor(cursor)
+            query = query.filter(or_(
+                created_at > after_created_at,
+                and_(created_at == after_created_at, Comment.id > after_id)
+            ))
+        
+        limit = max(1, min(limit, CommentService.MAX_PAGE_SIZE))
+        rows = query.order_by(Comment.created_at, Comment.id).limit(limit + 1).all()
+        return CommentService._split_page(rows, limit)
+    
+    @staticmethod
+    def get_first_pages(db: Session, issue_ids: List[int],
+                        limit: int = DEFAULT_PAGE_SIZE) -> Dict[int, Tuple[List[Comment], Optional[str]]]:
+        """Get the first page of comments of several issues, and each one's next cursor, in one query.
+        
+        Comments are numbered within each issue by a window function, so only
+        the first limit + 1 of every thread are read however long it is.
+        """
+        pages: Dict[int, Tuple[List[Comment], Optional[str]]] = {issue_id: ([], None) for issue_id in issue_ids}
+        if not issue_ids:
+            return pages
+        
+        limit = max(1, min(limit, CommentService.MAX_PAGE_SIZE))
+        position = func.row_number().over(
+            partition_by=Comment.issue_id, order_by=(Comment.created_at, Comment.id)
+        ).label("position")
+        ranked = select(Comment.id, position).where(Comment.issue_id.in_(issue_ids)).subquery()
+        rows = (
+            db.query(Comment, type_coerce(Comment.created_at, String))
+            .options(joinedload(Comment.author))
+            .join(ranked, ranked.c.id == Comment.id)
+            .filter(ranked.c.position <= limit + 1)
+            .order_by(Comment.issue_id, Comment.created_at, Comment.id)
+            .all()
+        )
+        
+        by_issue: Dict[int, list] = {}
+        for row in rows:
+            by_issue.setdefault(row[0].issue_id, []).append(row)
+        for issue_id, issue_rows in by_issue.items():
+            pages[issue_id] = CommentService._split_page(issue_rows, limit)
+        return pages
+    
+    @staticmethod
+    def _split_page(rows: list, limit: int) -> Tuple[List[Comment], Optional[str]]:
+        """Trim (comment, stored created_at) rows read with limit + 1 to a page and the next page's cursor."""
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last_comment, last_created_at = rows[-1]
+            next_cursor = CommentService._encode_cursor(last_created_at, last_comment.id)
+        return [comment for comment, _ in rows], next_cursor
+    
+    @staticmethod
+    def export_comments(issue_id: int) -> Iterator[str]:
+        """Stream every comment of an issue as newline-delimited JSON.
+        
+        Comments are read a page at a time with a session of its own, since the
+        request's session may be closed while the response is still streaming,
+        so memory stays flat however long the thread is.
+        """
+        db = SessionLocal()
+        try:
+            cursor = None
+            while True:
+                comments, cursor = CommentService.get_comments_page(
+                    db, issue_id, cursor, limit=CommentService.EXPORT_BATCH_SIZE
+                )
+                yield "".join(CommentSchema.model_validate(comment).model_dump_json() + "\n" for comment in comments)
+                db.expunge_all()
+                if cursor is None:
+                    break
+        finally:
+            db.close()
+    
     @staticmethod
     def update_comment(db: Session, comment_id: int, comment_update: CommentUpdate, user_id: int) -> Optional[Comment]:
         """Update a comment."""
@@ -258,8 +587,10 @@ class CommentService:
         for field, value in update_data.items():
             setattr(comment, field, value)
         
+        ChangeLogService.record(db, "comment", comment.id)
         db.commit()
         db.refresh(comment)
+        cache_versions.bump("issues")
         return comment
     
     @staticmethod
@@ -275,8 +606,10 @@ class CommentService:
             if not user or user.role.value != "admin":
                 raise HTTPException(status_code=403, detail="Not authorized to delete this comment")
         
+        ChangeLogService.record(db, "comment", comment.id, deleted=True)
         db.delete(comment)
         db.commit()
+        cache_versions.bump("issues")
         return True
 
 class AttachmentService:
@@ -349,8 +682,11 @@ class AttachmentService:
         )
         
         db.add(db_attachment)
+        db.flush()
+        ChangeLogService.record(db, "attachment", db_attachment.id)
         db.commit()
         db.refresh(db_attachment)
+        cache_versions.bump("issues")
         
         return db_attachment
     
@@ -380,11 +716,82 @@ class AttachmentService:
             print(f"Warning: Could not delete file {attachment.file_path}: {e}")
         
         # Delete database record
+        ChangeLogService.record(db, "attachment", attachment.id, deleted=True)
         db.delete(attachment)
         db.commit()
+        cache_versions.bump("issues")
         return True
 
 class NotificationService:
+    @staticmethod
+    def _persist_events(events: List[RealtimeEvent]) -> List[List[int]]:
+        """Store one notification row per recipient of every event; returns the ids per event, aligned with user_ids."""
+        notifications = [
+            NotificationCreate(
+                type=event.payload["type"],
+                title=event.payload["title"],
+                message=event.payload["message"],
+                user_id=user_id,
+                issue_id=event.payload.get("issue_id")
+            )
+            for event in events
+            for user_id in event.user_ids
+        ]
+        db = SessionLocal()
+        try:
+            ids = NotificationService.create_notifications_bulk(db, notifications)
+        finally:
+            db.close()
+        
+        ids_per_event = []
+        start = 0
+        for event in events:
+            ids_per_event.append(ids[start:start + len(event.user_ids)])
+            start += len(event.user_ids)
+        return ids_per_event
+    
+    @staticmethod
+    async def deliver_events(events: List[RealtimeEvent]):
+        """Event bus handler: persist a batch of notifications, then push each recipient its stored notification."""
+        ids_per_event = [[] for _ in events]
+        if any(event.user_ids for event in events):
+            loop = asyncio.get_running_loop()
+            ids_per_event = await loop.run_in_executor(None, NotificationService._persist_events, events)
+        
+        for event, notification_ids in zip(events, ids_per_event):
+            if event.topic is not None:
+                await manager.publish_topic(event.topic, event.payload)
+            else:
+                await manager.broadcast_json_to_users(event.payload, event.user_ids, notification_ids)
+    
+    @staticmethod
+    def create_notifications_bulk(db: Session, notifications: List[NotificationCreate]) -> List[int]:
+        """Create many notifications in one transaction with a multi-row INSERT ... RETURNING.
+        
+        Returns the new ids in the order of the input.
+        """
+        if not notifications:
+            return []
+        
+        # RETURNING rows come back in no guaranteed order, but SQLite assigns ids in
+        # VALUES order under the write lock, so sorting restores the input order.
+        # (sort_by_parameter_order would fall back to one INSERT per row here.)
+        ids = db.scalars(
+            insert(Notification).returning(Notification.id),
+            [
+                {
+                    "type": NotificationType(notification.type.value),
+                    "title": notification.title,
+                    "message": notification.message,
+                    "user_id": notification.user_id,
+                    "issue_id": notification.issue_id
+                }
+                for notification in notifications
+            ]
+        ).all()
+        db.commit()
+        return sorted(ids)
+    
     @staticmethod
     def create_notification(db: Session, notification_data: NotificationCreate) -> Notification:
         """Create a new notification."""
@@ -401,46 +808,89 @@ class NotificationService:
         db.refresh(db_notification)
         return db_notification
     
+    # Read state: a notification is read if its id is at or below the user's
+    # watermark, if it was read individually (a sparse set above the watermark),
+    # or if it carries the legacy is_read flag. Notification rows are never rewritten.
+    
+    @staticmethod
+    def _read_through(db: Session, user_id: int) -> int:
+        watermark = db.get(NotificationWatermark, user_id)
+        return watermark.read_through_id if watermark else 0
+    
     @staticmethod
-    def get_user_notifications(db: Session, user_id: int, skip: int = 0, limit: int = 50) -> Tuple[List[Notification], int]:
-        """Get notifications for a user."""
+    def get_user_notifications(db: Session, user_id: int, skip: int = 0, limit: int = 50) -> Tuple[List[NotificationSchema], int]:
+        """Get notifications for a user, with read state derived from the watermark."""
         query = db.query(Notification).filter(Notification.user_id == user_id)
         total = query.count()
         notifications = query.order_by(desc(Notification.created_at)).offset(skip).limit(limit).all()
-        return notifications, total
+        
+        read_through = NotificationService._read_through(db, user_id)
+        read_ids = set()
+        if notifications:
+            read_ids = set(db.scalars(select(NotificationRead.notification_id).where(
+                NotificationRead.user_id == user_id,
+                NotificationRead.notification_id.in_([notification.id for notification in notifications])
+            )))
+        
+        results = []
+        for notification in notifications:
+            result = NotificationSchema.model_validate(notification)
+            result.is_read = bool(notification.is_read) or notification.id <= read_through or notification.id in read_ids
+            results.append(result)
+        return results, total
     
     @staticmethod
-    def mark_as_read(db: Session, notification_id: int, user_id: int) -> Optional[Notification]:
-        """Mark a notification as read."""
+    def mark_as_read(db: Session, notification_id: int, user_id: int) -> Optional[NotificationSchema]:
+        """Mark a notification as read by adding it to the user's exception set."""
         notification = db.query(Notification).filter(
             Notification.id == notification_id,
             Notification.user_id == user_id
         ).first()
+        if not notification:
+            return None
         
-        if notification:
-            notification.is_read = True
-            db.commit()
-            db.refresh(notification)
+        if not notification.is_read and notification.id > NotificationService._read_through(db, user_id):
+            if db.get(NotificationRead, (user_id, notification.id)) is None:
+                db.add(NotificationRead(user_id=user_id, notification_id=notification.id))
+                db.commit()
         
-        return notification
+        result = NotificationSchema.model_validate(notification)
+        result.is_read = True
+        return result
     
     @staticmethod
     def mark_all_as_read(db: Session, user_id: int) -> int:
-        """Mark all notifications as read for a user."""
-        count = db.query(Notification).filter(
-            Notification.user_id == user_id,
-            Notification.is_read == False
-        ).update({"is_read": True})
+        """Mark all notifications as read for a user by moving the watermark: one row write however many are unread."""
+        count = NotificationService.get_unread_count(db, user_id)
+        latest = db.query(func.max(Notification.id)).filter(Notification.user_id == user_id).scalar()
+        if latest is None:
+            return 0
+        
+        watermark = db.get(NotificationWatermark, user_id)
+        if watermark is None:
+            db.add(NotificationWatermark(user_id=user_id, read_through_id=latest))
+        elif latest > watermark.read_through_id:
+            watermark.read_through_id = latest
+        
+        # Exceptions at or below the watermark are now redundant
+        db.query(NotificationRead).filter(
+            NotificationRead.user_id == user_id,
+            NotificationRead.notification_id <= latest
+        ).delete(synchronize_session=False)
         db.commit()
         return count
     
     @staticmethod
     def get_unread_count(db: Session, user_id: int) -> int:
-        """Get count of unread notifications."""
-        return db.query(Notification).filter(
+        """Get count of unread notifications; only rows above the watermark are scanned."""
+        return db.query(func.count(Notification.id)).filter(
             Notification.user_id == user_id,
-            Notification.is_read == False
-        ).count()
+            Notification.id > NotificationService._read_through(db, user_id),
+            Notification.is_read == False,
+            Notification.id.not_in(
+                select(NotificationRead.notification_id).where(NotificationRead.user_id == user_id)
+            )
+        ).scalar()
 
 class TimeTrackingService:
     @staticmethod
@@ -463,10 +913,12 @@ class TimeTrackingService:
         )
         
         db.add(db_time_entry)
+        db.flush()
+        ChangeLogService.record(db, "time_entry", db_time_entry.id)
         db.commit()
         db.refresh(db_time_entry)
         
-        # Send real-time notification (async call needs to be handled properly)
+        # Send real-time notification
         user = db.query(User).filter(User.id == user_id).first()
         notification_users = []
         if issue.assignee_id and issue.assignee_id != user_id:
@@ -474,11 +926,12 @@ class TimeTrackingService:
         if issue.creator_id != user_id and issue.creator_id not in notification_users:
             notification_users.append(issue.creator_id)
         
-        # Note: WebSocket notifications will be handled in the API endpoint
-        # if notification_users:
-        #     await notification_service.notify_time_logged(
-        #         issue.id, notification_users, issue.title, user.full_name, time_data.hours
-        #     )
+        event_bus.publish(notification_users, notification_service.time_logged_payload(
+            issue.id, issue.title, user.full_name, time_data.hours
+        ))
+        event_bus.publish_topic(issue_topic(issue.id), notification_service.time_entry_created_payload(
+            issue.id, db_time_entry.id, user_id, user.full_name, time_data.hours, db_time_entry.description
+        ))
         
         return db_time_entry
     
@@ -519,6 +972,7 @@ class TimeTrackingService:
         for field, value in update_data.items():
             setattr(entry, field, value)
         
+        ChangeLogService.record(db, "time_entry", entry.id)
         db.commit()
         db.refresh(entry)
         return entry
@@ -536,6 +990,7 @@ class TimeTrackingService:
             if not user or user.role.value != "admin":
                 raise HTTPException(status_code=403, detail="Not authorized to delete this time entry")
         
+        ChangeLogService.record(db, "time_entry", entry.id, deleted=True)
         db.delete(entry)
         db.commit()
         return True
@@ -556,6 +1011,7 @@ class IssueTemplateService:
         db.add(db_template)
         db.commit()
         db.refresh(db_template)
+        cache_versions.bump("templates")
         return db_template
     
     @staticmethod
@@ -566,11 +1022,40 @@ class IssueTemplateService:
             query = query.filter(IssueTemplate.is_active == True)
         return query.offset(skip).limit(limit).all()
     
+    @staticmethod
+    def get_templates_cached(db: Session, skip: int = 0, limit: int = 100, active_only: bool = True) -> List[IssueTemplateSchema]:
+        """Get serialized issue templates, served from the template cache when possible."""
+        key = (cache_versions.get("templates"), "list", skip, limit, active_only)
+        cached = template_cache.get(key)
+        if cached is not None:
+            return cached
+        
+        templates = IssueTemplateService.get_templates(db, skip, limit, active_only)
+        results = [IssueTemplateSchema.model_validate(template) for template in templates]
+        template_cache.set(key, results)
+        return results
+    
     @staticmethod
     def get_template_by_id(db: Session, template_id: int) -> Optional[IssueTemplate]:
         """Get template by ID."""
         return db.query(IssueTemplate).filter(IssueTemplate.id == template_id).first()
     
+    @staticmethod
+    def get_template_cached(db: Session, template_id: int) -> Optional[IssueTemplateSchema]:
+        """Get a serialized template by ID, served from the template cache when possible."""
+        key = (cache_versions.get("templates"), "id", template_id)
+        cached = template_cache.get(key)
+        if cached is not None:
+            return cached
+        
+        template = IssueTemplateService.get_template_by_id(db, template_id)
+        if not template:
+            return None
+        
+        result = IssueTemplateSchema.model_validate(template)
+        template_cache.set(key, result)
+        return result
+    
     @staticmethod
     def update_template(db: Session, template_id: int, template_update: IssueTemplateUpdate, user_id: int) -> Optional[IssueTemplate]:
         """Update an issue template."""
@@ -590,6 +1075,7 @@ class IssueTemplateService:
         
         db.commit()
         db.refresh(template)
+        cache_versions.bump("templates")
         return template
     
     @staticmethod
@@ -607,20 +1093,25 @@ class IssueTemplateService:
         
         db.delete(template)
         db.commit()
+        cache_versions.bump("templates")
         return True
 
 class MentionService:
+    MENTION_PATTERN = re.compile(r'@(\w+)')
+    
     @staticmethod
     def extract_mentions(content: str) -> List[str]:
         """Extract @mentions from content."""
-        # Find all @username patterns
-        mention_pattern = r'@(\w+)'
-        mentions = re.findall(mention_pattern, content)
-        return mentions
+        return MentionService.MENTION_PATTERN.findall(content)
     
     @staticmethod
     def create_comment_with_mentions(db: Session, comment_data: CommentCreateWithMentions, author_id: int) -> Comment:
-        """Create a comment and handle mentions."""
+        """Create a comment and handle mentions.
+        
+        Mentions are resolved against the in-memory username index rather than
+        the users table, and the comment, its mentions and the queued emails
+        are committed in a single transaction.
+        """
         # Verify issue exists
         issue = db.query(Issue).filter(Issue.id == comment_data.issue_id).first()
         if not issue:
@@ -634,54 +1125,115 @@ class MentionService:
         )
         
         db.add(db_comment)
-        db.commit()
-        db.refresh(db_comment)
+        db.flush()
+        ChangeLogService.record(db, "comment", db_comment.id)
         
-        # Extract mentions from content
-        mentioned_usernames = MentionService.extract_mentions(comment_data.content)
-        
-        # Add explicitly mentioned users
-        if comment_data.mentioned_users:
-            mentioned_user_objects = db.query(User).filter(User.id.in_(comment_data.mentioned_users)).all()
-            mentioned_usernames.extend([user.username for user in mentioned_user_objects])
-        
-        # Process mentions
-        if mentioned_usernames:
-            # Get mentioned users
-            mentioned_users = db.query(User).filter(User.username.in_(mentioned_usernames)).all()
-            
-            # Create mention records
-            for user in mentioned_users:
-                if user.id != author_id:  # Don't mention yourself
-                    mention = CommentMention(
-                        comment_id=db_comment.id,
-                        mentioned_user_id=user.id
-                    )
-                    db.add(mention)
-                    
-                    # Send real-time notification (will be handled in API endpoint)
-                    # author = db.query(User).filter(User.id == author_id).first()
-                    # await notification_service.notify_mention(
-                    #     user.id, issue.id, issue.title, author.full_name, comment_data.content
-                    # )
-            
-            db.commit()
+        # Resolve @usernames in the content and explicitly mentioned user ids together
+        mentioned_users = username_index.resolve(
+            db, MentionService.extract_mentions(comment_data.content), comment_data.mentioned_users
+        )
+        notified_mentions = [user.id for user in mentioned_users if user.id != author_id]  # Don't mention yourself
+        if notified_mentions:
+            db.execute(insert(CommentMention), [
+                {"comment_id": db_comment.id, "mentioned_user_id": user_id} for user_id in notified_mentions
+            ])
         
         # Send general comment notification
-        author = db.query(User).filter(User.id == author_id).first()
+        author = db_comment.author
         notification_users = []
         if issue.assignee_id and issue.assignee_id != author_id:
             notification_users.append(issue.assignee_id)
         if issue.creator_id != author_id and issue.creator_id not in notification_users:
             notification_users.append(issue.creator_id)
         
-        # Real-time notifications will be handled in API endpoints
-        # if notification_users:
-        #     await notification_service.notify_comment_added(
-        #         issue.id, notification_users, issue.title, author.full_name, comment_data.content
-        #     )
+        # Queue email notification
+        email_service.send_comment_notification(db, issue, author, comment_data.content)
+        db.commit()
+        db.refresh(db_comment)
+        cache_versions.bump("issues")
+        email_outbox.notify()
         
-        # Send email notification
-        email_service.send_comment_notification(issue, author, comment_data.content)
+        # Send real-time notifications; mentioned users get the mention instead of the generic one
+        event_bus.publish(
+            [user_id for user_id in notification_users if user_id not in notified_mentions],
+            notification_service.comment_added_payload(issue.id, issue.title, author.full_name, comment_data.content)
+        )
+        for user_id in notified_mentions:
+            event_bus.publish([user_id], notification_service.mention_payload(
+                issue.id, issue.title, author.full_name, comment_data.content
+            ))
+        event_bus.publish_topic(issue_topic(issue.id), notification_service.comment_created_payload(
+            issue.id, db_comment.id, author_id, author.full_name, db_comment.content, db_comment.created_at
+        ))
         
         return db_comment
+
+class ChangeLogService:
+    """Change feed for clients that keep a local replica of issues and their children.
+    
+    Services call record() in the same transaction as the change itself, so
+    the log and the data commit or roll back together. Log ids increase in
+    commit order because SQLite serializes writers.
+    """
+    ENTITIES = {"issue": Issue, "comment": Comment, "attachment": Attachment, "time_entry": TimeEntry}
+    MAX_PAGE_SIZE = 1000
+    
+    @staticmethod
+    def record(db: Session, entity: str, entity_id: int, deleted: bool = False):
+        """Append a change to the log without committing."""
+        db.add(ChangeLog(entity=entity, entity_id=entity_id, deleted=deleted))
+    
+    @staticmethod
+    def current_cursor(db: Session) -> int:
+        """Cursor of the latest change, for clients starting from a full load."""
+        return db.query(func.max(ChangeLog.id)).scalar() or 0
+    
+    @staticmethod
+    def _row_data(entity: str, row) -> dict:
+        data = {column.name: getattr(row, column.key) for column in row.__table__.columns}
+        if entity == "time_entry":
+            data["hours"] = row.hours / 60.0  # Stored as minutes
+        return data
+    
+    @staticmethod
+    def get_changes(db: Session, since: int, limit: int = 500) -> Tuple[List[dict], int, bool]:
+        """Get the latest change of every entity changed after a cursor, oldest first.
+        
+        An entity changed several times appears once, with its current column
+        values or as a tombstone if it no longer exists. Returns the changes,
+        the cursor to pass next time and whether more changes are pending.
+        """
+        limit = max(1, min(limit, ChangeLogService.MAX_PAGE_SIZE))
+        seq = func.max(ChangeLog.id).label("seq")
+        rows = (
+            db.query(ChangeLog.entity, ChangeLog.entity_id, seq)
+            .filter(ChangeLog.id > since)
+            .group_by(ChangeLog.entity, ChangeLog.entity_id)
+            .order_by(seq)
+            .limit(limit + 1)
+            .all()
+        )
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        
+        # One query per entity type for the rows that still exist
+        ids_by_entity = {}
+        for entity, entity_id, _ in rows:
+            ids_by_entity.setdefault(entity, []).append(entity_id)
+        current = {}
+        for entity, ids in ids_by_entity.items():
+            model = ChangeLogService.ENTITIES[entity]
+            for row in db.query(model).filter(model.id.in_(ids)):
+                current[(entity, row.id)] = ChangeLogService._row_data(entity, row)
+        
+        changes = []
+        for entity, entity_id, change_seq in rows:
+            data = current.get((entity, entity_id))
+            changes.append({
+                "entity": entity,
+                "id": entity_id,
+                "seq": change_seq,
+                "deleted": data is None,
+                "data": data
+            })
+        return changes, rows[-1].seq if rows else since, has_more
@@ -0,0 +1,35 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# The app keeps its SQLite files in the working directory, so tests get a scratch one
+os.chdir(tempfile.mkdtemp(prefix="issue-tracker-tests-"))
+
+SEED_PASSWORDS = {"admin": "admin123", "john_doe": "password123", "jane_smith": "password123"}
+
+@pytest.fixture(scope="session")
+def client():
+    """Test client for the app, started once against a freshly seeded database."""
+    from fastapi.testclient import TestClient
+    import main
+
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+@pytest.fixture(scope="session")
+def auth_headers(client):
+    """Authorization headers per seeded username, logging each user in once."""
+    tokens = {}
+
+    def headers(username: str = "admin") -> dict:
+        if username not in tokens:
+            response = client.post("/auth/login", json={"username": username, "password": SEED_PASSWORDS[username]})
+            tokens[username] = response.json()["access_token"]
+        return {"Authorization": f"Bearer {tokens[username]}"}
+
+    return headers
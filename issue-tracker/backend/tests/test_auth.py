@@ -0,0 +1,39 @@
+from auth import TokenVersionTable
+from database import SessionLocal
+from database_models import User
+
+def test_stale_database_read_does_not_overwrite_a_bump(client):
+    table = TokenVersionTable()
+    db = SessionLocal()
+    try:
+        stored = db.query(User.token_version).filter(User.id == 2).scalar()
+        query = db.query
+
+        def query_then_bump(*entities):
+            # The version is bumped and cached while this lookup is in flight
+            table.set(2, stored + 1)
+            return query(*entities)
+
+        db.query = query_then_bump
+        assert table.current(db, 2) == stored + 1
+        db.query = query
+        assert table.current(db, 2) == stored + 1
+    finally:
+        db.close()
+
+def test_set_never_lowers_the_version(client):
+    table = TokenVersionTable()
+    table.set(2, 7)
+    table.set(2, 3)
+    db = SessionLocal()
+    try:
+        assert table.current(db, 2) == 7
+    finally:
+        db.close()
+
+def test_missing_user_has_no_version(client):
+    db = SessionLocal()
+    try:
+        assert TokenVersionTable().current(db, 999999) is None
+    finally:
+        db.close()
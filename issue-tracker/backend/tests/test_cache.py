@@ -0,0 +1,98 @@
+import time
+
+import pytest
+
+from cache import LRUCache, SQLiteCache, CacheVersions
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_cache(request, tmp_path):
+    """Factory for a cache of the parametrized backend; SQLite caches share one file."""
+    def make(max_size=8, ttl=None, max_weight=None, namespace="test"):
+        if request.param == "sqlite":
+            return SQLiteCache(str(tmp_path / "cache.db"), namespace, max_size, ttl=ttl, max_weight=max_weight)
+        return LRUCache(max_size, ttl=ttl, max_weight=max_weight)
+    return make
+
+def test_get_returns_what_was_set(make_cache):
+    cache = make_cache()
+    assert cache.get("missing") is None
+    cache.set(("issues", 1), {"title": "A", "tags": [1, 2]})
+    assert cache.get(("issues", 1)) == {"title": "A", "tags": [1, 2]}
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+
+def test_set_replaces_value(make_cache):
+    cache = make_cache()
+    cache.set("key", 1)
+    cache.set("key", 2)
+    assert cache.get("key") == 2
+    assert cache.stats()["size"] == 1
+
+def test_invalidate_and_clear(make_cache):
+    cache = make_cache()
+    for key in ("a", "b", "c"):
+        cache.set(key, key)
+    cache.invalidate("a")
+    assert cache.get("a") is None
+    assert cache.get("b") == "b"
+    cache.clear()
+    assert cache.get("b") is None and cache.get("c") is None
+    assert cache.stats()["invalidations"] == 3
+
+def test_incr_counts_from_zero(make_cache):
+    cache = make_cache()
+    assert [cache.incr("counter") for _ in range(3)] == [1, 2, 3]
+    assert cache.get("counter") == 3
+    versions = CacheVersions(make_cache(namespace="versions"))
+    assert versions.get("issues") == 0
+    assert versions.bump("issues") == 1
+    assert versions.get("issues") == 1
+
+def test_entries_expire_after_ttl(make_cache):
+    cache = make_cache(ttl=0.05)
+    cache.set("key", "value")
+    assert cache.get("key") == "value"
+    time.sleep(0.1)
+    assert cache.get("key") is None
+
+def test_least_recently_used_entry_is_evicted(make_cache):
+    cache = make_cache(max_size=2)
+    cache.set("a", 1)
+    time.sleep(0.002)
+    cache.set("b", 2)
+    time.sleep(0.002)
+    assert cache.get("a") == 1  # Now "b" is the least recently used
+    time.sleep(0.002)
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+def test_weight_budget(make_cache):
+    cache = make_cache(max_weight=10)
+    cache.set("too big", "x", weight=11)
+    assert cache.get("too big") is None
+    cache.set("a", "a", weight=6)
+    time.sleep(0.002)
+    cache.set("b", "b", weight=6)
+    assert cache.get("a") is None
+    assert cache.get("b") == "b"
+    assert cache.stats()["weight"] == 6
+
+def test_sqlite_hits_do_not_write(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "cache.db"), "test", 8)
+    cache.set("key", "value")
+    writes = cache._conn.total_changes
+    for _ in range(50):
+        assert cache.get("key") == "value"
+    assert cache._conn.total_changes == writes
+
+def test_sqlite_entries_are_shared_between_instances(tmp_path):
+    path = str(tmp_path / "cache.db")
+    first, second = SQLiteCache(path, "test", 8), SQLiteCache(path, "test", 8)
+    other_namespace = SQLiteCache(path, "other", 8)
+    first.set("key", "value")
+    assert second.get("key") == "value"
+    assert other_namespace.get("key") is None
+    second.incr("counter")
+    assert first.incr("counter") == 2
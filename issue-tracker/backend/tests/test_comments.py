@@ -0,0 +1,52 @@
+import base64
+import json
+
+import pytest
+
+def encode(value) -> str:
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip("=")
+
+@pytest.fixture
+def thread(client, auth_headers):
+    """An issue with 7 comments, deleted afterwards."""
+    headers = auth_headers()
+    issue_id = client.post("/issues", json={"title": "Thread", "description": "Comments"}, headers=headers).json()["id"]
+    for i in range(7):
+        client.post("/comments", json={"content": f"comment {i}", "issue_id": issue_id}, headers=headers)
+    yield issue_id
+    client.delete(f"/issues/{issue_id}", headers=headers)
+
+def test_pages_follow_cursor_in_order(client, auth_headers, thread):
+    contents, cursor = [], None
+    while True:
+        params = {"limit": 3, **({"cursor": cursor} if cursor else {})}
+        page = client.get(f"/issues/{thread}/comments", params=params, headers=auth_headers()).json()
+        contents += [comment["content"] for comment in page["comments"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert contents == [f"comment {i}" for i in range(7)]
+    assert page["total"] == 7
+
+def test_issue_embeds_first_page_and_cursor(client, auth_headers, thread):
+    issue = client.get(f"/issues/{thread}", headers=auth_headers()).json()
+    assert issue["comment_count"] == 7
+    assert len(issue["comments"]) == 7
+    assert issue["comments_cursor"] is None
+
+@pytest.mark.parametrize("cursor", [
+    "zzz",                          # not base64 JSON
+    encode(5),                      # JSON scalar
+    encode(None),                   # JSON null
+    encode("text"),                 # JSON string
+    encode([]),                     # too short
+    encode(["2026-01-01", 1, 2]),   # too long
+    encode([1, 1]),                 # created_at not a string
+    encode(["2026-01-01", "1"]),    # id not an integer
+    encode(["2026-01-01", True]),   # bool is not an id
+    encode({"a": 1}),               # object
+])
+def test_malformed_cursor_is_rejected(client, auth_headers, thread, cursor):
+    response = client.get(f"/issues/{thread}/comments", params={"cursor": cursor}, headers=auth_headers())
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
@@ -0,0 +1,163 @@
+import socketserver
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+import email_service
+from database import SessionLocal
+from database_models import EmailOutbox, EmailOutboxStatus
+
+class SMTPSinkHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib: accepts every message unless told to refuse recipients."""
+
+    def reply(self, line: str):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        sink = self.server
+        sink.connections += 1
+        self.reply("220 sink ESMTP")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode().strip().split(" ", 1)[0].split(":", 1)[0].upper()
+            if command in ("EHLO", "HELO"):
+                self.reply("250 sink")
+            elif command == "RCPT" and sink.refuse_recipients:
+                sink.refuse_recipients -= 1
+                self.reply("450 Mailbox busy, try again later")
+            elif command == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                lines = []
+                while (data := self.rfile.readline()) not in (b".\r\n", b""):
+                    lines.append(data)
+                sink.messages.append(b"".join(lines).decode())
+                self.reply("250 Queued")
+            elif command == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:  # MAIL, RCPT, NOOP, RSET
+                self.reply("250 OK")
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), SMTPSinkHandler)
+        self.connections = 0
+        self.messages = []
+        self.refuse_recipients = 0
+
+@pytest.fixture
+def sink(client, monkeypatch):
+    """A local SMTP server the outbox delivers to, with the app's own outbox workers paused."""
+    server = SMTPSink()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(email_service, "SMTP_SERVER", "127.0.0.1")
+    monkeypatch.setattr(email_service, "SMTP_PORT", server.server_address[1])
+    monkeypatch.setattr(email_service, "SMTP_USE_TLS", False)
+    monkeypatch.setattr(email_service, "SMTP_USERNAME", "")
+
+    email_service.email_outbox.stop()
+    db = SessionLocal()
+    db.query(EmailOutbox).delete()
+    db.commit()
+    db.close()
+    yield server
+    email_service.email_outbox.start()
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def worker():
+    worker = email_service.EmailOutboxWorker(email_service.EmailService())
+    yield worker
+    worker.service.pool.close_all()
+
+def enqueue(worker, *recipients):
+    db = SessionLocal()
+    for recipient in recipients:
+        worker.service.enqueue_email(db, recipient, f"Hello {recipient}", "Plain body", "<p>HTML body</p>")
+    db.commit()
+    db.close()
+
+def outbox_rows():
+    db = SessionLocal()
+    try:
+        return db.query(EmailOutbox).order_by(EmailOutbox.id).all()
+    finally:
+        db.close()
+
+def make_due():
+    db = SessionLocal()
+    db.query(EmailOutbox).update({"next_attempt_at": datetime.utcnow() - timedelta(seconds=1)})
+    db.commit()
+    db.close()
+
+def test_batch_is_delivered_over_one_pooled_session(sink, worker):
+    enqueue(worker, "a@example.com", "b@example.com", "c@example.com")
+    assert worker.drain_once() == 3
+
+    assert len(sink.messages) == 3
+    assert "Subject: Hello a@example.com" in sink.messages[0]
+    assert "<p>HTML body</p>" in sink.messages[0]
+    assert sink.connections == 1
+    assert worker.service.pool.connections_opened == 1
+    assert outbox_rows() == []
+    assert worker.sent == 3
+
+    # The idle session is reused by the next batch
+    enqueue(worker, "d@example.com")
+    assert worker.drain_once() == 1
+    assert sink.connections == 1
+
+def test_failed_delivery_is_retried_with_backoff(sink, worker):
+    enqueue(worker, "retry@example.com")
+    sink.refuse_recipients = 2
+
+    started = datetime.utcnow()
+    assert worker.drain_once() == 1
+    [row] = outbox_rows()
+    assert row.status == EmailOutboxStatus.PENDING
+    assert row.attempts == 1
+    assert "450" in row.last_error
+    base = email_service.OUTBOX_BACKOFF_BASE_SECONDS
+    assert timedelta(seconds=base * 0.8) <= row.next_attempt_at - started <= timedelta(seconds=base * 1.2 + 1)
+
+    # Not due yet
+    assert worker.drain_once() == 0
+
+    make_due()
+    started = datetime.utcnow()
+    assert worker.drain_once() == 1
+    [row] = outbox_rows()
+    assert row.attempts == 2
+    assert timedelta(seconds=base * 2 * 0.8) <= row.next_attempt_at - started <= timedelta(seconds=base * 2 * 1.2 + 1)
+
+    make_due()
+    assert worker.drain_once() == 1
+    assert outbox_rows() == []
+    assert len(sink.messages) == 1
+    assert worker.failed == 2 and worker.sent == 1
+    # A refused recipient leaves the session usable, so it was kept for the retries
+    assert sink.connections == 1
+
+def test_message_is_dead_lettered_after_max_attempts(sink, worker):
+    enqueue(worker, "dead@example.com")
+    sink.refuse_recipients = email_service.OUTBOX_MAX_ATTEMPTS + 10
+
+    for _ in range(email_service.OUTBOX_MAX_ATTEMPTS):
+        make_due()
+        assert worker.drain_once() == 1
+
+    [row] = outbox_rows()
+    assert row.status == EmailOutboxStatus.DEAD
+    assert row.attempts == email_service.OUTBOX_MAX_ATTEMPTS
+    assert worker.dead_lettered == 1
+    assert sink.messages == []
+
+    make_due()
+    assert worker.drain_once() == 0
+    assert worker.stats()["dead"] == 1
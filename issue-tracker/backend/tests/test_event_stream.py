@@ -0,0 +1,45 @@
+import json
+import time
+
+from websocket_manager import manager
+
+def parse_event(message: str) -> dict:
+    fields = dict(line.split(": ", 1) for line in message.strip().split("\n"))
+    return {"id": int(fields["id"]) if "id" in fields else None, "data": json.loads(fields["data"])}
+
+def next_event(client, connection, timeout: float = 2.0) -> dict:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if not client.portal.call(connection.queue.empty):
+            message, _ = client.portal.call(connection.queue.get_nowait)
+            return parse_event(message)
+        time.sleep(0.01)
+    raise AssertionError("no event queued")
+
+def close(client, connection):
+    client.portal.call(manager.end_stream, connection)
+    client.portal.call(manager._remove, connection)
+
+def test_fresh_stream_starts_with_an_event_id_and_resumes_from_it(client, auth_headers):
+    john, jane = auth_headers("john_doe"), auth_headers("jane_smith")
+    john_id = client.get("/auth/me", headers=john).json()["id"]
+    issue_id = client.post("/issues", json={"title": "Stream gap", "description": "x"}, headers=john).json()["id"]
+
+    connection = client.portal.call(lambda: manager.open_stream(john_id, authenticated=True))
+    hello = next_event(client, connection)
+    close(client, connection)
+    assert hello["data"]["type"] == "hello"
+    assert hello["id"] == hello["data"]["last_seq"]
+
+    # Published while disconnected, before the stream carried any notification
+    client.put(f"/issues/{issue_id}", json={"title": "Stream gap renamed"}, headers=jane)
+    time.sleep(0.1)
+
+    connection = client.portal.call(lambda: manager.open_stream(john_id, hello["id"], authenticated=True))
+    missed = next_event(client, connection)
+    close(client, connection)
+    assert missed["data"]["type"] == "issue_updated"
+    assert missed["id"] > hello["id"]
+    assert missed["data"]["data"]["issue_id"] == issue_id
+
+    client.delete(f"/issues/{issue_id}", headers=auth_headers())
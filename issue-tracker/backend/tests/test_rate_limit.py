@@ -0,0 +1,58 @@
+import pytest
+from fastapi import HTTPException
+
+from rate_limit import LoginAdmissionControl, TokenBucketLimiter, LOGIN_FAILURE_BURST, LOGIN_IP_BURST
+
+def test_bucket_allows_burst_then_rejects():
+    limiter = TokenBucketLimiter(capacity=3, refill_rate=1)
+    assert [limiter.try_acquire("key")[0] for _ in range(4)] == [True, True, True, False]
+    allowed, retry_after = limiter.try_acquire("key")
+    assert not allowed and 0 < retry_after <= 1
+    assert limiter.try_acquire("other key")[0]
+
+def test_peek_does_not_take_a_token():
+    limiter = TokenBucketLimiter(capacity=1, refill_rate=1)
+    for _ in range(5):
+        assert limiter.peek("key") == (True, 0.0)
+    assert limiter.try_acquire("key")[0]
+    assert not limiter.peek("key")[0]
+
+def test_successful_logins_do_not_spend_the_username_budget():
+    admission = LoginAdmissionControl()
+    for _ in range(LOGIN_FAILURE_BURST * 2):
+        admission.check("10.0.0.1", "admin")
+
+def test_failures_from_other_addresses_do_not_lock_out_the_account():
+    admission = LoginAdmissionControl()
+    for i in range(50):
+        attacker = f"203.0.113.{i}"
+        for _ in range(LOGIN_FAILURE_BURST):
+            admission.check(attacker, "admin")
+            admission.record_failure(attacker, "admin")
+    admission.check("10.0.0.1", "Admin")
+
+def test_failures_from_one_address_are_limited_per_username():
+    admission = LoginAdmissionControl()
+    for _ in range(LOGIN_FAILURE_BURST):
+        admission.check("203.0.113.1", "admin")
+        admission.record_failure("203.0.113.1", "ADMIN")
+    with pytest.raises(HTTPException) as rejected:
+        admission.check("203.0.113.1", "admin")
+    assert rejected.value.status_code == 429
+    assert int(rejected.value.headers["Retry-After"]) > 0
+    admission.check("203.0.113.1", "john_doe")
+
+def test_ip_budget_applies_to_every_attempt():
+    admission = LoginAdmissionControl()
+    for i in range(LOGIN_IP_BURST):
+        admission.check("203.0.113.1", f"user{i}")
+    with pytest.raises(HTTPException):
+        admission.check("203.0.113.1", "someone else")
+
+def test_login_endpoint_charges_only_failures(client):
+    credentials = {"username": "alice_brown", "password": "password123"}
+    for _ in range(2):
+        assert client.post("/auth/login", json=credentials).status_code == 200
+    for _ in range(LOGIN_FAILURE_BURST):
+        assert client.post("/auth/login", json={**credentials, "password": "wrong"}).status_code == 401
+    assert client.post("/auth/login", json=credentials).status_code == 429
@@ -0,0 +1,46 @@
+import pytest
+from starlette.websockets import WebSocketDisconnect
+
+import binary_codec
+
+def user_id(client, headers) -> int:
+    return client.get("/auth/me", headers=headers).json()["id"]
+
+def token(headers) -> str:
+    return headers["Authorization"].split(" ", 1)[1]
+
+def test_fresh_connection_gets_hello_and_resumes_from_it(client, auth_headers):
+    john, jane = auth_headers("john_doe"), auth_headers("jane_smith")
+    john_id = user_id(client, john)
+    issue_id = client.post("/issues", json={"title": "Gap", "description": "x"}, headers=john).json()["id"]
+
+    with client.websocket_connect(f"/ws/{john_id}?token={token(john)}") as websocket:
+        hello = websocket.receive_json()
+    assert hello["type"] == "hello"
+    assert isinstance(hello["last_seq"], int)
+
+    # Published while disconnected, before the client ever saw a notification
+    client.put(f"/issues/{issue_id}", json={"title": "Gap renamed"}, headers=jane)
+
+    with client.websocket_connect(f"/ws/{john_id}?token={token(john)}&last_seq={hello['last_seq']}") as websocket:
+        missed = websocket.receive_json()
+    assert missed["type"] == "issue_updated"
+    assert missed["seq"] > hello["last_seq"]
+    assert missed["data"]["issue_id"] == issue_id
+
+    client.delete(f"/issues/{issue_id}", headers=auth_headers())
+
+def test_binary_hello(client, auth_headers):
+    john = auth_headers("john_doe")
+    url = f"/ws/{user_id(client, john)}?token={token(john)}"
+    with client.websocket_connect(url, subprotocols=[binary_codec.SUBPROTOCOL]) as websocket:
+        hello = binary_codec.decode_frame(websocket.receive_bytes())
+    assert hello["type"] == "hello"
+    assert isinstance(hello["data"]["last_seq"], int)
+
+def test_connection_without_token_is_refused(client, auth_headers):
+    john_id = user_id(client, auth_headers("john_doe"))
+    with pytest.raises(WebSocketDisconnect) as closed:
+        with client.websocket_connect(f"/ws/{john_id}") as websocket:
+            websocket.receive_json()
+    assert closed.value.code == 1008
@@ -0,0 +1,95 @@
+from bisect import bisect_left
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+from sqlalchemy.orm import Session
+from database_models import User
+from cache import cache_versions
+import threading
+import time
+
+# Username index configuration. Writes in this worker bump the "users" cache
+# version; the TTL bounds how long another worker's index can miss a change
+# when the per-process cache backend is used.
+USERNAME_INDEX_TTL_SECONDS = 60
+USER_SUGGEST_MAX_RESULTS = 20
+
+class IndexedUser(NamedTuple):
+    id: int
+    username: str
+    full_name: str
+    is_active: bool
+
+class UsernameIndex:
+    """In-memory username index for @mention resolution and autocomplete.
+
+    Holds every user in a dict by exact username and id, plus a list sorted
+    by lowercased username, so a prefix lookup is a binary search and a short
+    scan. The whole index is rebuilt with one narrow query whenever the
+    "users" version changes or the TTL lapses; rebuilds are rare because
+    users change far less often than comments are posted.
+    """
+
+    def __init__(self, ttl: float = USERNAME_INDEX_TTL_SECONDS):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._version: Optional[int] = None
+        self._loaded_at = 0.0
+        # (by exact username, by id, lowercased sorted keys, users in key order)
+        self._snapshot: Tuple[Dict[str, IndexedUser], Dict[int, IndexedUser], List[str], List[IndexedUser]] = ({}, {}, [], [])
+        self._rebuilds = 0
+
+    def _refresh(self, db: Session):
+        version = cache_versions.get("users")
+        if version == self._version and time.monotonic() - self._loaded_at < self.ttl:
+            return
+
+        with self._lock:
+            if version == self._version and time.monotonic() - self._loaded_at < self.ttl:
+                return
+            rows = db.query(User.id, User.username, User.full_name, User.is_active).all()
+            users = sorted(
+                (IndexedUser(row.id, row.username, row.full_name, row.is_active) for row in rows),
+                key=lambda user: (user.username.lower(), user.username)
+            )
+            # Swap in one complete snapshot so lock-free readers never see a partial index
+            self._snapshot = (
+                {user.username: user for user in users},
+                {user.id: user for user in users},
+                [user.username.lower() for user in users],
+                users
+            )
+            # The version was read before querying, so a concurrent bump triggers another rebuild
+            self._version = version
+            self._loaded_at = time.monotonic()
+            self._rebuilds += 1
+
+    def resolve(self, db: Session, usernames: Iterable[str] = (), user_ids: Iterable[int] = ()) -> List[IndexedUser]:
+        """Resolve exact usernames and user ids to users, in first-seen order without duplicates."""
+        self._refresh(db)
+        by_username, by_id, _, _ = self._snapshot
+        resolved: Dict[int, IndexedUser] = {}
+        for user in [by_username.get(username) for username in usernames] + [by_id.get(user_id) for user_id in user_ids]:
+            if user is not None:
+                resolved.setdefault(user.id, user)
+        return list(resolved.values())
+
+    def suggest(self, db: Session, prefix: str, limit: int = 10) -> List[IndexedUser]:
+        """Get active users whose username starts with a prefix, case-insensitively, in username order."""
+        self._refresh(db)
+        _, _, keys, users = self._snapshot
+        prefix = prefix.lower()
+        limit = max(1, min(limit, USER_SUGGEST_MAX_RESULTS))
+
+        matches = []
+        position = bisect_left(keys, prefix)
+        while position < len(keys) and keys[position].startswith(prefix) and len(matches) < limit:
+            if users[position].is_active:
+                matches.append(users[position])
+            position += 1
+        return matches
+
+    def stats(self):
+        """Get the index size and how often it has been rebuilt."""
+        return {"users": len(self._snapshot[3]), "rebuilds": self._rebuilds}
+
+# Global username index
+username_index = UsernameIndex()
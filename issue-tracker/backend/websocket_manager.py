@@ -1,73 +1,668 @@
 from fastapi import WebSocket, WebSocketDisconnect
-from typing import Dict, List
+from fastapi.responses import StreamingResponse
+from collections import deque
+from typing import Any, AsyncIterator, Callable, Collection, Deque, Dict, List, Optional, Set, Tuple
+import asyncio
 import json
 import logging
+import time
 from datetime import datetime
-from models import WebSocketMessage
+from pubsub import PubSubBackend, create_pubsub
+import binary_codec
+
+try:
+    import orjson  # Optional, several times faster than the json module for large fan-outs
+except ImportError:
+    orjson = None
+
+# WebSocket delivery configuration
+WS_SEND_QUEUE_SIZE = 256  # Messages buffered per connection before it counts as a slow consumer
+WS_SLOW_CONSUMER_POLICY = "disconnect"  # "disconnect" closes slow sockets, "drop" discards new messages for them
+WS_SLOW_CONSUMER_CLOSE_CODE = 1013  # Try Again Later; the client reconnects and refetches
+WS_MAX_TOPICS_PER_CONNECTION = 100
+WS_HEARTBEAT_INTERVAL_SECONDS = 25  # How often the server pings every connection
+WS_IDLE_TIMEOUT_SECONDS = 60  # Connections silent for this long (no pong or other frame) are reaped
+WS_IDLE_CLOSE_CODE = 1001  # Going Away
+WS_POLICY_VIOLATION_CLOSE_CODE = 1008  # Missing or invalid token, or a token for another user
+WS_COALESCE_MAX_MS = 250  # Upper bound for the coalescing window a client may request
+WS_COALESCE_MERGE_TYPES = ("issue_updated", "issue_changed")  # Later events for the same issue supersede earlier ones
+TOPIC_PREFIXES = ("issue:",)  # Topics clients may subscribe to, e.g. "issue:42"
+WS_REPLAY_BUFFER_EVENTS = 10000  # Recent notification broadcasts kept for resuming after a reconnect
+WS_REPLAY_MAX_RECIPIENTS = 1000000  # Bound on the recipients summed over buffered broadcasts; the oldest go first
+SSE_RETRY_MS = 3000  # Reconnect delay suggested to EventSource clients
 
 logger = logging.getLogger(__name__)
 
+def encode_json(data: Any) -> str:
+    """Encode a value as compact JSON, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(data).decode()
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False, default=str)
+
+def encode_notification(data: dict, seq: Optional[int] = None) -> str:
+    """Encode a user notification in the WebSocketMessage layout.
+    
+    The socket is authenticated to its user, so the frame leaves user_id out
+    and the same frame serves every recipient of a broadcast.
+    """
+    return ('{"type":' + encode_json(data.get("type", "notification")) + ',"data":' + encode_json(data)
+            + ',"timestamp":' + encode_json(datetime.now().isoformat()) + ('' if seq is None else ',"seq":' + str(seq)) + '}')
+
+def encode_topic_message(topic: str, data: dict) -> str:
+    """Encode a topic update; every subscriber receives the same frame."""
+    return ('{"type":' + encode_json(data.get("type", "update")) + ',"topic":' + encode_json(topic)
+            + ',"data":' + encode_json(data) + ',"timestamp":' + encode_json(datetime.now().isoformat()) + '}')
+
+def sse_event(data: str, event_id: Optional[int] = None) -> str:
+    """Frame an encoded JSON message as a Server-Sent Event; the id lets the client resume with Last-Event-ID."""
+    return ("" if event_id is None else f"id: {event_id}\n") + "data: " + data + "\n\n"
+
+def encode_frame(encoding: str, data: dict, seq: Optional[int] = None) -> Any:
+    """Encode a user notification for connections of one format: "json", "sse" or "msgpack"."""
+    if encoding == "msgpack":
+        return binary_codec.encode_notification(data, time.time(), seq)
+    frame = encode_notification(data, seq)
+    return sse_event(frame, seq) if encoding == "sse" else frame
+
+def encode_frame_parts(encoding: str, data: dict, seq: Optional[int] = None) -> Tuple[Any, Any]:
+    """Encode a user notification around a per-recipient notification id.
+    
+    Returns (head, tail); a recipient's frame is head + notification_id_field()
+    + tail, so the payload is still encoded once per format and each
+    recipient only adds a few bytes.
+    """
+    if encoding == "msgpack":
+        return binary_codec.encode_notification(data, time.time(), seq, with_notification_id=True), b""
+    frame = encode_frame(encoding, data, seq)
+    split = frame.index("{") + 1
+    return frame[:split], frame[split:]
+
+def notification_id_field(encoding: str, notification_id: int) -> Any:
+    """The per-recipient part of a frame from encode_frame_parts: the id of their stored notification."""
+    if encoding == "msgpack":
+        return binary_codec.packb(notification_id)
+    return f'"notification_id":{notification_id},'
+
+def issue_topic(issue_id: int) -> str:
+    """Topic carrying live updates for one issue."""
+    return f"issue:{issue_id}"
+
+def merge_key(data: dict) -> Optional[Tuple[str, int]]:
+    """Key under which an event supersedes earlier ones inside a coalescing window."""
+    if data.get("type") in WS_COALESCE_MERGE_TYPES and "issue_id" in data:
+        return data["type"], data["issue_id"]
+    return None
+
+def merge_payloads(earlier: Dict[str, Any], later: Dict[str, Any]) -> Dict[str, Any]:
+    """Merge two payloads for the same issue, keeping every changed field and describing them all."""
+    changes = dict(earlier.get("changes", {}))
+    for field, value in later.get("changes", {}).items():
+        previous = changes.get(field)
+        if isinstance(value, list) and isinstance(previous, list) and len(value) == len(previous) == 2:
+            value = [previous[0], value[1]]  # (old, new) pairs span the whole window
+        changes[field] = value
+    merged = {**later, "changes": changes}
+    if "message" in later and "issue_title" in later:
+        merged["message"] = NotificationService.issue_updated_message(later["issue_title"], later["updated_by"], changes)
+    return merged
+
+def merge_messages(earlier: str, later: str) -> str:
+    """Merge two encoded events for the same issue (see merge_payloads)."""
+    first, second = json.loads(earlier), json.loads(later)
+    second["data"] = merge_payloads(first["data"], second["data"])
+    return encode_json(second)
+
+class ClientConnection:
+    """A WebSocket with its own bounded send queue and writer task.
+
+    Broadcasts only put messages on the queue, so a client that reads slowly
+    delays nobody but itself. The writer task drains the queue in order.
+    Binary connections receive MessagePack frames (see binary_codec) instead
+    of JSON text. Server-Sent Events streams have no socket or writer task:
+    the HTTP response drains the queue itself (see ConnectionManager.stream).
+    """
+
+    __slots__ = ("websocket", "user_id", "authenticated", "coalesce_window", "binary", "sse", "format", "queue",
+                 "writer", "topics", "connected_at", "last_seen", "rtt", "closed", "sent", "dropped", "peak_queue_depth")
+
+    def __init__(self, websocket: Optional[WebSocket], user_id: int, queue_size: int = WS_SEND_QUEUE_SIZE,
+                 coalesce_window: Optional[float] = None, binary: bool = False, sse: bool = False,
+                 authenticated: bool = False):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.authenticated = authenticated  # Only connections opened with a verified token may subscribe to topics
+        self.coalesce_window = coalesce_window
+        self.binary = binary
+        self.sse = sse
+        self.format = "msgpack" if binary else "sse" if sse else "json"  # Connections of one format share frames
+        # Items are (message, merge key or None); messages are bytes on binary connections
+        self.queue: "asyncio.Queue[Tuple[Any, Optional[Tuple[str, int]]]]" = asyncio.Queue(maxsize=queue_size)
+        self.writer: Optional[asyncio.Task] = None
+        self.topics: Set[str] = set()
+        self.connected_at = time.monotonic()
+        self.last_seen = self.connected_at
+        self.rtt: Optional[float] = None
+        self.closed = False
+        self.sent = 0
+        self.dropped = 0
+        self.peak_queue_depth = 0
+
+    def enqueue(self, message: Any, key: Optional[Tuple[str, int]] = None) -> bool:
+        """Queue a message without waiting. Returns False if the queue is full."""
+        if self.closed:
+            return True
+        try:
+            self.queue.put_nowait((message, key))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+        self.peak_queue_depth = max(self.peak_queue_depth, self.queue.qsize())
+        return True
+
+class BufferedEvent:
+    """A notification kept for replay, stored once however many users received it."""
+
+    __slots__ = ("seq", "data", "recipients", "notification_ids")
+
+    def __init__(self, seq: int, data: dict, recipients: Collection[int],
+                 notification_ids: Optional[Dict[int, int]] = None):
+        self.seq = seq
+        self.data = data
+        self.recipients = recipients
+        self.notification_ids = notification_ids
+
+class ReplayBuffer:
+    """Recent user notifications, so reconnecting clients get only what they missed.
+
+    Sequence numbers are pub/sub message ids, so they increase monotonically
+    and agree across worker processes. Each broadcast is buffered once with
+    the set of its recipients rather than once per user, so buffering costs
+    the same for ten recipients as for ten thousand. Every process buffers
+    every notification, since a client may reconnect to any worker.
+    """
+
+    def __init__(self, max_events: int = WS_REPLAY_BUFFER_EVENTS, max_recipients: int = WS_REPLAY_MAX_RECIPIENTS):
+        self.max_events = max_events
+        self.max_recipients = max_recipients
+        self.events: Deque[BufferedEvent] = deque()
+        self.recipients = 0  # Total recipients over the buffered events
+        self.floor = 0  # Events up to here are not buffered (published before startup, or evicted)
+        self.latest = 0
+        self.replays = 0
+        self.resyncs = 0
+
+    def append(self, seq: int, user_ids: List[int], data: dict, notification_ids: Optional[Dict[int, int]] = None):
+        """Record a notification sent to some users; notification_ids maps each of them to their stored notification."""
+        self.latest = max(self.latest, seq)
+        recipients = notification_ids if notification_ids is not None else frozenset(user_ids)
+        self.events.append(BufferedEvent(seq, data, recipients, notification_ids))
+        self.recipients += len(recipients)
+        while len(self.events) > self.max_events or self.recipients > self.max_recipients:
+            evicted = self.events.popleft()
+            self.recipients -= len(evicted.recipients)
+            self.floor = evicted.seq
+
+    def since(self, user_id: int, last_seq: int) -> Optional[List[BufferedEvent]]:
+        """A user's events after last_seq, or None if some events after it are no longer buffered."""
+        if last_seq < self.floor or last_seq > self.latest:
+            self.resyncs += 1
+            return None
+        
+        self.replays += 1
+        events = []
+        for event in reversed(self.events):
+            if event.seq <= last_seq:
+                break
+            if user_id in event.recipients:
+                events.append(event)
+        events.reverse()
+        return events
+
+    def stats(self) -> Dict[str, Any]:
+        """Get buffer occupancy and resume outcomes."""
+        return {
+            "events": len(self.events),
+            "recipients": self.recipients,
+            "floor_seq": self.floor,
+            "latest_seq": self.latest,
+            "replays": self.replays,
+            "resyncs": self.resyncs
+        }
+
 class ConnectionManager:
-    def __init__(self):
+    """Tracks this process's WebSocket connections.
+
+    JSON notifications go through the pub/sub layer, so with several worker
+    processes a user is reached whichever worker holds their socket; each
+    worker delivers the messages it receives to its local connections.
+    """
+    
+    def __init__(self, pubsub: Optional[PubSubBackend] = None):
         # Store active connections by user_id
-        self.active_connections: Dict[int, List[WebSocket]] = {}
+        self.active_connections: Dict[int, List[ClientConnection]] = {}
+        # Topic index so topic updates reach exactly their subscribers
+        self.topic_subscribers: Dict[str, Set[ClientConnection]] = {}
+        self.pubsub = pubsub or create_pubsub()
+        # Decides whether a user may follow a topic; set by the application, and without one every subscription is refused
+        self.topic_authorizer: Optional[Callable[[int, str], bool]] = None
+        self.replay = ReplayBuffer()
+        self.messages_sent = 0
+        self.messages_dropped = 0
+        self.slow_consumer_disconnects = 0
+        self.send_errors = 0
+        self.idle_disconnects = 0
+        self.frames_coalesced = 0
+        self.messages_merged = 0
+        self._heartbeat: Optional[asyncio.Task] = None
+    
+    async def start(self):
+        """Subscribe this process to the pub/sub layer and start the heartbeat."""
+        await self.pubsub.start(self.deliver_local)
+        # Anything published before this process subscribed cannot be replayed by it
+        self.replay.floor = self.replay.latest = self.pubsub.last_id
+        self._heartbeat = asyncio.create_task(self._run_heartbeat())
+    
+    async def stop(self):
+        """Stop the heartbeat and unsubscribe from the pub/sub layer."""
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            try:
+                await self._heartbeat
+            except asyncio.CancelledError:
+                pass
+            self._heartbeat = None
+        await self.pubsub.stop()
     
-    async def connect(self, websocket: WebSocket, user_id: int):
-        """Accept a WebSocket connection and store it."""
-        await websocket.accept()
+    async def _run_heartbeat(self):
+        """Single task that pings every connection and reaps the ones that stopped answering."""
+        while True:
+            await asyncio.sleep(WS_HEARTBEAT_INTERVAL_SECONDS)
+            try:
+                self.heartbeat()
+            except Exception as e:
+                logger.error(f"WebSocket heartbeat failed: {e}")
+    
+    def heartbeat(self):
+        """Reap idle connections and queue a ping on the rest."""
+        now = time.monotonic()
+        ping = {"type": "ping", "ts": now}
+        pings = {False: encode_json(ping), True: binary_codec.encode_message(ping, None, time.time())}
+        for connections in list(self.active_connections.values()):
+            for connection in tuple(connections):
+                if connection.sse:
+                    # EventSource clients cannot answer; a failed write ends the response instead
+                    connection.last_seen = now
+                    if not connection.enqueue(": keep-alive\n\n"):
+                        self._handle_slow_consumer(connection)
+                elif now - connection.last_seen > WS_IDLE_TIMEOUT_SECONDS:
+                    self.idle_disconnects += 1
+                    logger.info(f"Reaping idle WebSocket connection for user {connection.user_id}")
+                    self._remove(connection)
+                    asyncio.create_task(self._close(connection, WS_IDLE_CLOSE_CODE))
+                elif not connection.enqueue(pings[connection.binary]):
+                    self._handle_slow_consumer(connection)
+    
+    async def connect(self, websocket: WebSocket, user_id: int, coalesce_ms: Optional[int] = None,
+                      last_seq: Optional[int] = None, authenticated: bool = False) -> ClientConnection:
+        """Accept a WebSocket connection and start its writer task.
+        
+        With coalesce_ms, messages are buffered for that many milliseconds and
+        sent as one array frame. Clients offering the binary_codec.SUBPROTOCOL
+        subprotocol get MessagePack frames instead of JSON. A reconnecting
+        client passes the last seq it saw and is sent only the notifications
+        it missed, or a "resync" message if they are no longer buffered. A
+        client without one is sent a "hello" message carrying the current
+        seq, so it can resume even before its first notification arrives.
+        """
+        binary = binary_codec.SUBPROTOCOL in websocket.scope.get("subprotocols", [])
+        await websocket.accept(subprotocol=binary_codec.SUBPROTOCOL if binary else None)
+        
+        coalesce_window = min(coalesce_ms, WS_COALESCE_MAX_MS) / 1000 if coalesce_ms and coalesce_ms > 0 else None
+        connection = ClientConnection(websocket, user_id, coalesce_window=coalesce_window, binary=binary,
+                                      authenticated=authenticated)
+        connection.writer = asyncio.create_task(self._write(connection))
         
         if user_id not in self.active_connections:
             self.active_connections[user_id] = []
         
-        self.active_connections[user_id].append(websocket)
+        self.active_connections[user_id].append(connection)
         logger.info(f"User {user_id} connected via WebSocket")
+        
+        # Replay before yielding to the event loop, so nothing lands between the gap and live events
+        if last_seq is not None:
+            self._resume(connection, last_seq)
+        else:
+            self._send_hello(connection)
+        return connection
+    
+    def open_stream(self, user_id: int, last_seq: Optional[int] = None, topics: List[str] = (),
+                    authenticated: bool = False) -> ClientConnection:
+        """Register a Server-Sent Events stream for a user; pass it to stream() to produce the response body.
+        
+        The stream receives the same notifications and topic updates as a
+        WebSocket, framed as SSE with the seq as the event id. Topics that are
+        not allowed are skipped. A stream opened without a last seq starts
+        with a "hello" event whose id is the current seq, so EventSource has a
+        Last-Event-ID to resume from before its first notification.
+        """
+        connection = ClientConnection(None, user_id, sse=True, authenticated=authenticated)
+        self.active_connections.setdefault(user_id, []).append(connection)
+        logger.info(f"User {user_id} connected via Server-Sent Events")
+        
+        for topic in topics:
+            self.subscribe(connection, topic)
+        if last_seq is not None:
+            self._resume(connection, last_seq)
+        else:
+            self._send_hello(connection)
+        return connection
+    
+    async def stream(self, connection: ClientConnection) -> AsyncIterator[str]:
+        """Yield a stream's queued events until it is closed; unregisters it when the client goes away."""
+        try:
+            yield f"retry: {SSE_RETRY_MS}\n\n"
+            while True:
+                message, _ = await connection.queue.get()
+                if message is None:
+                    break
+                yield message
+                connection.sent += 1
+                self.messages_sent += 1
+        finally:
+            self._remove(connection)
+    
+    def _resume(self, connection: ClientConnection, last_seq: int):
+        events = self.replay.since(connection.user_id, last_seq)
+        if events is None:
+            self._send_control(connection, {"type": "resync", "last_seq": self.replay.latest})
+            return
+        
+        for event in events:
+            notification_id = event.notification_ids[connection.user_id] if event.notification_ids else None
+            if notification_id is None:
+                message = encode_frame(connection.format, event.data, event.seq)
+            else:
+                head, tail = encode_frame_parts(connection.format, event.data, event.seq)
+                message = head + notification_id_field(connection.format, notification_id) + tail
+            if not connection.enqueue(message, None):
+                self._handle_slow_consumer(connection)
+                return
     
     def disconnect(self, websocket: WebSocket, user_id: int):
-        """Remove a WebSocket connection."""
-        if user_id in self.active_connections:
-            try:
-                self.active_connections[user_id].remove(websocket)
-                if not self.active_connections[user_id]:
-                    del self.active_connections[user_id]
-                logger.info(f"User {user_id} disconnected from WebSocket")
-            except ValueError:
-                pass  # Connection not in list
+        """Remove a WebSocket connection and stop its writer."""
+        for connection in self.active_connections.get(user_id, []):
+            if connection.websocket is websocket:
+                self._remove(connection)
+                break
+    
+    def _remove(self, connection: ClientConnection):
+        connection.closed = True
+        if connection.writer is not None and connection.writer is not asyncio.current_task():
+            connection.writer.cancel()
+        
+        for topic in connection.topics:
+            self._unindex(connection, topic)
+        connection.topics.clear()
+        
+        connections = self.active_connections.get(connection.user_id)
+        if connections and connection in connections:
+            connections.remove(connection)
+            if not connections:
+                del self.active_connections[connection.user_id]
+            logger.info(f"User {connection.user_id} disconnected from WebSocket")
+    
+    def _unindex(self, connection: ClientConnection, topic: str):
+        subscribers = self.topic_subscribers.get(topic)
+        if subscribers is not None:
+            subscribers.discard(connection)
+            if not subscribers:
+                del self.topic_subscribers[topic]
+    
+    def subscribe(self, connection: ClientConnection, topic: str) -> bool:
+        """Subscribe a connection to a topic. Returns False if the topic is not allowed.
+        
+        Only authenticated connections may subscribe, and only to topics the
+        topic authorizer lets their user see.
+        """
+        if not topic.startswith(TOPIC_PREFIXES) or connection.closed or not connection.authenticated:
+            return False
+        if topic in connection.topics:
+            return True
+        if len(connection.topics) >= WS_MAX_TOPICS_PER_CONNECTION:
+            return False
+        if self.topic_authorizer is None or not self.topic_authorizer(connection.user_id, topic):
+            return False
+        
+        connection.topics.add(topic)
+        self.topic_subscribers.setdefault(topic, set()).add(connection)
+        return True
+    
+    def unsubscribe(self, connection: ClientConnection, topic: str):
+        """Unsubscribe a connection from a topic."""
+        if topic in connection.topics:
+            connection.topics.discard(topic)
+            self._unindex(connection, topic)
+    
+    def handle_client_message(self, connection: ClientConnection, text: str) -> bool:
+        """Handle a pong or subscribe/unsubscribe request from a client. Returns False for other messages."""
+        now = time.monotonic()
+        connection.last_seen = now
+        try:
+            message = json.loads(text)
+        except ValueError:
+            return False
+        if not isinstance(message, dict):
+            return False
+        
+        if message.get("action") == "pong":
+            if isinstance(message.get("ts"), (int, float)) and 0 <= now - message["ts"] < WS_IDLE_TIMEOUT_SECONDS:
+                connection.rtt = now - message["ts"]
+            return True
+        if message.get("action") not in ("subscribe", "unsubscribe"):
+            return False
+        
+        topic = str(message.get("topic", ""))
+        if message["action"] == "subscribe":
+            ok = self.subscribe(connection, topic)
+            reply = {"type": "subscribed" if ok else "subscribe_rejected", "topic": topic}
+        else:
+            self.unsubscribe(connection, topic)
+            reply = {"type": "unsubscribed", "topic": topic}
+        
+        self._send_control(connection, reply)
+        return True
+    
+    def _send_hello(self, connection: ClientConnection):
+        latest = self.replay.latest
+        self._send_control(connection, {"type": "hello", "last_seq": latest}, event_id=latest)
+    
+    def _send_control(self, connection: ClientConnection, data: dict, event_id: Optional[int] = None):
+        if connection.binary:
+            message = binary_codec.encode_message(data, None, time.time())
+        else:
+            message = sse_event(encode_json(data), event_id) if connection.sse else encode_json(data)
+        if not connection.enqueue(message, None):
+            self._handle_slow_consumer(connection)
+    
+    async def _write(self, connection: ClientConnection):
+        """Writer task: send queued messages to one socket in order."""
+        send = connection.websocket.send_bytes if connection.binary else connection.websocket.send_text
+        try:
+            while True:
+                message, key = await connection.queue.get()
+                if connection.coalesce_window is None:
+                    await send(message)
+                    connection.sent += 1
+                    self.messages_sent += 1
+                    continue
+                
+                # Collect everything queued during the window into one frame
+                await asyncio.sleep(connection.coalesce_window)
+                batch = [(message, key)]
+                while not connection.queue.empty():
+                    batch.append(connection.queue.get_nowait())
+                
+                messages = self._coalesce(batch, connection.binary)
+                if connection.binary:
+                    await send(binary_codec.array_header(len(messages)) + b"".join(messages))
+                else:
+                    await send("[" + ",".join(messages) + "]")
+                connection.sent += len(messages)
+                self.messages_sent += len(messages)
+                self.frames_coalesced += 1
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            self.send_errors += 1
+            logger.error(f"Error sending message to user {connection.user_id}: {e}")
+            self._remove(connection)
+    
+    def _coalesce(self, batch: List[Tuple[Any, Optional[Tuple[str, int]]]], binary: bool) -> List[Any]:
+        """Merge superseded events in a batch; each merged event takes the position of the last one."""
+        merged: Dict[Tuple[str, int], Any] = {}
+        for message, key in batch:
+            if key is not None:
+                if key in merged:
+                    if binary:
+                        merged[key] = binary_codec.merge_frames(merged[key], message, merge_payloads)
+                    else:
+                        merged[key] = merge_messages(merged[key], message)
+                    self.messages_merged += 1
+                else:
+                    merged[key] = message
+        if not merged:
+            return [message for message, _ in batch]
+        
+        remaining = {key: sum(1 for _, k in batch if k == key) for key in merged}
+        messages = []
+        for message, key in batch:
+            if key is None:
+                messages.append(message)
+                continue
+            remaining[key] -= 1
+            if not remaining[key]:
+                messages.append(merged[key])
+        return messages
+    
+    def _handle_slow_consumer(self, connection: ClientConnection):
+        self.messages_dropped += 1
+        if WS_SLOW_CONSUMER_POLICY != "disconnect" or connection.closed:
+            return
+        
+        self.slow_consumer_disconnects += 1
+        logger.warning(f"Disconnecting slow WebSocket consumer for user {connection.user_id}")
+        self._remove(connection)
+        asyncio.create_task(self._close(connection, WS_SLOW_CONSUMER_CLOSE_CODE))
+    
+    def end_stream(self, connection: ClientConnection):
+        """Discard a stream's backlog and make stream() finish, e.g. once the client has gone away."""
+        while not connection.queue.empty():
+            connection.queue.get_nowait()
+        connection.queue.put_nowait((None, None))
+    
+    async def _close(self, connection: ClientConnection, code: int):
+        if connection.sse:
+            self.end_stream(connection)
+            return
+        try:
+            await connection.websocket.close(code=code)
+        except Exception:
+            pass  # Socket already gone
+    
+    def _enqueue(self, message: str, user_id: int, key: Optional[Tuple[str, int]] = None):
+        for connection in tuple(self.active_connections.get(user_id, ())):
+            if not connection.enqueue(message, key):
+                self._handle_slow_consumer(connection)
     
     async def send_personal_message(self, message: str, user_id: int):
-        """Send a message to a specific user."""
-        if user_id in self.active_connections:
-            disconnected_connections = []
-            
-            for connection in self.active_connections[user_id]:
-                try:
-                    await connection.send_text(message)
-                except Exception as e:
-                    logger.error(f"Error sending message to user {user_id}: {e}")
-                    disconnected_connections.append(connection)
-            
-            # Remove disconnected connections
-            for connection in disconnected_connections:
-                self.disconnect(connection, user_id)
+        """Queue a raw message for a specific user's connections in this process."""
+        self._enqueue(message, user_id)
     
     async def send_personal_json(self, data: dict, user_id: int):
         """Send JSON data to a specific user."""
-        message = WebSocketMessage(
-            type=data.get("type", "notification"),
-            data=data,
-            user_id=user_id,
-            timestamp=datetime.now()
-        )
-        await self.send_personal_message(message.model_dump_json(), user_id)
+        await self.pubsub.publish([user_id], data)
     
     async def broadcast_to_users(self, message: str, user_ids: List[int]):
-        """Send a message to multiple users."""
+        """Send a raw message to multiple users' connections in this process."""
         for user_id in user_ids:
-            await self.send_personal_message(message, user_id)
+            self._enqueue(message, user_id)
     
-    async def broadcast_json_to_users(self, data: dict, user_ids: List[int]):
-        """Send JSON data to multiple users."""
-        for user_id in user_ids:
-            await self.send_personal_json(data, user_id)
+    async def broadcast_json_to_users(self, data: dict, user_ids: List[int], notification_ids: Optional[List[int]] = None):
+        """Send JSON data to multiple users, whichever worker they are connected to.
+        
+        notification_ids, aligned with user_ids, are the recipients' stored
+        notifications; each recipient's message carries its own id.
+        """
+        await self.pubsub.publish(user_ids, data, None, notification_ids)
+    
+    async def publish_topic(self, topic: str, data: dict):
+        """Send JSON data to every subscriber of a topic, whichever worker they are connected to."""
+        await self.pubsub.publish([], data, topic)
+    
+    def deliver_local(self, user_ids: List[int], data: dict, topic: Optional[str] = None, seq: Optional[int] = None,
+                      notification_ids: Optional[List[int]] = None):
+        """Pub/sub subscriber: queue a message for local connections, serializing the payload only once."""
+        if topic is not None:
+            self._deliver_topic(topic, data)
+            return
+        
+        ids = dict(zip(user_ids, notification_ids)) if notification_ids else None
+        if seq is not None:
+            self.replay.append(seq, user_ids, data, ids)
+        
+        connections = self.active_connections
+        recipients = [user_id for user_id in user_ids if user_id in connections]
+        if not recipients:
+            return
+        
+        key = merge_key(data)
+        slow = []
+        if ids is None:
+            # Every recipient gets the same frame, so each format is encoded at most once, and only if in use
+            frames: Dict[str, Any] = {}
+            for user_id in recipients:
+                for connection in connections[user_id]:
+                    message = frames.get(connection.format)
+                    if message is None:
+                        message = frames[connection.format] = encode_frame(connection.format, data, seq)
+                    if not connection.enqueue(message, key):
+                        slow.append(connection)
+        else:
+            # Each recipient adds only their notification id between a head and tail shared per format
+            parts: Dict[str, Tuple[Any, Any]] = {}
+            for user_id in recipients:
+                notification_id = ids[user_id]
+                for connection in connections[user_id]:
+                    part = parts.get(connection.format)
+                    if part is None:
+                        part = parts[connection.format] = encode_frame_parts(connection.format, data, seq)
+                    message = part[0] + notification_id_field(connection.format, notification_id) + part[1]
+                    if not connection.enqueue(message, key):
+                        slow.append(connection)
+        
+        for connection in slow:
+            self._handle_slow_consumer(connection)
+    
+    def _deliver_topic(self, topic: str, data: dict):
+        subscribers = self.topic_subscribers.get(topic)
+        if not subscribers:
+            return
+        
+        messages: Dict[str, Any] = {}
+        key = merge_key(data)
+        for connection in tuple(subscribers):
+            encoding = connection.format
+            message = messages.get(encoding)
+            if message is None:
+                if connection.binary:
+                    message = binary_codec.encode_message(data, topic, time.time())
+                elif connection.sse:
+                    message = sse_event(encode_topic_message(topic, data))
+                else:
+                    message = encode_topic_message(topic, data)
+                messages[encoding] = message
+            if not connection.enqueue(message, key):
+                self._handle_slow_consumer(connection)
     
     def get_connected_users(self) -> List[int]:
         """Get list of currently connected user IDs."""
@@ -76,77 +671,219 @@ class ConnectionManager:
     def is_user_connected(self, user_id: int) -> bool:
         """Check if a user is currently connected."""
         return user_id in self.active_connections and len(self.active_connections[user_id]) > 0
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get connection, queue-depth, drop and heartbeat metrics."""
+        connections = [connection for group in self.active_connections.values() for connection in group]
+        depths = [connection.queue.qsize() for connection in connections]
+        rtts = [connection.rtt for connection in connections if connection.rtt is not None]
+        now = time.monotonic()
+        ages = [now - connection.connected_at for connection in connections]
+        return {
+            "users": len(self.active_connections),
+            "connections": len(connections),
+            "topics": len(self.topic_subscribers),
+            "topic_subscriptions": sum(len(subscribers) for subscribers in self.topic_subscribers.values()),
+            "queued_messages": sum(depths),
+            "max_queue_depth": max(depths, default=0),
+            "peak_queue_depth": max((connection.peak_queue_depth for connection in connections), default=0),
+            "queue_size": WS_SEND_QUEUE_SIZE,
+            "messages_sent": self.messages_sent,
+            "messages_dropped": self.messages_dropped,
+            "slow_consumer_disconnects": self.slow_consumer_disconnects,
+            "send_errors": self.send_errors,
+            "idle_disconnects": self.idle_disconnects,
+            "binary_connections": sum(1 for connection in connections if connection.binary),
+            "sse_connections": sum(1 for connection in connections if connection.sse),
+            "coalescing_connections": sum(1 for connection in connections if connection.coalesce_window is not None),
+            "frames_coalesced": self.frames_coalesced,
+            "messages_merged": self.messages_merged,
+            "heartbeat_interval": WS_HEARTBEAT_INTERVAL_SECONDS,
+            "avg_rtt_ms": sum(rtts) / len(rtts) * 1000 if rtts else None,
+            "max_rtt_ms": max(rtts) * 1000 if rtts else None,
+            "avg_connection_age_seconds": sum(ages) / len(ages) if ages else 0.0,
+            "max_connection_age_seconds": max(ages, default=0.0),
+            "replay": self.replay.stats(),
+            "pubsub": self.pubsub.stats()
+        }
 
 # Global connection manager instance
 manager = ConnectionManager()
 
+class EventStreamResponse(StreamingResponse):
+    """Response body for a Server-Sent Events connection opened with ConnectionManager.open_stream.
+    
+    StreamingResponse watches for the client going away from an anyio task
+    group for the life of the response; this uses a single plain task, which
+    keeps an idle stream lighter than an idle WebSocket.
+    """
+    
+    def __init__(self, manager: ConnectionManager, connection: ClientConnection, headers: Optional[Dict[str, str]] = None):
+        super().__init__(manager.stream(connection), media_type="text/event-stream", headers=headers)
+        self.manager = manager
+        self.connection = connection
+    
+    async def _watch_disconnect(self, receive):
+        while (await receive())["type"] != "http.disconnect":
+            pass
+        self.manager.end_stream(self.connection)
+    
+    async def __call__(self, scope, receive, send):
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        watcher = asyncio.create_task(self._watch_disconnect(receive))
+        try:
+            async for chunk in self.body_iterator:
+                await send({"type": "http.response.body", "body": chunk.encode("utf-8"), "more_body": True})
+        finally:
+            watcher.cancel()
+            await self.body_iterator.aclose()
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
 class NotificationService:
     """Service for sending real-time notifications."""
     
     @staticmethod
-    async def notify_issue_assigned(issue_id: int, assignee_id: int, issue_title: str, assigned_by: str):
-        """Send notification when an issue is assigned."""
-        await manager.send_personal_json({
+    def issue_assigned_payload(issue_id: int, issue_title: str, assigned_by: str) -> dict:
+        """Build the notification for an issue assignment."""
+        return {
             "type": "issue_assigned",
             "title": "New Issue Assigned",
             "message": f"You have been assigned to issue: {issue_title}",
             "issue_id": issue_id,
             "assigned_by": assigned_by
-        }, assignee_id)
+        }
     
     @staticmethod
-    async def notify_issue_updated(issue_id: int, user_ids: List[int], issue_title: str, updated_by: str, changes: dict):
-        """Send notification when an issue is updated."""
-        change_summary = ", ".join([f"{field}: {old} → {new}" for field, (old, new) in changes.items()])
-        
-        await manager.broadcast_json_to_users({
+    def issue_updated_payload(issue_id: int, issue_title: str, updated_by: str, changes: dict) -> dict:
+        """Build the notification for an issue update."""
+        return {
             "type": "issue_updated",
             "title": "Issue Updated",
-            "message": f"Issue '{issue_title}' was updated by {updated_by}. Changes: {change_summary}",
+            "message": NotificationService.issue_updated_message(issue_title, updated_by, changes),
             "issue_id": issue_id,
+            "issue_title": issue_title,
             "updated_by": updated_by,
             "changes": changes
-        }, user_ids)
+        }
     
     @staticmethod
-    async def notify_comment_added(issue_id: int, user_ids: List[int], issue_title: str, comment_author: str, comment_preview: str):
-        """Send notification when a comment is added."""
+    def issue_updated_message(issue_title: str, updated_by: str, changes: dict) -> str:
+        """Describe an issue update; changes maps each field to its (old, new) values."""
+        change_summary = ", ".join([f"{field}: {old} → {new}" for field, (old, new) in changes.items()])
+        return f"Issue '{issue_title}' was updated by {updated_by}. Changes: {change_summary}"
+    
+    @staticmethod
+    def comment_added_payload(issue_id: int, issue_title: str, comment_author: str, comment_preview: str) -> dict:
+        """Build the notification for a new comment."""
         preview = comment_preview[:100] + "..." if len(comment_preview) > 100 else comment_preview
         
-        await manager.broadcast_json_to_users({
+        return {
             "type": "comment_added",
             "title": "New Comment",
             "message": f"{comment_author} commented on '{issue_title}': {preview}",
             "issue_id": issue_id,
             "comment_author": comment_author,
             "comment_preview": preview
-        }, user_ids)
+        }
     
     @staticmethod
-    async def notify_mention(mentioned_user_id: int, issue_id: int, issue_title: str, mentioned_by: str, comment_preview: str):
-        """Send notification when a user is mentioned."""
+    def mention_payload(issue_id: int, issue_title: str, mentioned_by: str, comment_preview: str) -> dict:
+        """Build the notification for an @mention."""
         preview = comment_preview[:100] + "..." if len(comment_preview) > 100 else comment_preview
         
-        await manager.send_personal_json({
+        return {
             "type": "mention",
             "title": "You were mentioned",
             "message": f"{mentioned_by} mentioned you in '{issue_title}': {preview}",
             "issue_id": issue_id,
             "mentioned_by": mentioned_by,
             "comment_preview": preview
-        }, mentioned_user_id)
+        }
     
     @staticmethod
-    async def notify_time_logged(issue_id: int, user_ids: List[int], issue_title: str, logged_by: str, hours: float):
-        """Send notification when time is logged."""
-        await manager.broadcast_json_to_users({
+    def time_logged_payload(issue_id: int, issue_title: str, logged_by: str, hours: float) -> dict:
+        """Build the notification for logged time."""
+        return {
             "type": "time_logged",
             "title": "Time Logged",
             "message": f"{logged_by} logged {hours} hours on '{issue_title}'",
             "issue_id": issue_id,
             "logged_by": logged_by,
             "hours": hours
-        }, user_ids)
+        }
+    
+    @staticmethod
+    def issue_changed_payload(issue_id: int, updated_by: str, changes: dict) -> dict:
+        """Build the live update sent to an issue's subscribers when its fields change."""
+        return {
+            "type": "issue_changed",
+            "issue_id": issue_id,
+            "updated_by": updated_by,
+            "changes": {field: new for field, (old, new) in changes.items()}
+        }
+    
+    @staticmethod
+    def comment_created_payload(issue_id: int, comment_id: int, author_id: int, author_name: str,
+                                content: str, created_at: datetime) -> dict:
+        """Build the live update sent to an issue's subscribers for a new comment."""
+        return {
+            "type": "comment_created",
+            "issue_id": issue_id,
+            "comment_id": comment_id,
+            "author_id": author_id,
+            "author_name": author_name,
+            "content": content,
+            "created_at": created_at.isoformat()
+        }
+    
+    @staticmethod
+    def time_entry_created_payload(issue_id: int, time_entry_id: int, user_id: int, user_name: str,
+                                   hours: float, description: Optional[str]) -> dict:
+        """Build the live update sent to an issue's subscribers for logged time."""
+        return {
+            "type": "time_entry_created",
+            "issue_id": issue_id,
+            "time_entry_id": time_entry_id,
+            "user_id": user_id,
+            "user_name": user_name,
+            "hours": hours,
+            "description": description
+        }
+    
+    @staticmethod
+    async def notify_issue_assigned(issue_id: int, assignee_id: int, issue_title: str, assigned_by: str):
+        """Send notification when an issue is assigned."""
+        await manager.send_personal_json(
+            NotificationService.issue_assigned_payload(issue_id, issue_title, assigned_by), assignee_id
+        )
+    
+    @staticmethod
+    async def notify_issue_updated(issue_id: int, user_ids: List[int], issue_title: str, updated_by: str, changes: dict):
+        """Send notification when an issue is updated."""
+        await manager.broadcast_json_to_users(
+            NotificationService.issue_updated_payload(issue_id, issue_title, updated_by, changes), user_ids
+        )
+    
+    @staticmethod
+    async def notify_comment_added(issue_id: int, user_ids: List[int], issue_title: str, comment_author: str, comment_preview: str):
+        """Send notification when a comment is added."""
+        await manager.broadcast_json_to_users(
+            NotificationService.comment_added_payload(issue_id, issue_title, comment_author, comment_preview), user_ids
+        )
+    
+    @staticmethod
+    async def notify_mention(mentioned_user_id: int, issue_id: int, issue_title: str, mentioned_by: str, comment_preview: str):
+        """Send notification when a user is mentioned."""
+        await manager.send_personal_json(
+            NotificationService.mention_payload(issue_id, issue_title, mentioned_by, comment_preview), mentioned_user_id
+        )
+    
+    @staticmethod
+    async def notify_time_logged(issue_id: int, user_ids: List[int], issue_title: str, logged_by: str, hours: float):
+        """Send notification when time is logged."""
+        await manager.broadcast_json_to_users(
+            NotificationService.time_logged_payload(issue_id, issue_title, logged_by, hours), user_ids
+        )
 
 # Global notification service instance
 notification_service = NotificationService()
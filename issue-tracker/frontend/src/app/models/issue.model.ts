@@ -56,3 +56,27 @@ export interface IssueFilters {
   page?: number;
   page_size?: number;
 }
+
+export interface Change {
+  entity: 'issue' | 'comment' | 'attachment' | 'time_entry';
+  id: number;
+  seq: number;
+  deleted: boolean;
+  data: { [field: string]: any } | null;
+}
+
+export interface ChangeFeedResponse {
+  changes: Change[];
+  cursor: number;
+  has_more: boolean;
+}
+
+export interface UserSuggestion {
+  id: number;
+  username: string;
+  full_name: string;
+}
+
+export interface UserSuggestionResponse {
+  users: UserSuggestion[];
+}
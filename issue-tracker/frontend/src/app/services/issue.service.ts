@@ -1,7 +1,7 @@
 import { Injectable } from '@angular/core';
 import { HttpClient, HttpParams } from '@angular/common/http';
 import { Observable } from 'rxjs';
-import { Issue, IssueCreate, IssueUpdate, IssueResponse, IssueFilters } from '../models/issue.model';
+import { Issue, IssueCreate, IssueUpdate, IssueResponse, IssueFilters, ChangeFeedResponse, UserSuggestionResponse } from '../models/issue.model';
 
 @Injectable({
   providedIn: 'root'
@@ -42,6 +42,19 @@ export class IssueService {
     return this.http.delete(`${this.baseUrl}/issues/${id}`);
   }
 
+  // Omit since to get the current cursor before a full load; then pass it to receive only what changed
+  getChanges(since?: number): Observable<ChangeFeedResponse> {
+    let params = new HttpParams();
+    if (since !== undefined) params = params.set('since', since.toString());
+    return this.http.get<ChangeFeedResponse>(`${this.baseUrl}/changes`, { params });
+  }
+
+  // @mention autocomplete: active users whose username starts with the typed prefix
+  suggestUsers(prefix: string, limit = 10): Observable<UserSuggestionResponse> {
+    const params = new HttpParams().set('prefix', prefix).set('limit', limit.toString());
+    return this.http.get<UserSuggestionResponse>(`${this.baseUrl}/users/suggest`, { params });
+  }
+
   checkHealth(): Observable<{status: string}> {
     return this.http.get<{status: string}>(`${this.baseUrl}/health`);
   }
@@ -35,6 +35,11 @@ export class NotificationService {
     // Listen to WebSocket messages (with error handling)
     this.webSocketService.getMessages().subscribe({
       next: (message: NotificationMessage) => {
+        if (message.type === 'resync') {
+          // Too much was missed while disconnected to replay; refetch the full list
+          this.loadNotifications();
+          return;
+        }
         this.handleRealtimeNotification(message);
         this.showToastNotification(message);
       },
@@ -87,7 +92,7 @@ export class NotificationService {
   private handleRealtimeNotification(message: NotificationMessage): void {
     // Create a notification object from the WebSocket message
     const notification: Notification = {
-      id: Date.now(), // Temporary ID for real-time notifications
+      id: message.notification_id ?? Date.now(), // Temporary ID if the server sent none
       type: message.type,
       title: message.title,
       message: message.message,
@@ -3,10 +3,13 @@ import { BehaviorSubject, Observable, Subject } from 'rxjs';
 
 export interface NotificationMessage {
   type: string;
+  topic?: string;
   title: string;
   message: string;
   issue_id?: number;
   timestamp: string;
+  seq?: number;
+  notification_id?: number;  // The stored notification, for marking it read
   data?: any;
 }
 
@@ -20,6 +23,9 @@ export class WebSocketService {
   private reconnectAttempts = 0;
   private maxReconnectAttempts = 5;
   private reconnectInterval = 3000;
+  private topics = new Set<string>();
+  // Sequence number of the last notification received, used to resume after a reconnect
+  private lastSeq: number | null = null;
 
   constructor() {}
 
@@ -29,21 +35,28 @@ export class WebSocketService {
     }
 
     try {
-      this.socket = new WebSocket(`ws://localhost:8002/ws/${userId}`);
+      // Ask the server to batch bursts of events into one frame every 25ms,
+      // and to replay whatever was missed since the last notification we saw
+      const resume = this.lastSeq !== null ? `&last_seq=${this.lastSeq}` : '';
+      // Browsers cannot set headers on a WebSocket, so the access token goes in the URL
+      const token = encodeURIComponent(localStorage.getItem('access_token') ?? '');
+      this.socket = new WebSocket(`ws://localhost:8002/ws/${userId}?token=${token}&coalesce_ms=25${resume}`);
       
       this.socket.onopen = () => {
         console.log('WebSocket connected');
         this.connectionStatusSubject.next(true);
         this.reconnectAttempts = 0;
+        // Restore topic subscriptions after a reconnect
+        this.topics.forEach(topic => this.sendAction('subscribe', topic));
       };
 
       this.socket.onmessage = (event) => {
         try {
           const data = JSON.parse(event.data);
-          this.messageSubject.next(data);
+          const messages = Array.isArray(data) ? data : [data];
+          messages.forEach(message => this.handleMessage(message));
         } catch (e) {
-          // Handle heartbeat messages
-          console.log('WebSocket heartbeat:', event.data);
+          console.log('Unrecognized WebSocket message:', event.data);
         }
       };
 
@@ -63,6 +76,26 @@ export class WebSocketService {
     }
   }
 
+  private handleMessage(message: any): void {
+    if (message.type === 'ping') {
+      // Answer the server heartbeat so the connection is not reaped as idle
+      this.socket?.send(JSON.stringify({ action: 'pong', ts: message.ts }));
+      return;
+    }
+    if (message.type === 'hello') {
+      // Current seq on a fresh connection, so a drop before the first notification can still resume
+      this.lastSeq = message.last_seq;
+      return;
+    }
+    if (typeof message.seq === 'number') {
+      this.lastSeq = message.seq;
+    } else if (message.type === 'resync') {
+      // Missed notifications are no longer buffered; listeners reload them over HTTP
+      this.lastSeq = message.last_seq;
+    }
+    this.messageSubject.next(message);
+  }
+
   private attemptReconnect(userId: number): void {
     if (this.reconnectAttempts < this.maxReconnectAttempts) {
       this.reconnectAttempts++;
@@ -74,7 +107,25 @@ export class WebSocketService {
     }
   }
 
+  // Receive live updates for a topic, e.g. `issue:42`
+  subscribe(topic: string): void {
+    this.topics.add(topic);
+    this.sendAction('subscribe', topic);
+  }
+
+  unsubscribe(topic: string): void {
+    this.topics.delete(topic);
+    this.sendAction('unsubscribe', topic);
+  }
+
+  private sendAction(action: string, topic: string): void {
+    if (this.socket?.readyState === WebSocket.OPEN) {
+      this.socket.send(JSON.stringify({ action, topic }));
+    }
+  }
+
   disconnect(): void {
+    this.lastSeq = null;
     if (this.socket) {
       this.socket.close();
       this.socket = null;